@@ -9,17 +9,19 @@ import experiment_server.database.orm as orm_config
 Startpoint for the app. CORS-headers are first added here.
 """
 
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'POST,GET,DELETE,PUT,OPTIONS',
+    'Access-Control-Allow-Headers': 'Origin, X-Requested-With, Content-Type, Accept, Authorization',
+    'Access-Control-Allow-Credentials': 'true',
+    'Access-Control-Max-Age': '1728000',
+    'Content-Type': 'application/json',
+}
+
 
 def add_cors_headers_response_callback(event):
     def cors_headers(request, response):
-        response.headers.update({
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'POST,GET,DELETE,PUT,OPTIONS',
-        'Access-Control-Allow-Headers': 'Origin, X-Requested-With, Content-Type, Accept, Authorization',
-        'Access-Control-Allow-Credentials': 'true',
-        'Access-Control-Max-Age': '1728000',
-        'Content-Type': 'application/json',
-        })
+        response.headers.update(CORS_HEADERS)
     event.request.add_response_callback(cors_headers)
 
 
@@ -39,6 +41,15 @@ def main(global_config, **settings):
 
     config.include('pyramid_jinja2')
     config.include('.models')
+    config.include('.utils.apikeys')
+    config.include('.utils.rate_limits')
+    config.include('.utils.snapshots')
+    config.include('.utils.memberships')
+    config.include('.utils.configuration_tools')
+    config.include('.utils.event_buffer')
+    config.include('.utils.event_dedup')
+    config.include('.utils.bandit_counts')
+    config.include('.utils.admission')
     config.include('.routes')
     config.scan()
 
@@ -0,0 +1,41 @@
+from alembic import context
+from pyramid.paster import get_appsettings, setup_logging
+from sqlalchemy import engine_from_config, pool
+
+from experiment_server.models.meta import Base
+import experiment_server.models
+
+"""
+Alembic environment. Database URL is read from sqlalchemy.url of the same configuration file, e.g.
+    alembic -c development.ini upgrade head
+Scripts running migrations themselves may pass their settings in Config.attributes['settings'].
+"""
+
+config = context.config
+settings = config.attributes.get('settings')
+if settings is None:
+    setup_logging(config.config_file_name)
+    settings = get_appsettings(config.config_file_name)
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """ Writes migrations as SQL to standard output instead of running them """
+    context.configure(url=settings['sqlalchemy.url'], target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    engine = engine_from_config(settings, prefix='sqlalchemy.', poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata,
+                          render_as_batch=connection.dialect.name == 'sqlite')
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
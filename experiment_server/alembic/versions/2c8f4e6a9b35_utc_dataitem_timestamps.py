@@ -0,0 +1,34 @@
+"""Timezone-aware timestamps of DataItems
+
+Revision ID: 2c8f4e6a9b35
+Revises: e5a7c3b9d214
+Create Date: 2026-10-18 20:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2c8f4e6a9b35'
+down_revision = 'e5a7c3b9d214'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ['startDatetime', 'endDatetime']
+
+
+def upgrade():
+    # SQLite keeps no offsets, so only PostgreSQL has a column type to change. Old values were posted in UTC
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for column in COLUMNS:
+        op.alter_column('dataitems', column, type_=sa.DateTime(timezone=True),
+                        postgresql_using='"%s" AT TIME ZONE \'UTC\'' % column)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for column in COLUMNS:
+        op.alter_column('dataitems', column, type_=sa.DateTime(),
+                        postgresql_using='"%s" AT TIME ZONE \'UTC\'' % column)
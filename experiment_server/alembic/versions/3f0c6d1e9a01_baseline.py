@@ -0,0 +1,25 @@
+"""Baseline: schema created by initialize_Experiment-server_db before migrations
+
+Databases created before migrations were introduced are stamped to this revision with
+    alembic -c production.ini stamp 3f0c6d1e9a01
+and then upgraded to head.
+
+Revision ID: 3f0c6d1e9a01
+Revises:
+Create Date: 2026-10-18 18:40:00.000000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3f0c6d1e9a01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
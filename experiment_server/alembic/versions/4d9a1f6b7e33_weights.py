@@ -0,0 +1,27 @@
+"""Weights of Experiments and ExperimentGroups for weighted ExperimentLogic
+
+Revision ID: 4d9a1f6b7e33
+Revises: c71d3e5f0b22
+Create Date: 2026-10-18 19:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '4d9a1f6b7e33'
+down_revision = 'c71d3e5f0b22'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('experiments', sa.Column('weight', sa.Float(), nullable=False, server_default='1'))
+    op.add_column('experimentgroups', sa.Column('weight', sa.Float(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('experimentgroups') as batch_op:
+        batch_op.drop_column('weight')
+    with op.batch_alter_table('experiments') as batch_op:
+        batch_op.drop_column('weight')
@@ -0,0 +1,26 @@
+"""Rate limits of Applications' apikeys
+
+Revision ID: 5b1e8c3f7d62
+Revises: 7a3d9f1c5e48
+Create Date: 2026-10-18 22:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5b1e8c3f7d62'
+down_revision = '7a3d9f1c5e48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('applications', sa.Column('rate_limit', sa.Float(), nullable=True))
+    op.add_column('applications', sa.Column('rate_burst', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('applications') as batch_op:
+        batch_op.drop_column('rate_burst')
+        batch_op.drop_column('rate_limit')
@@ -0,0 +1,27 @@
+"""Client-supplied event ids of DataItems
+
+Revision ID: 7a3d9f1c5e48
+Revises: 2c8f4e6a9b35
+Create Date: 2026-10-18 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '7a3d9f1c5e48'
+down_revision = '2c8f4e6a9b35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('dataitems', sa.Column('event_id', sa.Text(), nullable=True))
+    # NULLs are distinct, so data-items without event_id are never rejected
+    op.create_index('uq_dataitems_client_id_event_id', 'dataitems', ['client_id', 'event_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_dataitems_client_id_event_id', table_name='dataitems')
+    with op.batch_alter_table('dataitems') as batch_op:
+        batch_op.drop_column('event_id')
@@ -0,0 +1,84 @@
+"""Index for running Experiments, and DataItemSummaries
+
+Both may already exist if the database was created with initialize_Experiment-server_db after they were added to the
+models, so they are only created when missing. A created dataitemsummaries is filled from existing dataitems. They
+are summarized by every ExperimentGroup their Client is in, since which Experiments were running when a DataItem was
+posted is not known anymore.
+
+Revision ID: 8b4e2a7c5d10
+Revises: 3f0c6d1e9a01
+Create Date: 2026-10-18 18:41:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8b4e2a7c5d10'
+down_revision = '3f0c6d1e9a01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'ix_experiments_application_id_startDatetime_endDatetime' not in \
+            map(lambda _: _['name'], inspector.get_indexes('experiments')):
+        op.create_index('ix_experiments_application_id_startDatetime_endDatetime', 'experiments',
+                        ['application_id', 'startDatetime', 'endDatetime'])
+    if 'dataitemsummaries' not in inspector.get_table_names():
+        summaries = op.create_table(
+            'dataitemsummaries',
+            sa.Column('experimentgroup_id', sa.Integer(), nullable=False),
+            sa.Column('key', sa.Text(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.Column('sum', sa.Float(), nullable=False),
+            sa.Column('sum_of_squares', sa.Float(), nullable=False),
+            sa.Column('min', sa.Float(), nullable=False),
+            sa.Column('max', sa.Float(), nullable=False),
+            sa.ForeignKeyConstraint(['experimentgroup_id'], ['experimentgroups.id'],
+                                    name='fk_dataitemsummaries_experimentgroup_id_experimentgroups'),
+            sa.PrimaryKeyConstraint('experimentgroup_id', 'key', name='pk_dataitemsummaries')
+        )
+        op.bulk_insert(summaries, summarize_dataitems())
+
+
+def summarize_dataitems():
+    """
+    Values are JSON, so numeric ones are picked and summarized here instead of in SQL
+    :return: list of dataitemsummaries-rows
+    """
+    dataitems = sa.table('dataitems', sa.column('client_id', sa.Integer), sa.column('key', sa.Text),
+                         sa.column('value', sa.UnicodeText))
+    memberships = sa.table('clients_experimentgroups', sa.column('client_id', sa.Integer),
+                           sa.column('experimentgroup_id', sa.Integer))
+    rows = op.get_bind().execution_options(stream_results=True).execute(
+        sa.select([memberships.c.experimentgroup_id, dataitems.c.key, dataitems.c.value])
+        .select_from(dataitems.join(memberships, memberships.c.client_id == dataitems.c.client_id)))
+    summaries = {}
+    for experimentgroup_id, key, value in rows:
+        try:
+            value = json.loads(value)
+        except (TypeError, ValueError) as e:
+            continue
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            continue
+        summary = summaries.get((experimentgroup_id, key))
+        if summary is None:
+            summaries[(experimentgroup_id, key)] = {'experimentgroup_id': experimentgroup_id, 'key': key, 'count': 1,
+                                                    'sum': value, 'sum_of_squares': value * value, 'min': value,
+                                                    'max': value}
+        else:
+            summary['count'] += 1
+            summary['sum'] += value
+            summary['sum_of_squares'] += value * value
+            summary['min'] = min(summary['min'], value)
+            summary['max'] = max(summary['max'], value)
+    return list(summaries.values())
+
+
+def downgrade():
+    op.drop_table('dataitemsummaries')
+    op.drop_index('ix_experiments_application_id_startDatetime_endDatetime', table_name='experiments')
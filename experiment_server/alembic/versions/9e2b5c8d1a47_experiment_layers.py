@@ -0,0 +1,24 @@
+"""Layers of Experiments for layered ExperimentLogic
+
+Revision ID: 9e2b5c8d1a47
+Revises: 4d9a1f6b7e33
+Create Date: 2026-10-18 19:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9e2b5c8d1a47'
+down_revision = '4d9a1f6b7e33'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('experiments', sa.Column('layer', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('experiments') as batch_op:
+        batch_op.drop_column('layer')
@@ -0,0 +1,71 @@
+"""Indexes for hot lookups
+
+- dataitems.client_id
+- configurations (experimentgroup_id, key)
+- unique configurationkeys (application_id, name)
+- primary key (client_id, experimentgroup_id) and index on experimentgroup_id for clients_experimentgroups
+experiments.application_id is covered by ix_experiments_application_id_startDatetime_endDatetime.
+
+Duplicate and NULL rows of clients_experimentgroups are deleted before the primary key is added. Duplicate
+ConfigurationKeys are not merged, since constraints refer to them: upgrade fails and lists them instead.
+
+Revision ID: c71d3e5f0b22
+Revises: 8b4e2a7c5d10
+Create Date: 2026-10-18 18:42:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c71d3e5f0b22'
+down_revision = '8b4e2a7c5d10'
+branch_labels = None
+depends_on = None
+
+
+def delete_duplicate_memberships(connection):
+    if connection.dialect.name == 'postgresql':
+        connection.execute(
+            'DELETE FROM clients_experimentgroups a USING clients_experimentgroups b '
+            'WHERE a.ctid > b.ctid AND a.client_id = b.client_id AND a.experimentgroup_id = b.experimentgroup_id')
+    else:
+        connection.execute(
+            'DELETE FROM clients_experimentgroups WHERE rowid NOT IN '
+            '(SELECT min(rowid) FROM clients_experimentgroups GROUP BY client_id, experimentgroup_id)')
+    connection.execute('DELETE FROM clients_experimentgroups WHERE client_id IS NULL OR experimentgroup_id IS NULL')
+
+
+def upgrade():
+    connection = op.get_bind()
+    duplicates = connection.execute(
+        'SELECT application_id, name, count(*) FROM configurationkeys '
+        'GROUP BY application_id, name HAVING count(*) > 1').fetchall()
+    if len(duplicates) > 0:
+        raise RuntimeError('Rename or delete duplicate ConfigurationKeys (application_id, name, count) first: %s'
+                           % ', '.join(map(lambda _: str(tuple(_)), duplicates)))
+
+    op.create_index('ix_dataitems_client_id', 'dataitems', ['client_id'])
+    op.create_index('ix_configurations_experimentgroup_id_key', 'configurations', ['experimentgroup_id', 'key'])
+    with op.batch_alter_table('configurationkeys') as batch_op:
+        batch_op.create_unique_constraint('uq_configurationkeys_application_id_name', ['application_id', 'name'])
+
+    delete_duplicate_memberships(connection)
+    with op.batch_alter_table('clients_experimentgroups') as batch_op:
+        batch_op.alter_column('client_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('experimentgroup_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_primary_key('pk_clients_experimentgroups', ['client_id', 'experimentgroup_id'])
+    op.create_index('ix_clients_experimentgroups_experimentgroup_id', 'clients_experimentgroups',
+                    ['experimentgroup_id'])
+
+
+def downgrade():
+    op.drop_index('ix_clients_experimentgroups_experimentgroup_id', table_name='clients_experimentgroups')
+    with op.batch_alter_table('clients_experimentgroups') as batch_op:
+        batch_op.drop_constraint('pk_clients_experimentgroups', type_='primary')
+        batch_op.alter_column('client_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('experimentgroup_id', existing_type=sa.Integer(), nullable=True)
+    with op.batch_alter_table('configurationkeys') as batch_op:
+        batch_op.drop_constraint('uq_configurationkeys_application_id_name', type_='unique')
+    op.drop_index('ix_configurations_experimentgroup_id_key', table_name='configurations')
+    op.drop_index('ix_dataitems_client_id', table_name='dataitems')
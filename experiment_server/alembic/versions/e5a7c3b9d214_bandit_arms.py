@@ -0,0 +1,31 @@
+"""Checkpointed reward counts for bandit ExperimentLogic
+
+Revision ID: e5a7c3b9d214
+Revises: 9e2b5c8d1a47
+Create Date: 2026-10-18 20:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c3b9d214'
+down_revision = '9e2b5c8d1a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'banditarms',
+        sa.Column('experimentgroup_id', sa.Integer(), nullable=False),
+        sa.Column('successes', sa.Float(), nullable=False),
+        sa.Column('trials', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['experimentgroup_id'], ['experimentgroups.id'],
+                                name='fk_banditarms_experimentgroup_id_experimentgroups'),
+        sa.PrimaryKeyConstraint('experimentgroup_id', name='pk_banditarms')
+    )
+
+
+def downgrade():
+    op.drop_table('banditarms')
@@ -0,0 +1,3 @@
+"""
+Benchmarks for the client-facing API. See experiment_server/benchmarks/run.py
+"""
@@ -0,0 +1,163 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+from pyramid.paster import get_appsettings, setup_logging
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from webob import Request
+
+"""
+Benchmark for the client-facing API. Generates data to the database given in the configuration file with
+experiment_server.scripts.generatedata, builds the WSGI application with experiment_server.main and sends it
+POST /configurations and POST /events requests in-process, so that the numbers are not affected by a web server or the
+network. Reports throughput, p50/p95/p99 latency and database queries per request for each endpoint.
+
+Example:
+    benchmark_Experiment-server development.ini --clients 1000000 --dataitems 50000000 --requests 10000
+"""
+
+_queries = threading.local()
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    _queries.count = getattr(_queries, 'count', 0) + 1
+
+
+class Measurements:
+    """ Latencies, statuses and query counts of one endpoint """
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.queries = 0
+        self.statuses = {}
+
+    def add(self, latency, queries, status):
+        with self.lock:
+            self.latencies.append(latency)
+            self.queries += queries
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def percentile(self, p):
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+    def report(self, elapsed):
+        count = len(self.latencies)
+        if count == 0:
+            return '%s: no requests' % self.name
+        return '%-16s %7d requests %9.1f req/s   p50 %7.2f ms   p95 %7.2f ms   p99 %7.2f ms   ' \
+               '%5.1f queries/request   statuses %s' % (
+                   self.name, count, count / elapsed, self.percentile(50) * 1000, self.percentile(95) * 1000,
+                   self.percentile(99) * 1000, self.queries / count, self.statuses)
+
+
+def call(app, measurements, path, apikey, body, headers=None):
+    request = Request.blank(path, method='POST', body=json.dumps(body).encode('utf-8'),
+                            content_type='application/json')
+    request.headers['authorization'] = apikey
+    request.headers.update(headers or {})
+
+    _queries.count = 0
+    start = time.perf_counter()
+    response = request.get_response(app)
+    measurements.add(time.perf_counter() - start, _queries.count, response.status_code)
+    return response
+
+
+def make_event():
+    now = time.strftime('%Y-%m-%d %H:%M:%S')
+    return {'key': 'score', 'value': '%.3f' % random.random(), 'startDatetime': now, 'endDatetime': now}
+
+
+def run_client(app, clients, configurations, events, events_per_client):
+    """ Gets configurations for every given Client, then posts its events """
+    for apikey, clientname in clients:
+        response = call(app, configurations, '/configurations', apikey, clientname)
+        if response.status_code != 200:
+            continue
+        for i in range(events_per_client):
+            call(app, events, '/events', apikey, make_event(), {'clientname': clientname})
+
+
+def run(app, generated, requests, events_per_client, threads, new_clients):
+    """
+    :param app: WSGI application
+    :param generated: GeneratedData, whose Clients send the requests
+    :param requests: number of Clients sending requests
+    :param events_per_client: number of POST /events per POST /configurations
+    :param threads: number of threads sending requests
+    :param new_clients: share of Clients which are not generated, so POST /configurations creates and assigns them
+    :return: (seconds, Measurements of /configurations, Measurements of /events)
+    """
+    clients = []
+    for i in range(requests):
+        apikey = random.choice(generated.apikeys)
+        app_id, count = generated.clients[apikey]
+        if random.random() < new_clients or count == 0:
+            clients.append((apikey, 'benchmark-new-%s-%s' % (time.time(), i)))
+        else:
+            clients.append((apikey, generated.get_clientname(apikey, random.randrange(count))))
+
+    configurations = Measurements('/configurations')
+    events = Measurements('/events')
+    workers = [threading.Thread(target=run_client,
+                                args=(app, clients[i::threads], configurations, events, events_per_client))
+               for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start, configurations, events
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description='Benchmark POST /configurations and POST /events')
+    parser.add_argument('config_uri', help='configuration file, e.g. development.ini')
+    parser.add_argument('--applications', type=int, default=1, help='Applications to generate')
+    parser.add_argument('--experiments', type=int, default=4, help='Experiments per Application')
+    parser.add_argument('--experimentgroups', type=int, default=2, help='ExperimentGroups per Experiment')
+    parser.add_argument('--clients', type=int, default=1000, help='Clients to generate per Application')
+    parser.add_argument('--memberships', type=int, default=1, help='Experiments each generated Client is in')
+    parser.add_argument('--dataitems', type=int, default=10000, help='DataItems to generate per Application')
+    parser.add_argument('--requests', type=int, default=1000, help='Clients which send requests')
+    parser.add_argument('--events-per-client', type=int, default=5, help='POST /events per Client')
+    parser.add_argument('--new-clients', type=float, default=0.1,
+                        help='share of requesting Clients which are not generated')
+    parser.add_argument('--threads', type=int, default=1, help='threads sending requests')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args(argv[1:])
+
+    setup_logging(args.config_uri)
+    settings = get_appsettings(args.config_uri)
+
+    from experiment_server import main as make_app
+    from experiment_server.models import get_engine
+    from experiment_server.models.meta import Base
+    from experiment_server.scripts.generatedata import generate
+
+    engine = get_engine(settings)
+    Base.metadata.create_all(engine)
+    started = time.perf_counter()
+    generated = generate(engine, args.applications, args.experiments, args.experimentgroups, args.clients,
+                         args.memberships, args.dataitems, args.seed,
+                         reward_key=settings.get('experiment_server.bandit_reward_key', 'reward'))
+    print('Generated data in %.1f s' % (time.perf_counter() - started))
+    engine.dispose()
+
+    app = make_app({}, **settings)
+    random.seed(args.seed)
+    event.listen(Engine, 'before_cursor_execute', count_query)
+    elapsed, configurations, events = run(app, generated, args.requests, args.events_per_client, args.threads,
+                                          args.new_clients)
+    event.remove(Engine, 'before_cursor_execute', count_query)
+
+    print('%d requests in %.1f s with %d threads' % (
+        len(configurations.latencies) + len(events.latencies), elapsed, args.threads))
+    print(configurations.report(elapsed))
+    print(events.report(elapsed))
@@ -16,6 +16,14 @@ class ORM:
         """
         return DBSession.query(cls)
 
+    @classmethod
+    def engine(cls):
+        """
+        Engine DBSession is bound to. Use it for reads which must not be a part of the request's transaction, e.g.
+        ones done while the response is being sent.
+        """
+        return DBSession.get_bind()
+
     @classmethod
     def get(cls, id):
         """
@@ -54,6 +62,20 @@ class ORM:
         DBSession.add(data)
         DBSession.flush()
 
+    @classmethod
+    def bulk_insert(cls, rows):
+        """
+        Insert many rows to the database with a single executemany. Unlike save, no model-objects are created, so ids
+        of inserted rows are not returned.
+
+        Example:
+            <modelT>.bulk_insert([{'key': 'a'}, {'key': 'b'}])
+
+        :param rows: list of dictionaries from column names to values
+        """
+        if len(rows) > 0:
+            DBSession.execute(cls.__table__.insert(), rows)
+
     @classmethod
     def destroy(cls, data):
         """
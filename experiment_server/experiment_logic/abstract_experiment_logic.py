@@ -1,6 +1,14 @@
 import abc
 import datetime
 import logging
+import random
+
+
+def layer_order(layer):
+    """
+    Sort key of layers: Experiments without layer come first, then layers by name
+    """
+    return layer is not None, layer or ''
 
 
 class AbstractExperimentLogic(object):
@@ -26,10 +34,31 @@ class AbstractExperimentLogic(object):
         return
 
     @abc.abstractmethod
-    def get_experiments(self, application):
+    def get_experiments(self, application, clientname=None):
         """
         Returns Experiment(s) according the class which has implemented this function
-        :param application: Applications where experiments are fetched from
+        :param application: Application, or its ApplicationSnapshot, where experiments are fetched from
+        :param clientname: name of the Client Experiments are fetched for. Not all ExperimentLogics need it
         :return: One or more Experiments depending on ExperimentLogic
         """
         return
+
+    def get_layer(self, application, experiment):
+        """
+        Returns layer of given Experiment. Client is in at most one running Experiment of every layer. By default all
+        Experiments are in the same layer, so Client is in one running Experiment
+        :param application: Application, or its ApplicationSnapshot, where experiment belongs to
+        :param experiment: Experiment of the Application
+        :return: layer, None by default
+        """
+        return None
+
+    def get_experimentgroup(self, application, experiment, clientname=None):
+        """
+        Returns ExperimentGroup of given Experiment Client is assigned to. By default ExperimentGroup is chosen randomly
+        :param application: Application, or its ApplicationSnapshot, where experiment belongs to
+        :param experiment: Experiment returned by get_experiments
+        :param clientname: name of the Client ExperimentGroup is fetched for
+        :return: ExperimentGroup. Raises IndexError if experiment has no ExperimentGroups
+        """
+        return random.choice(list(experiment.experimentgroups))
@@ -1,50 +1,78 @@
-from .abstract_experiment_logic import AbstractExperimentLogic
-from .one_random_experiment import OneRandomExperiment
+from .abstract_experiment_logic import AbstractExperimentLogic, layer_order
+from .registry import registry
 
 
 class ExperimentLogicSelector(AbstractExperimentLogic):
     """
     Logic, which returns Experiments assigned by Application's experiment_distribution. ONLY THIS CLASS should be
-    imported outside experiment_logic-package.
+    imported outside experiment_logic-package. Logics come from the process-wide registry, so creating a selector is
+    cheap and logics are shared by every selector.
     """
-    def __init__(self):
+    DEFAULT = 'one_random'
+
+    def __init__(self, logic_registry=registry):
         """
-        Remember to add new ExperimentLogics to logics attribute! OneRandom logic is assigned as default.
+        New ExperimentLogics are registered in the registry, or by an entry point. OneRandom logic is the default.
+        :param logic_registry: ExperimentLogicRegistry logics are looked up from
         """
-        random = OneRandomExperiment()
-        self.logics = {random.get_name(): random.get_experiments}
-        self.default = random.get_experiments
+        self.registry = logic_registry
 
     def get_name(self):
         return 'logic_selector'
 
-    def get_experiments(self, application):
+    def get_logic(self, application):
         """
         If Application does not have a valid experiment_distribution, the selector returns the default ExperimentLogic.
         :param application:
         :return: Either Logic named by Application's experiment_distribution or the default Logic
         """
-        logic_name = application.experiment_distribution
-
-        try:
-            logic = self.logics[logic_name]
-            return logic(application)
-        except KeyError:
+        logic = self.registry.get_logic(application.experiment_distribution)
+        if logic is None:
             self.log_error('Application %s does not have a valid experiment_distribution. '
                            'Returning Experiments with default Experiment Logic' % application.name)
-            return self.default(application)
+            return self.registry.get_logic(self.DEFAULT)
+        return logic
+
+    def get_experiments(self, application, clientname=None):
+        """
+        Returns Experiments with Logic named by Application's experiment_distribution
+        :param application:
+        :param clientname: name of the Client Experiments are fetched for
+        :return: Experiments returned by the Logic
+        """
+        return self.get_logic(application).get_experiments(application, clientname)
+
+    def get_layers(self, application, experiments):
+        """
+        Returns layers of Experiments with Logic named by Application's experiment_distribution
+        :param application:
+        :param experiments: Experiments of the Application
+        :return: list of layers given by the Logic, in the same order as experiments
+        """
+        logic = self.get_logic(application)
+        return list(map(lambda _: logic.get_layer(application, _), experiments))
+
+    def get_experimentgroup(self, application, experiment, clientname=None):
+        """
+        Returns ExperimentGroup with Logic named by Application's experiment_distribution
+        :param application:
+        :param experiment: Experiment returned by get_experiments
+        :param clientname: name of the Client ExperimentGroup is fetched for
+        :return: ExperimentGroup returned by the Logic
+        """
+        return self.get_logic(application).get_experimentgroup(application, experiment, clientname)
 
     def get_valid_experiment_logics(self):
         """
-        Return all current experiment distributing strategies.
+        Return all current experiment distributing strategies. Logics which can not be loaded are left out.
         :return: Names of valid ExperimentLogics
         """
-        return list(self.logics.keys())
+        return list(filter(self.is_valid_experiment_logic, self.registry.get_names()))
 
     def is_valid_experiment_logic(self, logic_name):
         """
-        Checks if given logic_name is valid ExperimentLogic
+        Checks if given logic_name is valid ExperimentLogic. Registered logics which can not be loaded are invalid
         :param logic_name:
-        :return: True: such logic exists, False: given logic_name is invalid
+        :return: True: such logic exists and can be loaded, False: given logic_name is invalid
         """
-        return logic_name in self.logics.keys() or logic_name is None
+        return logic_name is None or self.registry.get_logic(logic_name) is not None
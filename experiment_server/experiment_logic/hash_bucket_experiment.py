@@ -0,0 +1,57 @@
+import hashlib
+from .abstract_experiment_logic import AbstractExperimentLogic
+
+
+def bucket(*parts):
+    """
+    Hashes given parts to a number. Unlike hash(), result is the same in every process and on every node
+    :param parts: values to hash, converted to strings
+    :return: integer between 0 and 2**64 - 1
+    """
+    digest = hashlib.sha1(':'.join(map(str, parts)).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class HashBucketExperiment(AbstractExperimentLogic):
+    """
+    Logic which assigns Client deterministically by hashing Application's apikey, Client's name and Experiment's id.
+    Same Client is always given the same Experiment and ExperimentGroup, so assignment can be recomputed on any node
+    without reading earlier assignments. This should NOT be called outside ExperimentLogicSelector
+    """
+    BUCKETS = 10000
+
+    def get_name(self):
+        return 'hash_bucket'
+
+    def get_experiments(self, application, clientname=None):
+        """
+        Returns one RUNNING experiment, chosen by highest hash of (apikey, clientname, experiment id). When an
+        Experiment starts or ends, only Clients of that Experiment change Experiment.
+        :param application: Application or its snapshot
+        :param clientname: name of the Client to assign
+        :return: returns an Experiment if successful, None if none running Experiments exist or clientname is missing
+        """
+        if clientname is None:
+            self.log_error('Can not assign Client without name on Application %s' % application.name)
+            return None
+
+        running_experiments = application.running_experiments()
+        if len(running_experiments) == 0:
+            self.log_error('Application %s has no running experiments' % application.name)
+            return None
+
+        return max(running_experiments, key=lambda _: (bucket(application.apikey, clientname, _.id), _.id))
+
+    def get_experimentgroup(self, application, experiment, clientname=None):
+        """
+        Returns ExperimentGroup by bucket of (apikey, clientname, experiment id). Buckets are split evenly to
+        Experiment's ExperimentGroups in order of their ids.
+        :param application: Application or its snapshot
+        :param experiment: Experiment returned by get_experiments
+        :param clientname: name of the Client to assign
+        :return: ExperimentGroup. Raises IndexError if experiment has no ExperimentGroups
+        """
+        experimentgroups = sorted(experiment.experimentgroups, key=lambda _: _.id)
+        client_bucket = bucket(application.apikey, clientname, experiment.id) % self.BUCKETS
+
+        return experimentgroups[client_bucket * len(experimentgroups) // self.BUCKETS]
@@ -0,0 +1,40 @@
+from .abstract_experiment_logic import layer_order
+from .hash_bucket_experiment import HashBucketExperiment, bucket
+
+
+class LayeredExperiment(HashBucketExperiment):
+    """
+    Logic which puts Client to one Experiment in every layer. Experiments of the same layer split Clients between
+    them, Experiments of different layers are orthogonal: each layer is hashed separately, so being in some Experiment
+    of one layer tells nothing about Experiments of other layers. Experiments without layer form one layer. Client
+    gets Configurations of all its ExperimentGroups in one response. This should NOT be called outside
+    ExperimentLogicSelector
+    """
+
+    def get_name(self):
+        return 'layered'
+
+    def get_layer(self, application, experiment):
+        return experiment.layer
+
+    def get_experiments(self, application, clientname=None):
+        """
+        Returns one RUNNING Experiment of every layer, chosen by highest hash of (apikey, clientname, layer,
+        experiment id)
+        :param application: Application or its snapshot
+        :param clientname: name of the Client to assign
+        :return: list of Experiments ordered by layer, None if none running Experiments exist or clientname is missing
+        """
+        if clientname is None:
+            self.log_error('Can not assign Client without name on Application %s' % application.name)
+            return None
+
+        layers = {}
+        for experiment in application.running_experiments():
+            layers.setdefault(experiment.layer, []).append(experiment)
+        if len(layers) == 0:
+            self.log_error('Application %s has no running experiments' % application.name)
+            return None
+
+        return list(map(lambda layer: max(layers[layer], key=lambda _: (
+            bucket(application.apikey, clientname, layer, _.id), _.id)), sorted(layers, key=layer_order)))
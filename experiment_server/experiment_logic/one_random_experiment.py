@@ -1,6 +1,5 @@
 import random
 from .abstract_experiment_logic import AbstractExperimentLogic
-from ..models import (Application, Experiment)
 
 
 class OneRandomExperiment(AbstractExperimentLogic):
@@ -11,16 +10,14 @@ class OneRandomExperiment(AbstractExperimentLogic):
     def get_name(self):
         return 'one_random'
 
-    def get_experiments(self, application):
+    def get_experiments(self, application, clientname=None):
         """
         Returns one random, RUNNING experiment. Fails if none exists
-        :param application:
+        :param application: Application or its snapshot
+        :param clientname: not used
         :return: returns an Experiment if successful, None if none running Experiments exist
         """
-        experiments = Experiment.query().join(Application) \
-            .filter(Application.id == application.id)
-
-        running_experiments = list(filter(lambda _: _.get_status() == 'running', experiments))
+        running_experiments = application.running_experiments()
 
         try:
             return random.choice(running_experiments)
@@ -0,0 +1,95 @@
+import threading
+
+import pkg_resources
+
+from .abstract_experiment_logic import AbstractExperimentLogic
+
+"""
+Process-wide registry of ExperimentLogics. Logics are found by name from the experiment_server.experiment_logics
+entry point group, so other packages can ship their own logics:
+
+    entry_points={'experiment_server.experiment_logics': ['my_logic = my_package.logics:MyLogic']}
+
+Logics of this package are always registered, even if the package has not been installed. A logic's module is
+imported when an Application first uses the logic, and the same instance then serves every later request.
+"""
+
+ENTRY_POINT_GROUP = 'experiment_server.experiment_logics'
+
+BUILTIN_LOGICS = [
+    'one_random = experiment_server.experiment_logic.one_random_experiment:OneRandomExperiment',
+    'hash_bucket = experiment_server.experiment_logic.hash_bucket_experiment:HashBucketExperiment',
+    'weighted = experiment_server.experiment_logic.weighted_experiment:WeightedExperiment',
+    'layered = experiment_server.experiment_logic.layered_experiment:LayeredExperiment',
+    'thompson_sampling = experiment_server.experiment_logic.thompson_sampling_experiment:ThompsonSamplingExperiment'
+]
+
+
+class ExperimentLogicRegistry:
+    def __init__(self, group=ENTRY_POINT_GROUP):
+        """
+        :param group: entry point group logics are discovered from
+        """
+        self.group = group
+        self._lock = threading.Lock()
+        self._entry_points = None
+        self._logics = {}
+        self._failed = set()
+
+    def get_entry_points(self):
+        """
+        Discovers entry points on first use. Does not import any logic
+        :return: dictionary from logic's name to its EntryPoint
+        """
+        if self._entry_points is None:
+            entry_points = dict(map(lambda _: (_.name, _), map(pkg_resources.EntryPoint.parse, BUILTIN_LOGICS)))
+            entry_points.update(map(lambda _: (_.name, _), pkg_resources.iter_entry_points(self.group)))
+            self._entry_points = entry_points
+        return self._entry_points
+
+    def register(self, name, target):
+        """
+        Registers a logic without an entry point, e.g. from tests
+        :param name: name Applications' experiment_distribution refers to
+        :param target: 'module:class' of the logic, imported on first use
+        """
+        with self._lock:
+            self.get_entry_points()[name] = pkg_resources.EntryPoint.parse('%s = %s' % (name, target))
+            self._logics.pop(name, None)
+            self._failed.discard(name)
+
+    def get_names(self):
+        """
+        :return: names of every registered logic
+        """
+        return list(self.get_entry_points().keys())
+
+    def get_logic(self, name):
+        """
+        Imports and instantiates a logic the first time it is asked for
+        :param name: logic's name
+        :return: ExperimentLogic, or None if no logic has given name or it can not be loaded
+        """
+        logic = self._logics.get(name)
+        if logic is not None or name in self._failed:
+            return logic
+        entry_point = self.get_entry_points().get(name)
+        if entry_point is None:
+            return None
+
+        with self._lock:
+            if name in self._logics:
+                return self._logics[name]
+            try:
+                logic = entry_point.resolve()()
+                if not isinstance(logic, AbstractExperimentLogic):
+                    raise TypeError('%s is not an ExperimentLogic' % entry_point)
+            except (ImportError, AttributeError, TypeError) as e:
+                AbstractExperimentLogic.log.error('Can not load ExperimentLogic %s: %s' % (name, e))
+                self._failed.add(name)
+                return None
+            self._logics[name] = logic
+        return logic
+
+
+registry = ExperimentLogicRegistry()
@@ -0,0 +1,37 @@
+import random
+from .one_random_experiment import OneRandomExperiment
+from experiment_server.utils.bandit_counts import get_counts
+
+
+class ThompsonSamplingExperiment(OneRandomExperiment):
+    """
+    Bandit logic which assigns Client to a random running Experiment, and to the ExperimentGroup whose draw from
+    Beta(1 + successes, 1 + failures) of its rewards is highest. ExperimentGroups with better rewards get more new
+    Clients, while ExperimentGroups with few rewards are still explored. Counts are read from the in-memory bandit
+    counts, never from DataItems. This should NOT be called outside ExperimentLogicSelector
+    """
+
+    def get_name(self):
+        return 'thompson_sampling'
+
+    def sample(self, experimentgroup):
+        """
+        :param experimentgroup: ExperimentGroup or its snapshot
+        :return: draw from Beta-distribution of ExperimentGroup's rewards
+        """
+        successes, trials = get_counts(experimentgroup.id)
+        return random.betavariate(1 + successes, 1 + trials - successes)
+
+    def get_experimentgroup(self, application, experiment, clientname=None):
+        """
+        Returns ExperimentGroup of given Experiment with highest draw
+        :param application: Application or its snapshot
+        :param experiment: Experiment returned by get_experiments
+        :param clientname: not used
+        :return: ExperimentGroup. Raises IndexError if experiment has no ExperimentGroups
+        """
+        experimentgroups = list(experiment.experimentgroups)
+        if len(experimentgroups) == 0:
+            raise IndexError('Experiment %s has no ExperimentGroups' % experiment.id)
+
+        return max(experimentgroups, key=self.sample)
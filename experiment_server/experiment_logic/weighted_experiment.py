@@ -0,0 +1,104 @@
+import random
+from repoze.lru import LRUCache
+from .abstract_experiment_logic import AbstractExperimentLogic
+
+
+class AliasTable(object):
+    """
+    Vose's alias method: after building the table in O(n), every draw of an index with probability proportional to its
+    weight costs one random number and O(1) time.
+    """
+    def __init__(self, weights):
+        """
+        :param weights: non-negative weights, at least one of them positive
+        """
+        count = len(weights)
+        total = float(sum(weights))
+        if count == 0 or total <= 0:
+            raise ValueError('AliasTable needs a positive weight')
+
+        scaled = list(map(lambda _: _ * count / total, weights))
+        self.probabilities = [1.0] * count
+        self.aliases = list(range(count))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while len(small) > 0 and len(large) > 0:
+            less = small.pop()
+            more = large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Whatever is left has probability 1 within rounding errors
+
+    def sample(self, rng=random):
+        """
+        :param rng: source of random numbers
+        :return: index of drawn weight
+        """
+        position = rng.random() * len(self.probabilities)
+        column = int(position)
+        if position - column < self.probabilities[column]:
+            return column
+        return self.aliases[column]
+
+
+def get_weight(item):
+    # Weight is set by the database, so Experiments and ExperimentGroups which have not been saved have none
+    return item.weight if item.weight is not None else 1.0
+
+
+class WeightedExperiment(AbstractExperimentLogic):
+    """
+    Logic which assigns Client to a running Experiment, and to an ExperimentGroup of it, randomly in proportion to their
+    weights. Weights 9 and 1 split Clients 90/10, weights 99 and 1 give a 1% canary. Alias tables are cached by ids
+    and weights of the sampled Experiments or ExperimentGroups, so they are rebuilt only when either changes and the
+    cache holds no Applications or snapshots. This should NOT be called outside ExperimentLogicSelector
+    """
+    _tables = LRUCache(1000)
+
+    def get_name(self):
+        return 'weighted'
+
+    def get_alias_table(self, items):
+        """
+        :param items: Experiments or ExperimentGroups
+        :return: AliasTable of their weights, in the same order
+        """
+        key = tuple(map(lambda _: (_.id, get_weight(_)), items))
+        table = self._tables.get(key)
+        if table is None:
+            table = AliasTable(list(map(lambda _: _[1], key)))
+            self._tables.put(key, table)
+        return table
+
+    def get_experiments(self, application, clientname=None):
+        """
+        Returns one RUNNING Experiment, drawn by Experiments' weights
+        :param application: Application or its snapshot
+        :param clientname: not used
+        :return: returns an Experiment if successful, None if no running Experiment has positive weight
+        """
+        running_experiments = application.running_experiments()
+        try:
+            return running_experiments[self.get_alias_table(running_experiments).sample()]
+        except ValueError as e:
+            self.log_error('Application %s has no running experiments with positive weight' % application.name)
+            return None
+
+    def get_experimentgroup(self, application, experiment, clientname=None):
+        """
+        Returns ExperimentGroup of given Experiment, drawn by ExperimentGroups' weights
+        :param application: Application or its snapshot
+        :param experiment: Experiment returned by get_experiments
+        :param clientname: not used
+        :return: ExperimentGroup. Raises IndexError if experiment has no ExperimentGroups with positive weight
+        """
+        experimentgroups = experiment.experimentgroups
+        try:
+            return experimentgroups[self.get_alias_table(experimentgroups).sample()]
+        except ValueError as e:
+            raise IndexError('Experiment %s has no ExperimentGroups with positive weight' % experiment.id)
@@ -7,6 +7,8 @@ import zope.sqlalchemy
 from experiment_server.models.experiments import Experiment
 from experiment_server.models.clients import Client
 from experiment_server.models.dataitems import DataItem
+from experiment_server.models.dataitemsummaries import DataItemSummary
+from experiment_server.models.banditarms import BanditArm
 from experiment_server.models.experimentgroups import ExperimentGroup
 from experiment_server.models.configurations import Configuration
 from experiment_server.models.applications import Application
@@ -1,13 +1,17 @@
 """ This is a database-schema """
 from sqlalchemy import (
     Column,
+    Float,
     Integer,
     Text,
     UniqueConstraint
 )
 
+import datetime
+
 from sqlalchemy.orm import relationship
 from .meta import Base
+from .experiments import Experiment
 
 
 class Application(Base):
@@ -20,6 +24,8 @@ class Application(Base):
     apikey: identifier to Application, which is required when Client is accessing via Api
     experimentDistribution: strategy on how Clients are distributed in Experiments. Valid experiment distribution
     strategies can be found at experiment_server/experiment_logic
+    rate_limit: requests per second allowed to the apikey on the client API. None for the server's default
+    rate_burst: requests the apikey may make at once after being idle. None for the server's default
     experiments: Application's experiments
     configurationkeys: ConfigurationKeys which are allowed to be used in experiments
     """
@@ -28,9 +34,24 @@ class Application(Base):
     name = Column(Text, nullable=False)
     apikey = Column(Text, unique=True)
     experiment_distribution = Column(Text)
+    rate_limit = Column(Float)
+    rate_burst = Column(Integer)
     experiments = relationship("Experiment", backref="application", cascade="delete")
-    configurationkeys = relationship("ConfigurationKey", backref="application", cascade="delete")
+    configurationkeys = relationship("ConfigurationKey", backref="application", cascade="delete",
+                                     order_by="ConfigurationKey.id")
 
     def as_dict(self):
         """ transfer data to dictionary """
         return {col.name: getattr(self, col.name) for col in self.__table__.columns}
+
+    def running_experiments(self, timestamp=None):
+        """
+        Experiments which are running at given time
+        :param timestamp: defaults to current time
+        :return: list of Experiments
+        """
+        if self.id is None:
+            return []
+        if timestamp is None:
+            timestamp = datetime.datetime.now()
+        return Experiment.running_at(timestamp).filter(Experiment.application_id == self.id).all()
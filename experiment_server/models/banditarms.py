@@ -0,0 +1,80 @@
+""" This is a database-schema """
+from sqlalchemy import (
+    Column,
+    Integer,
+    Float,
+    ForeignKey,
+    bindparam,
+    select,
+    text
+)
+from .meta import Base
+import experiment_server.database.orm as orm_config
+
+_upsert_postgresql = text(
+    'INSERT INTO banditarms (experimentgroup_id, successes, trials) '
+    'SELECT id, CAST(:successes AS FLOAT), CAST(:trials AS FLOAT) FROM experimentgroups WHERE id = :experimentgroup_id '
+    'ON CONFLICT (experimentgroup_id) DO UPDATE '
+    'SET successes = banditarms.successes + excluded.successes, trials = banditarms.trials + excluded.trials'
+)
+_insert_ignore_sqlite = text(
+    'INSERT OR IGNORE INTO banditarms (experimentgroup_id, successes, trials) '
+    'SELECT id, 0, 0 FROM experimentgroups WHERE id = :experimentgroup_id'
+)
+
+
+class BanditArm(Base):
+    """
+    This is definition of class BanditArm.
+    BanditArm holds checkpointed reward counts of one ExperimentGroup for the bandit ExperimentLogic: how many rewards
+    Clients of the ExperimentGroup have sent, and the sum of them as successes. Counts are kept in memory by every
+    process and only the increments are added here, so processes do not overwrite each other's counts.
+    """
+    __tablename__ = 'banditarms'
+    experimentgroup_id = Column(Integer, ForeignKey('experimentgroups.id'), primary_key=True)
+    successes = Column(Float, nullable=False, default=0.0)
+    trials = Column(Float, nullable=False, default=0.0)
+
+    def as_dict(self):
+        """ Transfer data to dictionary """
+        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+
+    @classmethod
+    def add_counts(cls, counts, connection=None):
+        """
+        Adds increments to counts with an upsert, so processes adding counts of a new ExperimentGroup at the same time
+        do not conflict. PostgreSQL upserts with ON CONFLICT DO UPDATE, other databases insert empty counts if there
+        are none and then update them. Increments of ExperimentGroups which have been deleted are dropped.
+        :param counts: dictionary from ExperimentGroup id to (successes, trials)
+        :param connection: connection to write with. Defaults to DBSession
+        """
+        if len(counts) == 0:
+            return
+        executor = connection if connection is not None else orm_config.DBSession
+        bind = connection if connection is not None else orm_config.DBSession.get_bind()
+        table = cls.__table__
+        rows = list(map(lambda _: {'experimentgroup_id': _[0], 'successes': _[1][0], 'trials': _[1][1]},
+                        sorted(counts.items())))
+        if bind.dialect.name == 'postgresql':
+            executor.execute(_upsert_postgresql, rows)
+            return
+        executor.execute(_insert_ignore_sqlite, list(map(lambda _: {'experimentgroup_id': _['experimentgroup_id']},
+                                                        rows)))
+        # Names of bound parameters must differ from updated columns
+        executor.execute(table.update()
+                         .where(table.c.experimentgroup_id == bindparam('group_id'))
+                         .values(successes=table.c.successes + bindparam('added_successes'),
+                                 trials=table.c.trials + bindparam('added_trials')),
+                         list(map(lambda _: {'group_id': _['experimentgroup_id'], 'added_successes': _['successes'],
+                                             'added_trials': _['trials']}, rows)))
+
+    @classmethod
+    def load_counts(cls, connection=None):
+        """
+        :param connection: connection to read with. Defaults to DBSession
+        :return: dictionary from ExperimentGroup id to (successes, trials)
+        """
+        executor = connection if connection is not None else orm_config.DBSession
+        table = cls.__table__
+        rows = executor.execute(select([table.c.experimentgroup_id, table.c.successes, table.c.trials]))
+        return {row.experimentgroup_id: (row.successes, row.trials) for row in rows}
@@ -3,12 +3,21 @@ from sqlalchemy import (
     Column,
     Integer,
     Text,
+    text
 )
 
 from sqlalchemy import and_
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 from .meta import Base
 from .clients_experimentgroups import clients_experimentgroups
+import experiment_server.database.orm as orm_config
+
+# Inserts Client unless clientname is taken, and returns id of the inserted or the existing Client
+_upsert_postgresql = text(
+    'WITH inserted AS ('
+    ' INSERT INTO clients (clientname) VALUES (:clientname) ON CONFLICT (clientname) DO NOTHING RETURNING id) '
+    'SELECT id FROM inserted UNION ALL SELECT id FROM clients WHERE clientname = :clientname LIMIT 1')
 
 
 class Client(Base):
@@ -28,6 +37,36 @@ class Client(Base):
         back_populates="clients"
     )
 
+    @classmethod
+    def get_or_create(cls, clientname):
+        """
+        Finds Client by clientname, or creates it, without racing with other requests doing the same. On PostgreSQL
+        this is a single INSERT ... ON CONFLICT DO NOTHING, on SQLite an INSERT OR IGNORE followed by a SELECT.
+        :param clientname: Client's clientname
+        :return: Client
+        """
+        table = cls.__table__
+        session = orm_config.DBSession
+        if session.get_bind().dialect.name == 'postgresql':
+            client_id = session.execute(_upsert_postgresql, {'clientname': clientname}).scalar()
+            if client_id is None:
+                # Client was inserted by a transaction which committed after this statement started
+                client_id = session.execute(table.select().with_only_columns([table.c.id])
+                                            .where(table.c.clientname == clientname)).scalar()
+        else:
+            session.execute(table.insert().prefix_with('OR IGNORE').values(clientname=clientname))
+            client_id = session.execute(table.select().with_only_columns([table.c.id])
+                                        .where(table.c.clientname == clientname)).scalar()
+
+        client = session.identity_map.get(identity_key(cls, client_id))
+        if client is None:
+            # Id and clientname are already known, so the Client is not read again. Its relationships are loaded
+            # on first use
+            client = cls(id=client_id, clientname=clientname)
+            make_transient_to_detached(client)
+            session.add(client)
+        return client
+
     def as_dict(self):
         """ Transfer data to dictionary """
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
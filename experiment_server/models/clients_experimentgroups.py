@@ -6,13 +6,17 @@ from sqlalchemy import (
     Column,
     Integer,
     ForeignKey,
+    Index,
     Table
 )
 
 from .meta import Base
 
+# Primary key (client_id, experimentgroup_id) supports looking up Client's ExperimentGroups, the index supports looking
+# up ExperimentGroup's Clients
 clients_experimentgroups = Table('clients_experimentgroups', Base.metadata,
-                               Column('client_id', Integer, ForeignKey('clients.id')),
+                               Column('client_id', Integer, ForeignKey('clients.id'), primary_key=True),
                                Column('experimentgroup_id', Integer,
-                                      ForeignKey('experimentgroups.id'))
+                                      ForeignKey('experimentgroups.id'), primary_key=True),
+                               Index('ix_clients_experimentgroups_experimentgroup_id', 'experimentgroup_id')
                               )
@@ -27,7 +27,10 @@ class ConfigurationKey(Base):
     exclusionconstraints = relationship("ExclusionConstraint",
                                         primaryjoin="or_(ConfigurationKey.id==ExclusionConstraint.first_configurationkey_id,ConfigurationKey.id==ExclusionConstraint.second_configurationkey_id)",
                                         cascade="delete")
-    UniqueConstraint('name', 'application_id')
+    __table_args__ = (
+        # Also supports looking up Application's ConfigurationKey by name
+        UniqueConstraint('application_id', 'name', name='uq_configurationkeys_application_id_name'),
+    )
 
 
     def as_dict(self):
@@ -3,7 +3,8 @@ from sqlalchemy import (
     Column,
     Integer,
     Text,
-    ForeignKey
+    ForeignKey,
+    Index
 )
 
 from .meta import Base
@@ -24,6 +25,10 @@ class Configuration(Base):
     experimentgroup_id = Column(Integer, ForeignKey('experimentgroups.id'))
     key = Column(Text)
     value = Column(JSONType())
+    __table_args__ = (
+        # Supports looking up ExperimentGroup's Configuration by key
+        Index('ix_configurations_experimentgroup_id_key', 'experimentgroup_id', 'key'),
+    )
 
     def as_dict(self):
         """ transfer data to dictionary """
@@ -4,10 +4,15 @@ from sqlalchemy import (
     Integer,
     Text,
     ForeignKey,
-    DateTime
+    DateTime,
+    Index,
+    select
 )
+from sqlalchemy.dialects import postgresql
 from .meta import Base
 from .extension_types.sqltypes import JSONType
+from experiment_server.utils.timestamps import format_timestamp
+import experiment_server.database.orm as orm_config
 
 
 class DataItem(Base):
@@ -16,21 +21,83 @@ class DataItem(Base):
     DataItem holds Experiments' data given by the Clients, who have been using Application which is being tested. Be
     very careful not to delete DataItems accidentally, since they might hold important data to the user.
     This Experiment-Server does not intervene to the contents of Key and Value. They are on users' responsibility.
+    Timestamps are stored in UTC. Event_id is an optional id given by the Client, so that retried posts of the same
+    DataItem are saved once. It is unique per Client.
     """
     __tablename__ = 'dataitems'
     id = Column(Integer, primary_key=True)
-    client_id = Column(Integer, ForeignKey('clients.id'))
+    client_id = Column(Integer, ForeignKey('clients.id'), index=True)
     key = Column(Text)
     value = Column(JSONType())
-    startDatetime = Column(DateTime)
-    endDatetime = Column(DateTime)
+    startDatetime = Column(DateTime(timezone=True))
+    endDatetime = Column(DateTime(timezone=True))
+    event_id = Column(Text)
+    __table_args__ = (
+        Index('uq_dataitems_client_id_event_id', 'client_id', 'event_id', unique=True),
+    )
 
     def as_dict(self):
         """ Transfer data to dictionary """
         result = {}
         for c in self.__table__.columns:
             if c.name == 'startDatetime' or c.name == 'endDatetime':
-                result[c.name] = str(getattr(self, c.name))
+                result[c.name] = format_timestamp(getattr(self, c.name))
             else:
                 result[c.name] = getattr(self, c.name)
-        return result
\ No newline at end of file
+        return result
+
+    @classmethod
+    def insert_rows(cls, rows, connection=None):
+        """
+        Inserts many rows. Rows whose Client already has a DataItem with the same event_id are skipped instead of
+        failing the whole insert. PostgreSQL inserts all rows with one INSERT ... ON CONFLICT DO NOTHING RETURNING.
+        Other databases insert rows without event_id with a single executemany, and others one at a time with INSERT
+        OR IGNORE, to see which of them were skipped.
+        :param rows: list of dictionaries from column names to values
+        :param connection: connection to write with. Defaults to DBSession
+        :return: list of given rows which were inserted, in the same order
+        """
+        if len(rows) == 0:
+            return []
+        executor = connection if connection is not None else orm_config.DBSession
+        bind = connection if connection is not None else orm_config.DBSession.get_bind()
+        table = cls.__table__
+        if bind.dialect.name == 'postgresql':
+            # Multi-row VALUES needs every column in every row
+            inserted = set(map(tuple, executor.execute(
+                postgresql.insert(table)
+                .values(list(map(lambda _: dict({'event_id': None}, **_), rows)))
+                .on_conflict_do_nothing(index_elements=['client_id', 'event_id'])
+                .returning(table.c.client_id, table.c.event_id))))
+            result = []
+            for row in rows:
+                key = (row['client_id'], row.get('event_id'))
+                if key[1] is None or key in inserted:
+                    inserted.discard(key)
+                    result.append(row)
+            return result
+
+        unkeyed = list(filter(lambda _: _.get('event_id') is None, rows))
+        if len(unkeyed) > 0:
+            executor.execute(table.insert(), unkeyed)
+        statement = table.insert().prefix_with('OR IGNORE')
+        inserted = set(map(id, filter(lambda _: _.get('event_id') is not None and
+                                      executor.execute(statement, _).rowcount == 1, rows)))
+        return list(filter(lambda _: _.get('event_id') is None or id(_) in inserted, rows))
+
+    @classmethod
+    def find_event_ids(cls, keys, connection=None):
+        """
+        :param keys: iterable of (client_id, event_id)
+        :param connection: connection to read with. Defaults to DBSession
+        :return: set of given (client_id, event_id) which have been saved
+        """
+        keys = set(keys)
+        if len(keys) == 0:
+            return set()
+        executor = connection if connection is not None else orm_config.DBSession
+        table = cls.__table__
+        rows = executor.execute(select([table.c.client_id, table.c.event_id])
+                                .where(table.c.client_id.in_(set(map(lambda _: _[0], keys))))
+                                .where(table.c.event_id.in_(set(map(lambda _: _[1], keys)))))
+        return keys.intersection(map(tuple, rows))
@@ -0,0 +1,110 @@
+""" This is a database-schema """
+from sqlalchemy import (
+    Column,
+    Integer,
+    Float,
+    Text,
+    ForeignKey,
+    case,
+    text
+)
+from .meta import Base
+import experiment_server.database.orm as orm_config
+
+_upsert_postgresql = text(
+    'INSERT INTO dataitemsummaries (experimentgroup_id, key, count, sum, sum_of_squares, min, max) '
+    'VALUES (:experimentgroup_id, :key, :count, :sum, :sum_of_squares, :min, :max) '
+    'ON CONFLICT (experimentgroup_id, key) DO UPDATE SET '
+    'count = dataitemsummaries.count + excluded.count, sum = dataitemsummaries.sum + excluded.sum, '
+    'sum_of_squares = dataitemsummaries.sum_of_squares + excluded.sum_of_squares, '
+    'min = LEAST(dataitemsummaries.min, excluded.min), max = GREATEST(dataitemsummaries.max, excluded.max)'
+)
+
+
+def is_numeric(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def summarize(dataitems):
+    """
+    Combines numeric values of DataItems by ExperimentGroup and key
+    :param dataitems: iterable of (experimentgroup_ids, key, value)
+    :return: dictionary from (experimentgroup_id, key) to dictionary with count, sum, sum_of_squares, min and max
+    """
+    summaries = {}
+    for experimentgroup_ids, key, value in dataitems:
+        if not is_numeric(value):
+            continue
+        for experimentgroup_id in experimentgroup_ids:
+            summary = summaries.get((experimentgroup_id, key))
+            if summary is None:
+                summaries[(experimentgroup_id, key)] = {'count': 1, 'sum': value, 'sum_of_squares': value * value,
+                                                        'min': value, 'max': value}
+            else:
+                summary['count'] += 1
+                summary['sum'] += value
+                summary['sum_of_squares'] += value * value
+                summary['min'] = min(summary['min'], value)
+                summary['max'] = max(summary['max'], value)
+    return summaries
+
+
+class DataItemSummary(Base):
+    """
+    This is definition of class DataItemSummary.
+    DataItemSummary holds aggregates of numeric values of DataItems with the same key, sent by Clients of one
+    ExperimentGroup. Summaries are updated when DataItems are saved, so results of an Experiment can be read without
+    reading its DataItems. Non-numeric values are not summarized.
+    """
+    __tablename__ = 'dataitemsummaries'
+    experimentgroup_id = Column(Integer, ForeignKey('experimentgroups.id'), primary_key=True)
+    key = Column(Text, primary_key=True)
+    count = Column(Integer, nullable=False)
+    sum = Column(Float, nullable=False)
+    sum_of_squares = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+
+    def as_dict(self):
+        """ Transfer data to dictionary. Includes mean and variance of the values """
+        result = {c.name: getattr(self, c.name) for c in self.__table__.columns}
+        mean = self.sum / self.count
+        result['mean'] = mean
+        result['variance'] = max(self.sum_of_squares / self.count - mean * mean, 0.0)
+        return result
+
+    @classmethod
+    def add_dataitems(cls, dataitems, connection=None):
+        """
+        Adds values of DataItems to summaries with an upsert, so first DataItems of a (ExperimentGroup, key) saved at
+        the same time do not conflict. PostgreSQL upserts every summary with ON CONFLICT DO UPDATE. Other databases
+        try INSERT OR IGNORE first and UPDATE if the summary already existed, which is safe since they lock the whole
+        database for writing.
+        :param dataitems: iterable of (experimentgroup_ids, key, value), where experimentgroup_ids are the
+        ExperimentGroups DataItem's Client is in
+        :param connection: connection to write with. Defaults to DBSession
+        """
+        executor = connection if connection is not None else orm_config.DBSession
+        bind = connection if connection is not None else orm_config.DBSession.get_bind()
+        table = cls.__table__
+        summaries = sorted(summarize(dataitems).items())
+        if len(summaries) == 0:
+            return
+        if bind.dialect.name == 'postgresql':
+            executor.execute(_upsert_postgresql, list(map(
+                lambda _: dict(_[1], experimentgroup_id=_[0][0], key=_[0][1]), summaries)))
+            return
+        for (experimentgroup_id, key), summary in summaries:
+            result = executor.execute(table.insert().prefix_with('OR IGNORE')
+                                      .values(experimentgroup_id=experimentgroup_id, key=key, **summary))
+            if result.rowcount > 0:
+                continue
+            executor.execute(
+                table.update()
+                .where(table.c.experimentgroup_id == experimentgroup_id)
+                .where(table.c.key == key)
+                .values(count=table.c.count + summary['count'],
+                        sum=table.c.sum + summary['sum'],
+                        sum_of_squares=table.c.sum_of_squares + summary['sum_of_squares'],
+                        min=case([(table.c.min > summary['min'], summary['min'])], else_=table.c.min),
+                        max=case([(table.c.max < summary['max'], summary['max'])], else_=table.c.max)))
@@ -2,6 +2,7 @@
 from sqlalchemy import (
     Column,
     Integer,
+    Float,
     Text,
     ForeignKey
 )
@@ -16,12 +17,16 @@ class ExperimentGroup(Base):
     This is definition of class ExperimentGroup.
     ExperimentGroups hold information of Experiments' Clients and Configurations. Through this object Clients receive
     their Configurations to participating Clients.
+    Weight is ExperimentGroup's share of Experiment's new Clients, used by weighted ExperimentLogic.
     """
     __tablename__ = 'experimentgroups'
     id = Column(Integer, primary_key=True)
     name = Column(Text)
     experiment_id = Column(Integer, ForeignKey('experiments.id'))
+    weight = Column(Float, nullable=False, default=1.0, server_default='1')
     configurations = relationship("Configuration", backref="experimentgroup", cascade="delete")
+    summaries = relationship("DataItemSummary", cascade="delete")
+    banditarm = relationship("BanditArm", uselist=False, cascade="delete")
     clients = relationship("Client",
                          secondary=clients_experimentgroups,
                          back_populates="experimentgroups"
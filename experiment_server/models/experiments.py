@@ -2,7 +2,9 @@
 from sqlalchemy import (
     Column,
     Integer,
+    Float,
     ForeignKey,
+    Index,
     Text,
     DateTime
 )
@@ -16,6 +18,9 @@ class Experiment(Base):
     This is definition of class Experiment.
     Experiment-object defines how long an experiment on Application is being run. On same Experiment, many
     ExperimentGroups can be set.
+    Weight is Experiment's share of new Clients relative to other running Experiments, used by weighted
+    ExperimentLogic.
+    Layer is used by layered ExperimentLogic: Client is in one Experiment of every layer at the same time.
     """
     __tablename__ = 'experiments'
     id = Column(Integer, primary_key=True)
@@ -23,7 +28,23 @@ class Experiment(Base):
     name = Column(Text, unique=True, index=True, nullable=False)
     startDatetime = Column(DateTime)
     endDatetime = Column(DateTime)
+    weight = Column(Float, nullable=False, default=1.0, server_default='1')
+    layer = Column(Text)
     experimentgroups = relationship("ExperimentGroup", backref="experiment", cascade="delete")
+    __table_args__ = (
+        # Supports looking up Application's Experiments running at some time, and all Application's Experiments
+        Index('ix_experiments_application_id_startDatetime_endDatetime',
+              'application_id', 'startDatetime', 'endDatetime'),
+    )
+
+    @classmethod
+    def running_at(cls, timestamp):
+        """
+        Query for Experiments running at given time. Filtering is done in the database.
+        Example: Experiment.running_at(datetime.datetime.now()).filter(Experiment.application_id == 1).all()
+        :param timestamp: time when Experiments must be running
+        """
+        return cls.query().filter(cls.startDatetime <= timestamp, timestamp <= cls.endDatetime)
 
     def as_dict(self):
         result = {}
@@ -7,9 +7,12 @@ def includeme(config):
     config.add_route('index', '/')
 
     config.add_route('events', '/events')
+    config.add_route('events_batch', '/events/batch')
+    config.add_route('events_stream', '/events/stream')
     config.add_route('configurations', '/configurations')
     config.add_route('logic', '/logic')
     config.add_route('operators', '/operators')
+    config.add_route('metrics', '/metrics')
 
     config.add_route('applications', '/applications')
     config.add_route('application', '/applications/{id}')
@@ -34,5 +37,6 @@ def includeme(config):
     config.add_route('clients_for_experiment', '/applications/{appid}/experiments/{expid}/clients')
     config.add_route('experimentgroups', '/applications/{appid}/experiments/{expid}/experimentgroups')
     config.add_route('experimentgroup', '/applications/{appid}/experiments/{expid}/experimentgroups/{expgroupid}')
+    config.add_route('experimentgroup_summary', '/applications/{appid}/experiments/{expid}/experimentgroups/{expgroupid}/summary')
     config.add_route('experimentgroup_configurations', '/applications/{appid}/experiments/{expid}/experimentgroups/{expgroupid}/configurations')
     config.add_route('experimentgroup_configuration', '/applications/{appid}/experiments/{expid}/experimentgroups/{expgroupid}/configurations/{confid}')
@@ -0,0 +1,348 @@
+import argparse
+import csv
+import datetime
+import io
+import random
+import sys
+import uuid
+
+from pyramid.paster import (
+    get_appsettings,
+    setup_logging,
+    )
+
+from sqlalchemy import func, select
+
+from ..models.meta import Base
+from ..models import get_engine
+from ..models import (Experiment, Client, DataItem, ExperimentGroup, Configuration,
+                      Application, ConfigurationKey, Operator, RangeConstraint, ExclusionConstraint,
+                      DataItemSummary, BanditArm)
+from ..models.clients_experimentgroups import clients_experimentgroups
+from ..utils.bandit_counts import count_rewards
+
+"""
+Generates large synthetic datasets, e.g. to reproduce production-sized databases for load testing and for checking
+query plans. Rows are generated lazily and loaded in chunks, one transaction per chunk: with COPY on PostgreSQL and
+with executemany on other databases. Existing rows are kept, since ids of generated rows continue from the largest
+existing ids. The same arguments and seed on the same database generate the same data.
+
+Every Application gets the same ConfigurationKeys, RangeConstraints and ExclusionConstraints as "Math Game" in
+initializedb. Its Experiments have overlapping time windows, so some of them have ended, some are running and some
+have not started yet; the first one is always running. Configurations of ExperimentGroups are valid by the
+constraints. DataItemSummaries and BanditArms are added from the generated DataItems in the same transactions as
+them, like saving DataItems adds them.
+"""
+
+CHUNK_SIZE = 10000
+
+OPERATORS = [
+    (1, '=', 'equals'),
+    (2, '<=', 'less or equal than'),
+    (3, '<', 'less than'),
+    (4, '>=', 'greater or equal than'),
+    (5, '>', 'greater than'),
+    (6, '!=', 'not equal'),
+    (7, '[]', 'inclusive'),
+    (8, '()', 'exclusive'),
+    (9, 'def', 'must define'),
+    (10, 'ndef', 'must not define'),
+]
+
+DATAITEM_KEYS = ['score', 'time', 'level', 'clicks', 'reward']
+
+
+def chunked(rows, size=None):
+    size = size or CHUNK_SIZE
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
+def copy_rows(connection, table, rows):
+    """
+    Loads rows with PostgreSQL's COPY. Values are converted by column types, like executemany would do.
+    """
+    columns = list(rows[0].keys())
+    processors = list(map(lambda _: table.c[_].type.bind_processor(connection.dialect), columns))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = []
+        for column, processor in zip(columns, processors):
+            value = row[column]
+            if processor is not None and value is not None:
+                value = processor(value)
+            values.append('\\N' if value is None else value)
+        writer.writerow(values)
+    buffer.seek(0)
+
+    cursor = connection.connection.cursor()
+    cursor.copy_expert('COPY %s (%s) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')'
+                       % (table.name, ', '.join(map(lambda _: '"%s"' % _, columns))), buffer)
+
+
+def insert_rows(engine, table, rows, on_chunk=None):
+    """
+    Loads rows in chunks, one transaction per chunk
+    :param engine: engine to write with
+    :param table: Table to write to
+    :param rows: iterable of dictionaries from column names to values. Every row must have the same columns
+    :param on_chunk: function called with the connection and every chunk after it is written, in the same transaction
+    :return: number of rows written
+    """
+    count = 0
+    for chunk in chunked(rows):
+        with engine.begin() as connection:
+            if engine.dialect.name == 'postgresql':
+                copy_rows(connection, table, chunk)
+            else:
+                connection.execute(table.insert(), chunk)
+            if on_chunk is not None:
+                on_chunk(connection, chunk)
+        count += len(chunk)
+    return count
+
+
+def next_id(engine, table):
+    with engine.connect() as connection:
+        return (connection.execute(select([func.max(table.c.id)])).scalar() or 0) + 1
+
+
+def reset_sequences(engine, tables):
+    """
+    Rows are loaded with explicit ids, which do not advance PostgreSQL's sequences
+    """
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as connection:
+        for table in tables:
+            connection.execute("SELECT setval(pg_get_serial_sequence('%s', 'id'), "
+                               "(SELECT COALESCE(MAX(id), 1) FROM %s))" % (table.name, table.name))
+
+
+def get_clientname(app_id, index):
+    return 'client-%s-%s' % (app_id, index)
+
+
+class GeneratedData:
+    """
+    What was generated. Benchmarks use it to build requests.
+    apikeys: apikeys of generated Applications
+    clients: dictionary from apikey to (Application's id, number of Clients). Names of Clients are given by
+    get_clientname(app_id, 0...number - 1)
+    """
+    def __init__(self):
+        self.apikeys = []
+        self.clients = {}
+
+    def get_clientname(self, apikey, index):
+        return get_clientname(self.clients[apikey][0], index)
+
+
+class Ids:
+    """ Next free id of every table with generated ids """
+    def __init__(self, engine, tables):
+        self.ids = {table.name: next_id(engine, table) for table in tables}
+
+    def take(self, table, count=1):
+        first = self.ids[table.name]
+        self.ids[table.name] += count
+        return first
+
+
+def generate_operators(engine):
+    with engine.connect() as connection:
+        if connection.execute(select([func.count()]).select_from(Operator.__table__)).scalar() > 0:
+            return
+    insert_rows(engine, Operator.__table__, map(lambda _: {'id': _[0], 'math_value': _[1], 'human_value': _[2]},
+                                                OPERATORS))
+
+
+def generate_configurationkeys(engine, ids, app_id):
+    """
+    Same ConfigurationKeys and constraints as "Math Game" has
+    """
+    confkey_id = ids.take(ConfigurationKey.__table__, 4)
+    highscore, difficulty, speed, theme = range(confkey_id, confkey_id + 4)
+    insert_rows(engine, ConfigurationKey.__table__, [
+        {'id': highscore, 'application_id': app_id, 'name': 'highscore', 'type': 'boolean'},
+        {'id': difficulty, 'application_id': app_id, 'name': 'difficulty', 'type': 'integer'},
+        {'id': speed, 'application_id': app_id, 'name': 'speed', 'type': 'float'},
+        {'id': theme, 'application_id': app_id, 'name': 'theme', 'type': 'string'}])
+    insert_rows(engine, RangeConstraint.__table__, [
+        {'configurationkey_id': difficulty, 'operator_id': 4, 'value': '1'},
+        {'configurationkey_id': difficulty, 'operator_id': 2, 'value': '5'},
+        {'configurationkey_id': speed, 'operator_id': 5, 'value': '0'}])
+    # If highscore is defined, difficulty must be at least 2
+    insert_rows(engine, ExclusionConstraint.__table__, [
+        {'first_configurationkey_id': highscore, 'first_operator_id': 9,
+         'first_value_a': None, 'first_value_b': None,
+         'second_configurationkey_id': difficulty, 'second_operator_id': 4,
+         'second_value_a': '2', 'second_value_b': None}])
+
+
+def generate_configurations(rng, expgroup_id):
+    yield {'experimentgroup_id': expgroup_id, 'key': 'highscore', 'value': rng.random() < 0.5}
+    yield {'experimentgroup_id': expgroup_id, 'key': 'difficulty', 'value': rng.randint(2, 5)}
+    yield {'experimentgroup_id': expgroup_id, 'key': 'speed', 'value': round(rng.uniform(0.5, 2.0), 2)}
+    yield {'experimentgroup_id': expgroup_id, 'key': 'theme', 'value': rng.choice(['light', 'dark'])}
+
+
+def generate_experiments(engine, ids, rng, app_id, experiments, experimentgroups, now):
+    """
+    :return: list of (Experiment's row, ids of its ExperimentGroups)
+    """
+    result = []
+    for i in range(experiments):
+        if i == 0:
+            start = now - datetime.timedelta(days=1)
+            end = now + datetime.timedelta(days=30)
+        else:
+            start = now + datetime.timedelta(days=rng.randint(-60, 30))
+            end = start + datetime.timedelta(days=rng.randint(7, 90))
+        exp_id = ids.take(Experiment.__table__)
+        expgroup_id = ids.take(ExperimentGroup.__table__, experimentgroups)
+        row = {'id': exp_id, 'name': 'Experiment %s' % exp_id, 'application_id': app_id,
+               'startDatetime': start, 'endDatetime': end}
+        result.append((row, list(range(expgroup_id, expgroup_id + experimentgroups))))
+
+    insert_rows(engine, Experiment.__table__, map(lambda _: _[0], result))
+    insert_rows(engine, ExperimentGroup.__table__, (
+        {'id': expgroup_id, 'name': 'Group %s' % chr(ord('A') + i % 26), 'experiment_id': row['id']}
+        for row, expgroup_ids in result for i, expgroup_id in enumerate(expgroup_ids)))
+    insert_rows(engine, Configuration.__table__, (
+        configuration for row, expgroup_ids in result for expgroup_id in expgroup_ids
+        for configuration in generate_configurations(rng, expgroup_id)))
+    return result
+
+
+def generate_memberships(rng, first_client_id, clients, memberships, experiments):
+    """
+    :return: dictionary from Client's id to ids of its ExperimentGroups
+    """
+    return {first_client_id + i: list(map(lambda _: rng.choice(_[1]),
+                                          rng.sample(experiments, min(memberships, len(experiments)))))
+            for i in range(clients)}
+
+
+def generate_dataitem_value(rng, key):
+    if key == 'time':
+        return round(rng.expovariate(1 / 30.0), 3)
+    if key == 'reward':
+        return rng.random() < 0.5
+    return rng.randint(0, 1000)
+
+
+def generate_dataitems(rng, first_client_id, clients, dataitems, experiments):
+    """
+    DataItems are sent during some Experiment of the Application, not necessarily the one their Client is in
+    """
+    for i in range(dataitems):
+        row = rng.choice(experiments)[0]
+        seconds = int((row['endDatetime'] - row['startDatetime']).total_seconds())
+        start = row['startDatetime'] + datetime.timedelta(seconds=rng.randrange(max(seconds, 1)))
+        key = rng.choice(DATAITEM_KEYS)
+        value = generate_dataitem_value(rng, key)
+        yield {'client_id': first_client_id + rng.randrange(clients), 'key': key, 'value': value,
+               'startDatetime': start, 'endDatetime': start + datetime.timedelta(seconds=rng.randint(1, 600))}
+
+
+def add_summaries(memberships, reward_key):
+    """
+    :param memberships: dictionary from Client's id to ids of its ExperimentGroups
+    :param reward_key: key of DataItems which are rewards of the bandit ExperimentLogic
+    :return: function which adds DataItemSummaries and BanditArms of a chunk of DataItems, for insert_rows
+    """
+    def on_chunk(connection, chunk):
+        dataitems = list(map(lambda _: (memberships[_['client_id']], _['key'], _['value']), chunk))
+        DataItemSummary.add_dataitems(dataitems, connection)
+        BanditArm.add_counts(count_rewards(dataitems, reward_key), connection)
+    return on_chunk
+
+
+def generate(engine, applications=1, experiments=4, experimentgroups=2, clients=1000, memberships=1,
+             dataitems=10000, random_seed=0, log=print, reward_key='reward'):
+    """
+    Generates Applications and everything under them.
+    :param engine: engine to write with
+    :param applications: number of Applications
+    :param experiments: number of Experiments per Application
+    :param experimentgroups: number of ExperimentGroups per Experiment
+    :param clients: number of Clients per Application
+    :param memberships: number of Experiments each Client is in. Client is in one ExperimentGroup of each
+    :param dataitems: number of DataItems per Application
+    :param random_seed: seed of the random generator
+    :param log: function to report progress with
+    :param reward_key: key of DataItems which are rewards of the bandit ExperimentLogic
+    :return: GeneratedData
+    """
+    rng = random.Random(random_seed)
+    now = datetime.datetime.now().replace(microsecond=0)
+    tables = [Application.__table__, ConfigurationKey.__table__, Experiment.__table__, ExperimentGroup.__table__,
+              Client.__table__]
+    ids = Ids(engine, tables)
+    result = GeneratedData()
+
+    generate_operators(engine)
+    for i in range(applications):
+        app_id = ids.take(Application.__table__)
+        apikey = str(uuid.UUID(int=rng.getrandbits(128) ^ app_id))
+        insert_rows(engine, Application.__table__, [{'id': app_id, 'name': 'Application %s' % app_id,
+                                                     'apikey': apikey}])
+        generate_configurationkeys(engine, ids, app_id)
+        generated_experiments = generate_experiments(engine, ids, rng, app_id, experiments, experimentgroups, now)
+        log('Application %s: %s Experiments, %s ExperimentGroups'
+            % (app_id, experiments, experiments * experimentgroups))
+
+        first_client_id = ids.take(Client.__table__, clients)
+        insert_rows(engine, Client.__table__, (
+            {'id': first_client_id + _, 'clientname': get_clientname(app_id, _)} for _ in range(clients)))
+        generated_memberships = generate_memberships(rng, first_client_id, clients, memberships,
+                                                     generated_experiments)
+        count = insert_rows(engine, clients_experimentgroups, (
+            {'client_id': client_id, 'experimentgroup_id': expgroup_id}
+            for client_id, expgroup_ids in generated_memberships.items() for expgroup_id in expgroup_ids))
+        log('Application %s: %s Clients, %s memberships' % (app_id, clients, count))
+
+        if clients > 0 and experiments > 0:
+            count = insert_rows(engine, DataItem.__table__,
+                                generate_dataitems(rng, first_client_id, clients, dataitems, generated_experiments),
+                                add_summaries(generated_memberships, reward_key))
+            log('Application %s: %s DataItems' % (app_id, count))
+
+        result.apikeys.append(apikey)
+        result.clients[apikey] = (app_id, clients)
+
+    reset_sequences(engine, tables + [Configuration.__table__, RangeConstraint.__table__,
+                                      ExclusionConstraint.__table__, DataItem.__table__])
+    return result
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description='Generate synthetic data to the database of a configuration file')
+    parser.add_argument('config_uri', help='configuration file, e.g. development.ini')
+    parser.add_argument('--applications', type=int, default=1, help='Applications to generate')
+    parser.add_argument('--experiments', type=int, default=4, help='Experiments per Application')
+    parser.add_argument('--experimentgroups', type=int, default=2, help='ExperimentGroups per Experiment')
+    parser.add_argument('--clients', type=int, default=1000, help='Clients per Application')
+    parser.add_argument('--memberships', type=int, default=1, help='Experiments each Client is in')
+    parser.add_argument('--dataitems', type=int, default=10000, help='DataItems per Application')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args(argv[1:])
+
+    setup_logging(args.config_uri)
+    settings = get_appsettings(args.config_uri)
+    engine = get_engine(settings)
+    Base.metadata.create_all(engine)
+
+    generated = generate(engine, args.applications, args.experiments, args.experimentgroups, args.clients,
+                         args.memberships, args.dataitems, args.seed,
+                         reward_key=settings.get('experiment_server.bandit_reward_key', 'reward'))
+    for apikey in generated.apikeys:
+        print('Application %s: apikey %s' % (generated.clients[apikey][0], apikey))
@@ -2,6 +2,8 @@ import os
 import sys
 import transaction
 
+from alembic import command
+from alembic.config import Config
 from pyramid.paster import (
     get_appsettings,
     setup_logging,
@@ -39,6 +41,10 @@ def main(argv=sys.argv):
 
     engine = get_engine(settings)
     Base.metadata.create_all(engine)
+    # Tables created from the models are up to date with every migration
+    alembic_config = Config(config_uri)
+    alembic_config.attributes['settings'] = settings
+    command.stamp(alembic_config, 'head')
 
     session_factory = get_session_factory(engine)
 
@@ -31,6 +31,25 @@ class BaseTest(unittest.TestCase):
         import experiment_server.database.orm as orm_config
         orm_config.DBSession = self.dbsession
 
+        from experiment_server.utils.apikeys import clear_application_records
+        clear_application_records()
+        from experiment_server.utils.memberships import clear_memberships
+        clear_memberships()
+        from experiment_server.utils.snapshots import clear_application_snapshots
+        clear_application_snapshots()
+        from experiment_server.utils.configuration_tools import clear_constraints
+        clear_constraints()
+        from experiment_server.utils.event_dedup import clear_event_dedup
+        clear_event_dedup()
+        from experiment_server.utils.bandit_counts import clear_bandit_counts
+        clear_bandit_counts()
+        from experiment_server.utils.rate_limits import clear_rate_limits
+        clear_rate_limits()
+        from experiment_server.utils.admission import set_limiters
+        set_limiters({})
+        import experiment_server.utils.event_buffer as event_buffer
+        event_buffer.buffer = None
+
     def init_database(self):
         from experiment_server.models.meta import Base
         Base.metadata.create_all(self.engine)
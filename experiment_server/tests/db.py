@@ -8,6 +8,7 @@ from experiment_server.models.experiments import Experiment
 from experiment_server.models.clients import Client
 from experiment_server.models.dataitems import DataItem
 from experiment_server.models.configurations import Configuration
+from experiment_server.utils.timestamps import parse_timestamp
 
 
 
@@ -225,8 +226,8 @@ class DatabaseInterface:
         client = data['client']
         value = data['value']
         key = data['key']
-        start_datetime = datetime.datetime.strptime(data['startDatetime'], "%Y-%m-%d %H:%M:%S")
-        end_datetime = datetime.datetime.strptime(data['endDatetime'], "%Y-%m-%d %H:%M:%S")
+        start_datetime = parse_timestamp(data['startDatetime'])
+        end_datetime = parse_timestamp(data['endDatetime'])
         dataitem = DataItem(
             value=value,
             key=key,
@@ -1,7 +1,18 @@
+import datetime
+import pytest
 from ..base_test import BaseTest
-from experiment_server.models.applications import Application
+from experiment_server.models import (Application, Client, Configuration, ConfigurationKey, Experiment, ExperimentGroup)
 from experiment_server.experiment_logic.experiment_logic_selector import ExperimentLogicSelector
+from experiment_server.experiment_logic.registry import (ExperimentLogicRegistry, registry)
 from experiment_server.experiment_logic.one_random_experiment import OneRandomExperiment
+from experiment_server.experiment_logic.hash_bucket_experiment import HashBucketExperiment
+from experiment_server.experiment_logic.weighted_experiment import (AliasTable, WeightedExperiment)
+from experiment_server.experiment_logic.layered_experiment import LayeredExperiment
+from experiment_server.experiment_logic.thompson_sampling_experiment import ThompsonSamplingExperiment
+from experiment_server.utils.bandit_counts import add_rewards
+from experiment_server.utils.snapshots import (get_application_snapshot, invalidate_application_snapshots)
+from experiment_server.views.clients import Clients
+from experiment_server.views.configurations import Configurations
 
 
 class TestExperimentLogic(BaseTest):
@@ -43,3 +54,344 @@ class TestExperimentLogic(BaseTest):
 
         assert logic_selector.get_experiments(app) in app.experiments
 
+
+
+class TestHashBucketExperiment(BaseTest):
+
+    def setUp(self):
+        super(TestHashBucketExperiment, self).setUp()
+        self.init_database()
+        self.init_databaseData()
+
+        now = datetime.datetime.now()
+        expgroup_a = ExperimentGroup(name='Hashed A')
+        ExperimentGroup.save(expgroup_a)
+        expgroup_b = ExperimentGroup(name='Hashed B')
+        ExperimentGroup.save(expgroup_b)
+
+        self.app = Application.get(1)
+        self.app.experiment_distribution = HashBucketExperiment().get_name()
+        self.experiment = Experiment(name='Hashed experiment', application=self.app,
+                                     startDatetime=now - datetime.timedelta(days=1),
+                                     endDatetime=now + datetime.timedelta(days=1),
+                                     experimentgroups=[expgroup_a, expgroup_b])
+        Experiment.save(self.experiment)
+
+    def test_selector_knows_hash_bucket(self):
+        assert ExperimentLogicSelector().is_valid_experiment_logic('hash_bucket')
+
+    def test_returns_same_experiment_for_same_client(self):
+        experiments = set(map(lambda _: HashBucketExperiment().get_experiments(self.app, 'Chell'), range(10)))
+
+        assert len(experiments) == 1
+        assert experiments.pop() in self.app.running_experiments()
+
+    def test_returns_same_experimentgroup_for_same_client(self):
+        logic_selector = ExperimentLogicSelector()
+        expgroups = set(map(lambda _: logic_selector.get_experimentgroup(self.app, self.experiment, 'Chell'),
+                            range(10)))
+
+        assert len(expgroups) == 1
+        assert expgroups.pop() in self.experiment.experimentgroups
+
+    def test_distributes_clients_to_every_experimentgroup(self):
+        logic = HashBucketExperiment()
+        expgroups = set(map(lambda _: logic.get_experimentgroup(self.app, self.experiment, 'client %s' % _),
+                            range(100)))
+
+        assert expgroups == set(self.experiment.experimentgroups)
+
+    def test_returns_none_without_clientname(self):
+        assert HashBucketExperiment().get_experiments(self.app) is None
+
+    def test_returns_none_if_no_running_experiments(self):
+        app = Application(name='Aperture science', apikey='key')
+
+        assert HashBucketExperiment().get_experiments(app, 'Chell') is None
+
+    def test_raises_indexerror_without_experimentgroups(self):
+        experiment = Experiment(name='Empty', experimentgroups=[])
+
+        with pytest.raises(IndexError):
+            HashBucketExperiment().get_experimentgroup(self.app, experiment, 'Chell')
+
+
+class TestWeightedExperiment(BaseTest):
+
+    def setUp(self):
+        super(TestWeightedExperiment, self).setUp()
+        self.init_database()
+        self.init_databaseData()
+
+        now = datetime.datetime.now()
+        self.expgroup_a = ExperimentGroup(name='Weighted A', weight=9)
+        ExperimentGroup.save(self.expgroup_a)
+        self.expgroup_b = ExperimentGroup(name='Weighted B', weight=1)
+        ExperimentGroup.save(self.expgroup_b)
+
+        self.app = Application.get(1)
+        self.app.experiment_distribution = WeightedExperiment().get_name()
+        self.experiment = Experiment(name='Weighted experiment', application=self.app,
+                                     startDatetime=now - datetime.timedelta(days=1),
+                                     endDatetime=now + datetime.timedelta(days=1),
+                                     experimentgroups=[self.expgroup_a, self.expgroup_b])
+        Experiment.save(self.experiment)
+
+    def test_selector_knows_weighted(self):
+        assert ExperimentLogicSelector().is_valid_experiment_logic('weighted')
+
+    def test_alias_table_follows_weights(self):
+        class Draws:
+            def __init__(self, count):
+                self.values = iter(map(lambda _: (_ + 0.5) / count, range(count)))
+
+            def random(self):
+                return next(self.values)
+
+        table = AliasTable([1, 0, 3, 6])
+        draws = Draws(10000)
+        counts = [0, 0, 0, 0]
+        for i in range(10000):
+            counts[table.sample(draws)] += 1
+
+        assert counts == [1000, 0, 3000, 6000]
+
+    def test_alias_table_needs_positive_weight(self):
+        with pytest.raises(ValueError):
+            AliasTable([0, 0])
+
+    def test_splits_clients_by_experimentgroup_weights(self):
+        logic = WeightedExperiment()
+        expgroups = list(map(lambda _: logic.get_experimentgroup(self.app, self.experiment), range(1000)))
+
+        assert 800 < expgroups.count(self.expgroup_a) < 980
+
+    def test_does_not_assign_to_experimentgroup_without_weight(self):
+        self.expgroup_a.weight = 0
+        logic = WeightedExperiment()
+
+        assert set(map(lambda _: logic.get_experimentgroup(self.app, self.experiment), range(100))) == \
+            {self.expgroup_b}
+
+    def test_returns_running_experiment_of_snapshot(self):
+        snapshot = get_application_snapshot(self.app.apikey)
+
+        assert WeightedExperiment().get_experiments(snapshot) in snapshot.running_experiments()
+
+    def test_alias_table_is_shared_by_snapshots_with_same_weights(self):
+        logic = WeightedExperiment()
+        snapshot = get_application_snapshot(self.app.apikey)
+        table = logic.get_alias_table(snapshot.experiments[-1].experimentgroups)
+        invalidate_application_snapshots()
+        experimentgroups = get_application_snapshot(self.app.apikey).experiments[-1].experimentgroups
+
+        assert logic.get_alias_table(experimentgroups) is table
+        assert tuple(map(lambda _: (_.id, _.weight), experimentgroups)) in logic._tables.data
+
+    def test_alias_table_is_cached_until_weights_change(self):
+        logic = WeightedExperiment()
+        table = logic.get_alias_table(self.experiment.experimentgroups)
+
+        assert logic.get_alias_table(self.experiment.experimentgroups) is table
+        self.expgroup_b.weight = 2
+        assert logic.get_alias_table(self.experiment.experimentgroups) is not table
+
+    def test_raises_indexerror_without_experimentgroups(self):
+        experiment = Experiment(name='Empty', experimentgroups=[])
+
+        with pytest.raises(IndexError):
+            WeightedExperiment().get_experimentgroup(self.app, experiment)
+
+
+class TestLayeredExperiment(BaseTest):
+
+    def setUp(self):
+        super(TestLayeredExperiment, self).setUp()
+        self.init_database()
+
+        self.app = Application(name='Layered app', apikey='layered key', experiment_distribution='layered')
+        Application.save(self.app)
+        self.ui_a = self.create_experiment('UI A', 'ui', {'color': 'red'})
+        self.ui_b = self.create_experiment('UI B', 'ui', {'color': 'blue'})
+        self.ranking = self.create_experiment('Ranking', 'ranking', {'algorithm': 'bm25', 'boost': 2})
+
+    def create_experiment(self, name, layer, configurations):
+        now = datetime.datetime.now()
+        expgroup = ExperimentGroup(name=name)
+        ExperimentGroup.save(expgroup)
+        for key, value in sorted(configurations.items()):
+            Configuration.save(Configuration(key=key, value=value, experimentgroup_id=expgroup.id))
+        experiment = Experiment(name=name, application=self.app, layer=layer,
+                                startDatetime=now - datetime.timedelta(days=1),
+                                endDatetime=now + datetime.timedelta(days=1),
+                                experimentgroups=[expgroup])
+        Experiment.save(experiment)
+        return experiment
+
+    def post_configurations(self, clientname):
+        req = self.dummy_request()
+        req.headers['authorization'] = self.app.apikey
+        req.swagger_data = {'clientname': clientname}
+        return Clients(req).configurations_POST()
+
+    def test_selector_knows_layered(self):
+        assert ExperimentLogicSelector().is_valid_experiment_logic('layered')
+
+    def test_returns_one_experiment_of_every_layer(self):
+        experiments = LayeredExperiment().get_experiments(self.app, 'Chell')
+
+        assert len(experiments) == 2
+        assert experiments[0] == self.ranking
+        assert experiments[1] in [self.ui_a, self.ui_b]
+
+    def test_experiments_of_layer_split_clients(self):
+        logic = LayeredExperiment()
+        experiments = list(map(lambda _: logic.get_experiments(self.app, 'Client %s' % _)[1], range(100)))
+
+        assert 20 < experiments.count(self.ui_a) < 80
+        assert logic.get_experiments(self.app, 'Chell') == logic.get_experiments(self.app, 'Chell')
+
+    def test_returns_none_without_clientname(self):
+        assert LayeredExperiment().get_experiments(self.app) is None
+
+    def test_other_logics_have_one_layer(self):
+        self.app.experiment_distribution = 'hash_bucket'
+
+        assert ExperimentLogicSelector().get_layers(self.app, [self.ui_a, self.ranking]) == [None, None]
+
+    def test_configurations_POST_merges_layers(self):
+        response = self.post_configurations('Chell')
+        client = Client.get_by('clientname', 'Chell')
+        configurations = list(map(lambda _: (_['key'], _['value']), response.json_body))
+
+        assert len(client.experimentgroups) == 2
+        assert configurations[:2] == [('algorithm', 'bm25'), ('boost', 2)]
+        assert configurations[2] in [('color', 'red'), ('color', 'blue')]
+        assert self.post_configurations('Chell').json_body == response.json_body
+
+    def test_configurations_POST_assigns_to_new_layer(self):
+        self.post_configurations('Chell')
+        self.create_experiment('Onboarding', 'onboarding', {'tutorial': True})
+        invalidate_application_snapshots()
+        response = self.post_configurations('Chell')
+
+        assert len(Client.get_by('clientname', 'Chell').experimentgroups) == 3
+        assert ('tutorial', True) in list(map(lambda _: (_['key'], _['value']), response.json_body))
+
+    def post_configuration(self, experiment, key, value):
+        req = self.dummy_request()
+        req.swagger_data = {'appid': self.app.id, 'expid': experiment.id,
+                            'expgroupid': experiment.experimentgroups[0].id,
+                            'configuration': Configuration(key=key, value=value)}
+        return Configurations(req).configurations_POST()
+
+    def test_configuration_with_key_of_other_layer_is_rejected(self):
+        ConfigurationKey.save(ConfigurationKey(name='boost', type='integer', application_id=self.app.id))
+        response = self.post_configuration(self.ui_a, 'boost', 3)
+
+        assert response.status_code == 400
+        assert Configuration.query().filter(Configuration.key == 'boost').count() == 1
+
+    def test_configuration_with_key_of_same_or_earlier_layer_is_accepted(self):
+        ConfigurationKey.save(ConfigurationKey(name='boost', type='integer', application_id=self.app.id))
+        ranking_b = self.create_experiment('Ranking B', 'ranking', {})
+        ended = self.create_experiment('Ended UI', 'ui', {})
+        ended.startDatetime -= datetime.timedelta(days=3)
+        ended.endDatetime -= datetime.timedelta(days=3)
+        Experiment.save(ended)
+
+        assert self.post_configuration(ranking_b, 'boost', 3)['key'] == 'boost'
+        assert self.post_configuration(ended, 'boost', 3)['key'] == 'boost'
+
+
+class TestThompsonSamplingExperiment(BaseTest):
+
+    def setUp(self):
+        super(TestThompsonSamplingExperiment, self).setUp()
+        self.init_database()
+        self.init_databaseData()
+
+        self.expgroup_a = ExperimentGroup(name='Arm A')
+        ExperimentGroup.save(self.expgroup_a)
+        self.expgroup_b = ExperimentGroup(name='Arm B')
+        ExperimentGroup.save(self.expgroup_b)
+        self.experiment = Experiment(name='Bandit experiment', application_id=1,
+                                     experimentgroups=[self.expgroup_a, self.expgroup_b])
+        Experiment.save(self.experiment)
+        self.app = Application.get(1)
+
+    def test_selector_knows_thompson_sampling(self):
+        assert ExperimentLogicSelector().is_valid_experiment_logic('thompson_sampling')
+
+    def test_assigns_to_experimentgroup_with_better_rewards(self):
+        add_rewards([([self.expgroup_a.id], 'reward', 1)] * 90 + [([self.expgroup_a.id], 'reward', 0)] * 10 +
+                    [([self.expgroup_b.id], 'reward', 1)] * 10 + [([self.expgroup_b.id], 'reward', 0)] * 90)
+        logic = ThompsonSamplingExperiment()
+        expgroups = list(map(lambda _: logic.get_experimentgroup(self.app, self.experiment), range(100)))
+
+        assert expgroups.count(self.expgroup_a) > 95
+
+    def test_explores_experimentgroups_without_rewards(self):
+        logic = ThompsonSamplingExperiment()
+        expgroups = list(map(lambda _: logic.get_experimentgroup(self.app, self.experiment), range(1000)))
+
+        assert 300 < expgroups.count(self.expgroup_a) < 700
+
+    def test_raises_indexerror_without_experimentgroups(self):
+        experiment = Experiment(name='Empty', experimentgroups=[])
+
+        with pytest.raises(IndexError):
+            ThompsonSamplingExperiment().get_experimentgroup(self.app, experiment)
+
+
+class TestExperimentLogicRegistry(BaseTest):
+
+    def setUp(self):
+        super(TestExperimentLogicRegistry, self).setUp()
+        self.init_database()
+        self.init_databaseData()
+        self.registry = ExperimentLogicRegistry()
+
+    def test_registers_builtin_logics(self):
+        assert set(self.registry.get_names()).issuperset(
+            {'one_random', 'hash_bucket', 'weighted', 'layered', 'thompson_sampling'})
+        assert isinstance(self.registry.get_logic('hash_bucket'), HashBucketExperiment)
+
+    def test_reuses_logic_instances(self):
+        assert self.registry.get_logic('weighted') is self.registry.get_logic('weighted')
+        assert ExperimentLogicSelector().get_logic(Application(name='App', experiment_distribution='weighted')) is \
+            registry.get_logic('weighted')
+
+    def test_imports_logic_on_first_use(self):
+        self.registry.register('broken', 'experiment_server.experiment_logic.no_such_module:Logic')
+
+        assert 'broken' in self.registry.get_names()
+        assert self.registry.get_logic('broken') is None
+
+    def test_broken_logic_is_not_valid_distribution(self):
+        self.registry.register('broken', 'experiment_server.experiment_logic.no_such_module:Logic')
+        selector = ExperimentLogicSelector(self.registry)
+
+        assert not selector.is_valid_experiment_logic('broken')
+        assert 'broken' not in selector.get_valid_experiment_logics()
+        assert 'hash_bucket' in selector.get_valid_experiment_logics()
+
+    def test_rejects_classes_which_are_not_logics(self):
+        self.registry.register('not_a_logic', 'experiment_server.experiment_logic.registry:ExperimentLogicRegistry')
+
+        assert self.registry.get_logic('not_a_logic') is None
+
+    def test_registered_logic_is_valid_distribution(self):
+        self.registry.register('hash_bucket_too', 'experiment_server.experiment_logic.hash_bucket_experiment:'
+                                                  'HashBucketExperiment')
+        selector = ExperimentLogicSelector(self.registry)
+
+        assert selector.is_valid_experiment_logic('hash_bucket_too')
+        assert not ExperimentLogicSelector().is_valid_experiment_logic('hash_bucket_too')
+        assert isinstance(selector.get_logic(Application(name='App', experiment_distribution='hash_bucket_too')),
+                          HashBucketExperiment)
+
+    def test_unknown_logic_falls_back_to_default(self):
+        app = Application(name='App', experiment_distribution='no_such_logic')
+
+        assert isinstance(ExperimentLogicSelector(self.registry).get_logic(app), OneRandomExperiment)
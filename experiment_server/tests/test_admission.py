@@ -0,0 +1,138 @@
+import threading
+from pyramid import testing
+from pyramid.config import Configurator
+from pyramid.response import Response
+from .base_test import BaseTest
+from experiment_server.utils.admission import (AdmissionLimiter, admission_tween_factory, get_route_class,
+                                               includeme, set_limiters)
+from experiment_server.views.metrics import Metrics
+
+
+class TestAdmission(BaseTest):
+    def setUp(self):
+        super(TestAdmission, self).setUp()
+        self.client = AdmissionLimiter('client', concurrency=1, queue_size=1, queue_timeout=0.05)
+        set_limiters({'client': self.client})
+        self.started = threading.Event()
+        self.finish = threading.Event()
+
+    def tearDown(self):
+        super(TestAdmission, self).tearDown()
+        self.finish.set()
+
+    def slow_handler(self, request):
+        # Only client requests are slow
+        if request.path == '/events':
+            self.started.set()
+            self.finish.wait(5)
+        return Response('ok')
+
+    def send(self, tween, request):
+        # Server closes the body after sending it
+        response = tween(request)
+        body = b''.join(response.app_iter)
+        if hasattr(response.app_iter, 'close'):
+            response.app_iter.close()
+        return response, body
+
+    def hold_slot(self, tween):
+        thread = threading.Thread(target=self.send,
+                                  args=(tween, testing.DummyRequest(path='/events', method='POST')))
+        thread.start()
+        assert self.started.wait(5)
+        return thread
+
+    def test_get_route_class(self):
+        assert get_route_class(testing.DummyRequest(path='/events/batch', method='POST')) == 'client'
+        assert get_route_class(testing.DummyRequest(path='/configurations', method='POST')) == 'client'
+        assert get_route_class(testing.DummyRequest(path='/applications/1/experiments')) == 'admin'
+        assert get_route_class(testing.DummyRequest(path='/events', method='OPTIONS')) is None
+        assert get_route_class(testing.DummyRequest(path='/metrics')) is None
+
+    def test_limiter_queues_until_timeout(self):
+        assert self.client.acquire() is None
+        assert self.client.acquire() == 'queue timeout'
+        self.client.release()
+
+        assert self.client.acquire() is None
+        assert self.client.get_statistics()['rejected_timeout'] == 1
+        assert self.client.get_statistics()['admitted'] == 2
+
+    def test_limiter_admits_queued_request_on_release(self):
+        self.client.queue_timeout = 5
+        self.client.acquire()
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(self.client.acquire()))
+        waiter.start()
+        while self.client.waiting == 0:
+            pass
+        self.client.release()
+        waiter.join(5)
+
+        assert results == [None]
+        assert self.client.get_statistics()['max_waiting'] == 1
+
+    def test_tween_returns_503_when_saturated(self):
+        self.client.queue_size = 0
+        tween = admission_tween_factory(self.slow_handler, None)
+        thread = self.hold_slot(tween)
+        response = tween(testing.DummyRequest(path='/events', method='POST'))
+        self.finish.set()
+        thread.join(5)
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+        assert response.headers['Access-Control-Allow-Origin'] == '*'
+        assert self.client.get_statistics()['rejected_queue_full'] == 1
+        assert self.client.active == 0
+
+    def test_tween_does_not_limit_other_route_classes(self):
+        tween = admission_tween_factory(self.slow_handler, None)
+        thread = self.hold_slot(tween)
+        response, body = self.send(tween, testing.DummyRequest(path='/applications/1'))
+        self.finish.set()
+        thread.join(5)
+
+        assert response.status_code == 200
+
+    def test_tween_releases_slot_on_error(self):
+        def failing_handler(request):
+            raise ValueError()
+        tween = admission_tween_factory(failing_handler, None)
+        with self.assertRaises(ValueError):
+            tween(testing.DummyRequest(path='/events', method='POST'))
+
+        assert self.client.active == 0
+
+    def test_streamed_body_holds_slot_until_sent(self):
+        sent = []
+
+        def streaming_handler(request):
+            def body():
+                # Streamed bodies read the database here, after the handler has returned
+                sent.append(self.client.active)
+                yield b'[]'
+            return Response(app_iter=body())
+        tween = admission_tween_factory(streaming_handler, None)
+        response = tween(testing.DummyRequest(path='/events', method='POST'))
+
+        assert self.client.active == 1
+        assert b''.join(response.app_iter) == b'[]'
+        assert sent == [1]
+        response.app_iter.close()
+        response.app_iter.close()
+        assert self.client.active == 0
+
+    def test_invalid_limits_are_rejected(self):
+        config = Configurator(settings={'experiment_server.admission': 'true',
+                                        'experiment_server.admission_threads': '8'})
+        with self.assertRaises(ValueError):
+            includeme(config)
+
+    def test_metrics_GET_has_admission(self):
+        self.client.acquire()
+        self.client.acquire()
+        response = Metrics(self.dummy_request()).metrics_GET()
+
+        assert response['admission']['client']['active'] == 1
+        assert response['admission']['client']['rejected'] == 1
@@ -0,0 +1,66 @@
+import transaction
+from sqlalchemy import event
+
+from .base_test import BaseTest
+from ..models import Application
+from experiment_server.utils.apikeys import (get_application_record, refresh_application_records)
+from experiment_server.views.applications import Applications
+
+
+class TestApplicationRecords(BaseTest):
+    def setUp(self):
+        super(TestApplicationRecords, self).setUp()
+        self.init_database()
+        self.init_databaseData()
+        self.req = self.dummy_request()
+
+    def test_record_has_application_data(self):
+        app = Application.get(1)
+        record = get_application_record(app.apikey)
+
+        assert record.id == app.id
+        assert record.name == app.name
+        assert record.apikey == app.apikey
+        assert record.experiment_distribution == app.experiment_distribution
+
+    def test_unknown_apikey_does_not_read_database(self):
+        refresh_application_records()
+        statements = []
+        event.listen(self.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        assert get_application_record('no such apikey') is None
+        assert statements == []
+
+    def test_applications_POST_refreshes_records(self):
+        refresh_application_records()
+        self.req.swagger_data = {'application': Application(name='App 3')}
+        response = Applications(self.req).applications_POST()
+        transaction.commit()
+
+        assert get_application_record(response['apikey']).name == 'App 3'
+
+    def test_applications_PUT_refreshes_records(self):
+        apikey = Application.get(1).apikey
+        refresh_application_records()
+        self.req.swagger_data = {'id': 1, 'application': Application(id=1, name='Renamed')}
+        Applications(self.req).applications_PUT()
+        transaction.commit()
+
+        assert get_application_record(apikey).name == 'Renamed'
+
+    def test_applications_DELETE_one_refreshes_records(self):
+        apikey = Application.get(1).apikey
+        refresh_application_records()
+        self.req.swagger_data = {'id': 1}
+        Applications(self.req).applications_DELETE_one()
+        transaction.commit()
+
+        assert get_application_record(apikey) is None
+
+    def test_records_are_not_refreshed_with_aborted_applications(self):
+        refresh_application_records()
+        self.req.swagger_data = {'application': Application(name='App 3')}
+        response = Applications(self.req).applications_POST()
+        transaction.abort()
+
+        assert get_application_record(response['apikey']) is None
@@ -0,0 +1,163 @@
+import datetime
+import threading
+import transaction
+from sqlalchemy import event
+from .base_test import BaseTest
+from ..models import (Application, BanditArm, Client, Experiment, ExperimentGroup)
+import experiment_server.utils.bandit_counts as bandit_counts
+from experiment_server.utils.bandit_counts import (add_rewards, checkpoint, clear_bandit_counts, get_counts,
+                                                   get_reward, start, stop)
+from experiment_server.views.clients import Clients
+
+
+class TestBanditCounts(BaseTest):
+    def setUp(self):
+        super(TestBanditCounts, self).setUp()
+        self.init_database()
+        self.init_databaseData()
+        self.req = self.dummy_request()
+        checkpoint()
+
+    def tearDown(self):
+        super(TestBanditCounts, self).tearDown()
+        bandit_counts.checkpoint_interval = datetime.timedelta(seconds=10)
+
+    def test_get_reward(self):
+        assert get_reward(True) == 1.0
+        assert get_reward(0) == 0.0
+        assert get_reward(0.25) == 0.25
+        assert get_reward(5) == 1.0
+        assert get_reward(-1) == 0.0
+        assert get_reward('1') is None
+
+    def test_add_rewards_counts_reward_key_only(self):
+        add_rewards([([1, 2], 'reward', 1), ([1], 'reward', 0), ([1], 'score', 1), ([2], 'reward', 'yes')])
+
+        assert get_counts(1) == (1.0, 2.0)
+        assert get_counts(2) == (1.0, 1.0)
+        assert get_counts(3) == (0.0, 0.0)
+
+    def test_counts_are_kept_in_memory_until_checkpoint(self):
+        add_rewards([([1], 'reward', 1)])
+
+        assert BanditArm.get(1) is None
+        checkpoint()
+        assert BanditArm.get(1).as_dict() == {'experimentgroup_id': 1, 'successes': 1.0, 'trials': 1.0}
+        assert get_counts(1) == (1.0, 1.0)
+
+    def test_checkpoint_adds_increments(self):
+        BanditArm.save(BanditArm(experimentgroup_id=1, successes=3.0, trials=10.0))
+        add_rewards([([1], 'reward', 1)])
+        checkpoint()
+
+        assert get_counts(1) == (4.0, 11.0)
+
+    def test_counts_are_read_from_checkpoints(self):
+        add_rewards([([1], 'reward', 1)])
+        checkpoint()
+        clear_bandit_counts()
+
+        assert get_counts(1) == (1.0, 1.0)
+
+    def test_add_rewards_checkpoints_after_interval(self):
+        bandit_counts.checkpoint_interval = datetime.timedelta(0)
+        add_rewards([([1], 'reward', 0.5)])
+
+        assert BanditArm.get(1).successes == 0.5
+
+    def test_add_counts_inserts_and_updates(self):
+        BanditArm.save(BanditArm(experimentgroup_id=1, successes=3.0, trials=10.0))
+        BanditArm.add_counts({1: (1.0, 2.0), 2: (0.5, 1.0)})
+        BanditArm.add_counts({2: (0.5, 1.0)})
+
+        assert BanditArm.load_counts() == {1: (4.0, 12.0), 2: (1.0, 2.0)}
+
+    def test_failed_checkpoint_keeps_increments_and_session(self):
+        add_rewards([([1], 'reward', 1)])
+        BanditArm.__table__.drop(self.engine)
+        checkpoint()
+
+        assert Client.get(1).clientname == 'First client'
+        BanditArm.__table__.create(self.engine)
+        checkpoint()
+        assert get_counts(1) == (1.0, 1.0)
+
+    def test_stop_checkpoints_increments(self):
+        add_rewards([([1], 'reward', 1)])
+        stop()
+
+        assert BanditArm.get(1).trials == 1.0
+
+    def test_includeme_starts_thread_on_first_use(self):
+        self.config.registry.settings['experiment_server.bandit_checkpoint_interval'] = '60'
+        self.config.include('experiment_server.utils.bandit_counts')
+        try:
+            assert bandit_counts._thread is None
+            add_rewards([([1], 'score', 1)])
+            assert bandit_counts._thread is None
+            add_rewards([([1], 'reward', 1)])
+            assert bandit_counts._thread.is_alive()
+        finally:
+            stop()
+        assert BanditArm.get(1).trials == 1.0
+
+    def test_start_does_not_start_another_thread(self):
+        bandit_counts.checkpoint_interval = datetime.timedelta(seconds=60)
+        try:
+            start()
+            thread = bandit_counts._thread
+            start()
+            assert bandit_counts._thread is thread
+            assert len(list(filter(lambda _: _.name == 'bandit-checkpoint', threading.enumerate()))) == 1
+        finally:
+            stop()
+
+    def test_get_counts_during_checkpoint_counts_increments(self):
+        counts = []
+
+        def get_counts_before_reading_back(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('SELECT') and 'banditarms' in statement:
+                counts.append(get_counts(1))
+
+        add_rewards([([1], 'reward', 1)])
+        event.listen(self.engine, 'before_cursor_execute', get_counts_before_reading_back)
+        try:
+            checkpoint()
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', get_counts_before_reading_back)
+
+        assert counts == [(1.0, 1.0)]
+        assert get_counts(1) == (1.0, 1.0)
+
+    def test_checkpoint_drops_deleted_experimentgroups(self):
+        add_rewards([([1, 1000], 'reward', 1)])
+        checkpoint()
+
+        assert list(map(lambda _: _.experimentgroup_id, BanditArm.all())) == [1]
+
+    def set_running_experiment(self):
+        now = datetime.datetime.now()
+        experiment = Experiment(name='Running Experiment', application_id=1,
+                                startDatetime=now - datetime.timedelta(days=1),
+                                endDatetime=now + datetime.timedelta(days=1),
+                                experimentgroups=[ExperimentGroup.get(1)])
+        Experiment.save(experiment)
+        Client.get(1).experimentgroups.append(ExperimentGroup.get(1))
+        self.req.headers = {'authorization': Application.get(1).apikey, 'clientname': Client.get(1).clientname}
+        self.req.json_body = {'key': 'reward', 'value': True,
+                              'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-06 06:06:07'}
+
+    def test_events_POST_counts_reward(self):
+        self.set_running_experiment()
+        Clients(self.req).events_POST()
+
+        assert get_counts(1) == (0.0, 0.0)
+        transaction.commit()
+        assert get_counts(1) == (1.0, 1.0)
+
+    def test_events_POST_does_not_count_reward_of_aborted_request(self):
+        self.set_running_experiment()
+        Clients(self.req).events_POST()
+        transaction.abort()
+
+        assert get_counts(1) == (0.0, 0.0)
@@ -1,4 +1,7 @@
 import datetime
+import io
+import json
+from sqlalchemy import event
 from .base_test import BaseTest
 from ..models import (Application, Configuration, Experiment, Client, DataItem, ExperimentGroup)
 from experiment_server.views.clients import Clients
@@ -157,7 +160,9 @@ class TestClientsREST(BaseTest):
              'application_id': 1,
              'name': 'Test experiment',
              'startDatetime': '2016-01-01 00:00:00',
-             'endDatetime': '2017-01-01 00:00:00'
+             'endDatetime': '2017-01-01 00:00:00',
+             'weight': 1.0,
+             'layer': None
              # TODO: Add experimentgroups to experiment (views/experiments experiments_for_client_GET())
              #'experimentgroups': [{'id': 1, 'experiment_id': 1, 'name': 'Group A'}]
              }]
@@ -185,10 +190,21 @@ class TestClientsREST(BaseTest):
                     'startDatetime': '2016-06-06 06:06:06',
                     'endDatetime': '2016-06-07 06:06:06',
                     'value': 10,
-                    'client_id': 1}
+                    'client_id': 1,
+                    'event_id': None}
 
         assert response == dataitem
 
+    def test_events_POST_epoch_milliseconds_and_offsets(self):
+        self.set_running_experiment_for_batch()
+        self.req.headers['clientname'] = 'First client'
+        self.req.json_body = {'key': 'key1', 'value': 10,
+                              'startDatetime': 1465193166000, 'endDatetime': '2016-06-07T08:06:06+02:00'}
+        response = Clients(self.req).events_POST()
+
+        assert response['startDatetime'] == '2016-06-06 06:06:06'
+        assert response['endDatetime'] == '2016-06-07 06:06:06'
+
     def test_events_POST_nonexistent_client(self):
         self.req.headers = {'clientname': 'fsdfdsf'}
         self.req.headers['authorization'] = Application.get(1).apikey
@@ -245,6 +261,123 @@ class TestClientsREST(BaseTest):
         response = httpclients.events_POST()
         assert response.status_code == 400
 
+    def set_running_experiment_for_batch(self):
+        now = datetime.datetime.now()
+        experiment = Experiment(name='Batch Experiment', application_id=1,
+                                startDatetime=now - datetime.timedelta(days=1),
+                                endDatetime=now + datetime.timedelta(days=1),
+                                experimentgroups=[ExperimentGroup.get(1)])
+        Experiment.save(experiment)
+        self.req.headers['authorization'] = Application.get(1).apikey
+
+    def test_events_batch_POST(self):
+        self.set_running_experiment_for_batch()
+        self.req.headers['clientname'] = 'First client'
+        self.req.json_body = [
+            {'key': 'key1', 'value': 10,
+             'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'},
+            {'key': 'key2', 'value': 20, 'clientname': 'First client',
+             'startDatetime': '2016-06-08 06:06:06', 'endDatetime': '2016-06-09 06:06:06'}
+        ]
+        dataitems_before = len(DataItem.all())
+        response = Clients(self.req).events_batch_POST()
+
+        assert response == [{'status': 200}, {'status': 200}]
+        dataitems = DataItem.query().filter(DataItem.client_id == 1).order_by(DataItem.id).all()[-2:]
+        assert len(DataItem.all()) == dataitems_before + 2
+        assert list(map(lambda _: (_.key, _.value), dataitems)) == [('key1', 10), ('key2', 20)]
+        assert dataitems[1].startDatetime == datetime.datetime(2016, 6, 8, 6, 6, 6)
+
+    def test_events_batch_POST_per_item_status(self):
+        self.set_running_experiment_for_batch()
+        Client.save(Client(clientname='Wheatley'))
+        self.req.json_body = [
+            {'key': 'key1', 'value': 10, 'clientname': 'First client',
+             'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'},
+            {'key': 'key1', 'value': 10, 'clientname': 'no such client',
+             'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'},
+            {'key': 'key1', 'value': 10, 'clientname': 'Wheatley',
+             'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'},
+            {'key': 'key1', 'clientname': 'First client',
+             'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'},
+            {'key': 'key1', 'value': 10,
+             'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'}
+        ]
+        dataitems_before = len(DataItem.all())
+        response = Clients(self.req).events_batch_POST()
+
+        assert list(map(lambda _: _['status'], response)) == [200, 400, 400, 400, 400]
+        assert len(DataItem.all()) == dataitems_before + 1
+
+    def test_events_batch_POST_not_a_list(self):
+        self.set_running_experiment_for_batch()
+        self.req.json_body = {'key': 'key1'}
+        response = Clients(self.req).events_batch_POST()
+
+        assert response.status_code == 400
+
+    def test_events_batch_POST_no_apikey(self):
+        self.req.json_body = []
+        response = Clients(self.req).events_batch_POST()
+
+        assert response.status_code == 401
+
+    def post_stream(self, lines):
+        body = '\n'.join(map(lambda _: _ if isinstance(_, str) else json.dumps(_), lines)).encode('utf-8')
+        self.req.body_file = io.BytesIO(body)
+        return Clients(self.req).events_stream_POST()
+
+    def test_events_stream_POST(self):
+        self.set_running_experiment_for_batch()
+        self.req.headers['clientname'] = 'First client'
+        dataitems_before = len(DataItem.all())
+        response = self.post_stream([
+            {'key': 'key1', 'value': 10, 'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'},
+            '',
+            {'key': 'key2', 'value': 20, 'clientname': 'First client',
+             'startDatetime': '2016-06-08 06:06:06', 'endDatetime': '2016-06-09 06:06:06'}
+        ])
+
+        assert response == {'received': 2, 'saved': 2, 'duplicates': 0, 'errors': []}
+        dataitems = DataItem.query().filter(DataItem.client_id == 1).order_by(DataItem.id).all()[-2:]
+        assert len(DataItem.all()) == dataitems_before + 2
+        assert list(map(lambda _: (_.key, _.value), dataitems)) == [('key1', 10), ('key2', 20)]
+
+    def test_events_stream_POST_saves_in_batches(self):
+        self.set_running_experiment_for_batch()
+        self.req.registry.settings['experiment_server.event_stream_batch_size'] = 2
+        self.req.headers['clientname'] = 'First client'
+        statements = []
+        event.listen(self.engine, 'before_cursor_execute',
+                     lambda *args: statements.append(args[2]) if 'INTO dataitems (' in args[2] else None)
+        response = self.post_stream([{'key': 'key%s' % i, 'value': i, 'startDatetime': '2016-06-06 06:06:06',
+                                      'endDatetime': '2016-06-07 06:06:06'} for i in range(5)])
+
+        assert response['saved'] == 5
+        assert len(statements) == 3
+
+    def test_events_stream_POST_reports_invalid_lines(self):
+        self.set_running_experiment_for_batch()
+        self.req.registry.settings['experiment_server.event_stream_max_errors'] = 2
+        response = self.post_stream([
+            {'key': 'key1', 'value': 10, 'clientname': 'First client',
+             'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'},
+            '{"key": ',
+            {'key': 'key1', 'value': 10, 'clientname': 'no such client',
+             'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'},
+            {'key': 'key1', 'clientname': 'First client',
+             'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'}
+        ])
+
+        assert response == {'received': 4, 'saved': 1, 'duplicates': 0, 'errors': [
+            {'line': 2, 'error': 'malformed JSON'},
+            {'line': 3, 'error': 'no client with name no such client'}]}
+
+    def test_events_stream_POST_no_apikey(self):
+        response = self.post_stream([])
+
+        assert response.status_code == 401
+
     def test_client_DELETE(self):
         self.req.swagger_data = {'appid': 1, 'clientid': 1}
         httpclients = Clients(self.req)
@@ -316,6 +449,41 @@ class TestClientsREST(BaseTest):
 
         assert count_clients_after == count_clients_before
 
+    def test_configurations_POST_empty_name(self):
+        count_clients_before = Client.query().count()
+
+        self.req.headers['authorization'] = Application.get(1).apikey
+        self.req.swagger_data = {'clientname': ''}
+        httpclients = Clients(self.req)
+        response = httpclients.configurations_POST()
+
+        assert response.status_code == 400
+        assert Client.query().count() == count_clients_before
+
+    def test_get_or_create_creates_client_once(self):
+        client = Client.get_or_create('Wheatley')
+
+        assert Client.get_or_create('Wheatley') is client
+        assert Client.query().filter(Client.clientname == 'Wheatley').count() == 1
+
+    def test_get_or_create_returns_existing_client(self):
+        client = Client.get_by('clientname', 'First client')
+
+        assert Client.get_or_create('First client') is client
+
+    def test_configurations_POST_keeps_client_in_its_experimentgroup(self):
+        httpclients = Clients(self.req)
+        self.req.headers['authorization'] = Application.get(1).apikey
+        self.req.swagger_data = {'clientname': 'Chell'}
+        bodies = list(map(lambda _: httpclients.configurations_POST().body, range(10)))
+
+        memberships = Client.query()\
+            .join(Client.experimentgroups)\
+            .filter(Client.clientname == 'Chell')\
+            .count()
+        assert memberships == 1
+        assert len(set(bodies)) == 1
+
     def test_configurations_POST_no_running_experiments(self):
         import uuid
 
@@ -404,7 +572,7 @@ class TestClientsREST(BaseTest):
                 .join(ExperimentGroup)\
                 .filter(ExperimentGroup.id == 2).all()))
 
-        assert response == expected1 or response == expected2
+        assert response.json_body == expected1 or response.json_body == expected2
 
     def test_configurations_POST_existing_client(self):
         httpclients = Clients(self.req)
@@ -421,4 +589,4 @@ class TestClientsREST(BaseTest):
                 .join(ExperimentGroup)\
                 .filter(ExperimentGroup.id == 2).all()))
 
-        assert response == expected1 or response == expected2
+        assert response.json_body == expected1 or response.json_body == expected2
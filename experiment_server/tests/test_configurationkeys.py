@@ -163,6 +163,23 @@ class TestConfigurationKeysREST(BaseTest):
         assert name_now == expected_name
 
 
+    def test_configurationkeys_PUT_one_name_is_unused(self):
+        self.req.swagger_data = {
+            'ckid': 1, 'appid': 1,
+            'configurationkey': ConfigurationKey(id=1, application_id=1, name='difficulty', type='boolean')}
+        response = ConfigurationKeys(self.req).configurationkeys_PUT_one()
+
+        assert response.status_code == 400
+        assert ConfigurationKey.get(1).name == 'highscore'
+
+    def test_configurationkeys_PUT_one_keeps_own_name(self):
+        self.req.swagger_data = {
+            'ckid': 1, 'appid': 1,
+            'configurationkey': ConfigurationKey(id=1, application_id=1, name='highscore', type='boolean')}
+        response = ConfigurationKeys(self.req).configurationkeys_PUT_one()
+
+        assert response == self.confkey
+
     def test_configurationkeys_DELETE_one_with_correct_values(self):
         self.req.swagger_data = {'appid':1, 'ckid': 1}
         httpCkeys = ConfigurationKeys(self.req)
@@ -202,6 +219,20 @@ class TestConfigurationKeysREST(BaseTest):
         count_now = ConfigurationKey.query().count()
         assert count_now == expected_count
 
+    def test_configurationkeys_POST_name_is_unused(self):
+        expected_count = ConfigurationKey.query().count()
+        self.req.swagger_data = {
+            'id': 1,
+            'configurationkey': ConfigurationKey(application_id=1, name='highscore', type='boolean')}
+        response = ConfigurationKeys(self.req).configurationkeys_POST()
+
+        assert response.status_code == 400
+        assert ConfigurationKey.query().count() == expected_count
+        self.req.swagger_data = {
+            'id': 2,
+            'configurationkey': ConfigurationKey(application_id=2, name='highscore', type='boolean')}
+        assert ConfigurationKeys(self.req).configurationkeys_POST()['name'] == 'highscore'
+
     def test_configurationkeys_POST_type_is_not_empty(self):
         expected_count = ConfigurationKey.query().count()
 
@@ -283,3 +283,64 @@ class TestConfigurationsREST(BaseTest):
 
         assert response.status_code == expected_status
         assert count_now == count_before
+
+    def test_configurations_POST_exclusion_allows_valid_value(self):
+        app = Application(name='Easy Geim')
+        Application.save(app)
+        hscore = ConfigurationKey(name='highscore', type='boolean', application_id=app.id)
+        ConfigurationKey.save(hscore)
+        diff = ConfigurationKey(name='difficulty', type='integer', application_id=app.id)
+        ConfigurationKey.save(diff)
+        exp = Experiment(application_id=app.id, name='is easy')
+        Experiment.save(exp)
+        expgrp = ExperimentGroup(name='hehee', experiment_id=exp.id)
+        ExperimentGroup.save(expgrp)
+
+        # If highscore is True, then difficulty is greater than 3
+        exconst = ExclusionConstraint(first_configurationkey_id=hscore.id, first_operator_id=1, first_value_a=True,
+                                      second_configurationkey_id=diff.id, second_operator_id=5, second_value_a=3)
+        ExclusionConstraint.save(exconst)
+        Configuration.save(Configuration(experimentgroup_id=expgrp.id, key=hscore.name, value=True))
+        count_before = Configuration.query().count()
+
+        valid_conf = Configuration(experimentgroup_id=expgrp.id, key=diff.name, value=4)
+        self.req.swagger_data = {'appid': app.id, 'expid': exp.id, 'expgroupid': expgrp.id,
+                                 'configuration': valid_conf}
+        response = Configurations(self.req).configurations_POST()
+
+        assert response == valid_conf.as_dict()
+        assert Configuration.query().count() == count_before + 1
+
+    def test_compiled_constraints_are_reused_until_invalidated(self):
+        from ..utils.configuration_tools import get_application_constraints
+        from ..views.rangeconstraints import RangeConstraints
+        constraints = get_application_constraints(1)
+
+        assert get_application_constraints(1) is constraints
+        assert constraints.types == {'highscore': 'boolean', 'difficulty': 'integer'}
+        assert constraints.is_in_range('difficulty', 4)
+        assert not constraints.is_in_range('difficulty', 5)
+
+        self.req.swagger_data = {'appid': 1, 'ckid': 2, 'rangeconstraint': RangeConstraint(operator_id=4, value=2)}
+        RangeConstraints(self.req).rangecontraints_POST()
+        constraints = get_application_constraints(1)
+
+        assert not constraints.is_in_range('difficulty', 1)
+        assert constraints.is_in_range('difficulty', 3)
+
+    def test_compiled_constraints_expire_after_max_age(self):
+        import experiment_server.utils.configuration_tools as configuration_tools
+        constraints = configuration_tools.get_application_constraints(1)
+        configuration_tools._constraints[1] = (constraints, datetime.datetime.now())
+
+        assert configuration_tools.get_application_constraints(1) is not constraints
+
+    def test_compiled_constraints_are_dropped_after_commit(self):
+        import transaction
+        from ..utils.configuration_tools import (get_application_constraints, invalidate_constraints)
+        invalidate_constraints()
+        # Compiled before the writing transaction commits
+        constraints = get_application_constraints(1)
+        transaction.commit()
+
+        assert get_application_constraints(1) is not constraints
@@ -1,10 +1,11 @@
-import datetime
 from .base_test import BaseTest
 from ..models import (Client, DataItem)
+from experiment_server.utils.timestamps import parse_timestamp
 
 
 def strToDatetime(date):
-    return datetime.datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
+    # DataItems hold timestamps in UTC
+    return parse_timestamp(date)
 
 # ---------------------------------------------------------------------------------
 #                                DatabaseInterface
@@ -0,0 +1,67 @@
+import datetime
+from .base_test import BaseTest
+from ..models import (Application, Experiment, ExperimentGroup, DataItemSummary)
+from experiment_server.views.clients import Clients
+from experiment_server.views.experiments import Experiments
+
+
+class TestDataItemSummaries(BaseTest):
+    def setUp(self):
+        super(TestDataItemSummaries, self).setUp()
+        self.init_database()
+        self.init_databaseData()
+        self.req = self.dummy_request()
+
+    def test_add_dataitems(self):
+        DataItemSummary.add_dataitems([([1], 'score', 2), ([1, 2], 'score', 4)])
+        DataItemSummary.add_dataitems([([1], 'score', 6.5)])
+
+        summary = DataItemSummary.query().filter_by(experimentgroup_id=1, key='score').one()
+        assert (summary.count, summary.sum, summary.sum_of_squares, summary.min, summary.max) == \
+            (3, 12.5, 62.25, 2, 6.5)
+        summary = DataItemSummary.query().filter_by(experimentgroup_id=2, key='score').one()
+        assert (summary.count, summary.sum, summary.min, summary.max) == (1, 4, 4, 4)
+
+    def test_add_dataitems_skips_non_numeric_values(self):
+        DataItemSummary.add_dataitems([([1], 'liked', 'yes'), ([1], 'liked', True), ([1], 'liked', None)])
+
+        assert DataItemSummary.all() == []
+
+    def test_as_dict_has_mean_and_variance(self):
+        DataItemSummary.add_dataitems([([1], 'score', 2), ([1], 'score', 4)])
+        result = DataItemSummary.query().one().as_dict()
+
+        assert result['mean'] == 3
+        assert result['variance'] == 1
+
+    def test_events_POST_updates_summary(self):
+        now = datetime.datetime.now()
+        Experiment.save(Experiment(name='Summary Experiment', application_id=1,
+                                   startDatetime=now - datetime.timedelta(days=1),
+                                   endDatetime=now + datetime.timedelta(days=1),
+                                   experimentgroups=[ExperimentGroup.get(1)]))
+        self.req.headers['authorization'] = Application.get(1).apikey
+        self.req.headers['clientname'] = 'First client'
+        for value in [10, 20]:
+            self.req.json_body = {'key': 'score', 'value': value,
+                                  'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'}
+            Clients(self.req).events_POST()
+        self.req.json_body = [{'key': 'score', 'value': 30,
+                               'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'}]
+        Clients(self.req).events_batch_POST()
+
+        summary = DataItemSummary.query().filter_by(experimentgroup_id=1, key='score').one()
+        assert (summary.count, summary.sum, summary.min, summary.max) == (3, 60, 10, 30)
+
+    def test_experimentgroup_summary_GET(self):
+        DataItemSummary.add_dataitems([([1], 'score', 2), ([1], 'time', 4), ([2], 'score', 8)])
+        self.req.swagger_data = {'appid': 1, 'expid': 1, 'expgroupid': 1}
+        response = Experiments(self.req).experimentgroup_summary_GET()
+
+        assert list(map(lambda _: (_['key'], _['count'], _['sum']), response)) == [('score', 1, 2), ('time', 1, 4)]
+
+    def test_experimentgroup_summary_GET_nonexistent_experimentgroup(self):
+        self.req.swagger_data = {'appid': 2, 'expid': 1, 'expgroupid': 1}
+        response = Experiments(self.req).experimentgroup_summary_GET()
+
+        assert response.status_code == 400
@@ -0,0 +1,155 @@
+import datetime
+import os
+import tempfile
+from sqlalchemy import (create_engine, event)
+from .base_test import BaseTest
+from ..models import (Application, Client, Experiment, ExperimentGroup, DataItem, DataItemSummary)
+from ..models.meta import Base
+from experiment_server.utils.bandit_counts import get_counts
+from experiment_server.utils.event_buffer import EventBuffer
+from experiment_server.utils.event_dedup import is_duplicate
+from experiment_server.views.clients import Clients
+import experiment_server.utils.event_buffer as event_buffer
+
+
+def get_row(key):
+    return {'client_id': 1, 'key': key, 'value': 10,
+            'startDatetime': datetime.datetime(2016, 6, 6, 6, 6, 6),
+            'endDatetime': datetime.datetime(2016, 6, 7, 6, 6, 6)}
+
+
+class TestEventBuffer(BaseTest):
+    def setUp(self):
+        super(TestEventBuffer, self).setUp()
+        # Buffer writes from its own thread, so it can not use in-memory database of the tests
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        self.buffer_engine = create_engine('sqlite:///%s' % self.path)
+        Base.metadata.create_all(self.buffer_engine)
+
+    def tearDown(self):
+        super(TestEventBuffer, self).tearDown()
+        self.buffer_engine.dispose()
+        os.remove(self.path)
+
+    def count_rows(self):
+        with self.buffer_engine.connect() as connection:
+            return len(connection.execute(DataItem.__table__.select()).fetchall())
+
+    def test_stop_writes_queued_rows(self):
+        buffer = EventBuffer(self.buffer_engine, batch_size=2, flush_interval=60)
+        buffer.start()
+        for key in ['key1', 'key2', 'key3']:
+            assert buffer.put(get_row(key))
+        buffer.stop()
+
+        assert self.count_rows() == 3
+        assert buffer.put(get_row('key4')) is False
+
+    def test_rows_are_written_after_flush_interval(self):
+        buffer = EventBuffer(self.buffer_engine, flush_interval=0.01)
+        buffer.start()
+        buffer.put(get_row('key1'))
+        for i in range(100):
+            if self.count_rows() == 1:
+                break
+            buffer.stopping.wait(0.05)
+        buffer.stop()
+
+        assert self.count_rows() == 1
+
+    def test_failed_write_is_written_again(self):
+        self.init_database()
+        self.init_databaseData()
+        buffer = EventBuffer(self.buffer_engine)
+        buffer.write([(dict(get_row('reward'), value=1), [1])])
+        self.buffer_engine.execute('DROP TABLE dataitems')
+        item = (dict(get_row('reward'), value=1), [2])
+        buffer.failed = buffer.write([item])
+
+        assert buffer.failed == [item]
+        assert get_counts(1) == (1.0, 1.0)
+        assert get_counts(2) == (0.0, 0.0)
+        buffer.retry()
+        assert buffer.failed == [item]
+        assert buffer.retry_delay == 2 * buffer.flush_interval
+        Base.metadata.create_all(self.buffer_engine)
+        buffer.retry()
+        assert buffer.failed == []
+        assert buffer.retry_delay == buffer.flush_interval
+        assert get_counts(2) == (1.0, 1.0)
+        assert self.count_rows() == 1
+
+    def test_stop_writes_failed_rows(self):
+        buffer = EventBuffer(self.buffer_engine, flush_interval=60)
+        buffer.failed = [(get_row('key1'), [1])]
+        buffer.start()
+        buffer.put(get_row('key2'))
+        buffer.stop()
+
+        assert self.count_rows() == 2
+
+    def test_only_rows_which_can_not_be_written_are_dropped(self):
+        event.listen(self.buffer_engine, 'connect', lambda connection, record: connection.execute(
+            'PRAGMA foreign_keys=ON'))
+        self.buffer_engine.dispose()
+        self.buffer_engine.execute(Client.__table__.insert(), {'id': 1, 'clientname': 'First client'})
+        buffer = EventBuffer(self.buffer_engine)
+        items = [(get_row('key1'), []), (dict(get_row('key2'), client_id=2), []), (get_row('key3'), [])]
+
+        assert buffer.write(items) == []
+        assert self.count_rows() == 2
+
+    def test_rows_queued_twice_are_counted_once(self):
+        buffer = EventBuffer(self.buffer_engine)
+        buffer.write([(dict(get_row('key1'), event_id='abc'), [1]), (dict(get_row('key1'), event_id='abc'), [1])])
+
+        assert self.count_rows() == 1
+        with self.buffer_engine.connect() as connection:
+            summary = connection.execute(DataItemSummary.__table__.select()).fetchone()
+        assert (summary['count'], summary['sum']) == (1, 10.0)
+
+    def test_retry_of_queued_row_is_duplicate(self):
+        buffer = EventBuffer(self.buffer_engine)
+        row = dict(get_row('key1'), event_id='abc')
+
+        assert not is_duplicate(row)
+        buffer.put(row)
+        assert is_duplicate(dict(row))
+        buffer.flush()
+        # Written retries are found from dataitems
+        with self.buffer_engine.connect() as connection:
+            assert is_duplicate(dict(row), connection)
+
+    def test_put_fails_when_full(self):
+        buffer = EventBuffer(self.buffer_engine, max_size=1)
+
+        assert buffer.put(get_row('key1'))
+        assert buffer.put(get_row('key2')) is False
+        buffer.flush()
+        assert self.count_rows() == 1
+
+    def test_events_POST_queues_dataitem(self):
+        self.init_database()
+        self.init_databaseData()
+        now = datetime.datetime.now()
+        Experiment.save(Experiment(name='Buffered Experiment', application_id=1,
+                                   startDatetime=now - datetime.timedelta(days=1),
+                                   endDatetime=now + datetime.timedelta(days=1),
+                                   experimentgroups=[ExperimentGroup.get(1)]))
+        event_buffer.buffer = EventBuffer(self.buffer_engine)
+        dataitems_before = len(DataItem.all())
+
+        req = self.dummy_request()
+        req.headers['authorization'] = Application.get(1).apikey
+        req.headers['clientname'] = 'First client'
+        req.json_body = {'key': 'key1', 'value': 10,
+                         'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'}
+        response = Clients(req).events_POST()
+
+        assert req.response.status_code == 202
+        assert response == {'client_id': 1, 'key': 'key1', 'value': 10, 'event_id': None,
+                            'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-07 06:06:06'}
+        assert len(DataItem.all()) == dataitems_before
+        event_buffer.buffer.flush()
+        assert self.count_rows() == 1
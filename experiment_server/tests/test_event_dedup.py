@@ -0,0 +1,161 @@
+import datetime
+import io
+import json
+from .base_test import BaseTest
+from ..models import (Application, DataItem, DataItemSummary, Experiment, ExperimentGroup)
+import experiment_server.utils.event_dedup as event_dedup
+from experiment_server.utils.event_dedup import (RotatingBloomFilter, clear_event_dedup, drop_duplicates,
+                                                 get_statistics, is_duplicate)
+from experiment_server.views.clients import Clients
+from experiment_server.views.metrics import Metrics
+
+
+class TestRotatingBloomFilter(BaseTest):
+    def test_add_remembers_keys(self):
+        bloom = RotatingBloomFilter(capacity=100, error_rate=0.01)
+
+        assert not bloom.add('1:a')
+        assert bloom.add('1:a')
+        assert not bloom.add('2:a')
+
+    def test_keys_are_forgotten_after_generations(self):
+        bloom = RotatingBloomFilter(capacity=100, error_rate=0.01, window=datetime.timedelta(hours=1))
+        bloom.add('1:a')
+        bloom.started_at -= datetime.timedelta(hours=1)
+
+        assert bloom.add('1:a')
+        bloom.started_at -= datetime.timedelta(hours=1)
+        bloom.add('1:b')
+        bloom.started_at -= datetime.timedelta(hours=1)
+        assert not bloom.add('1:a')
+
+    def test_full_generation_is_rotated(self):
+        bloom = RotatingBloomFilter(capacity=2, error_rate=0.01)
+        bloom.add('1:a')
+        bloom.add('1:b')
+        bloom.add('1:c')
+
+        assert bloom.count == 1
+
+
+class TestEventDedup(BaseTest):
+    def setUp(self):
+        super(TestEventDedup, self).setUp()
+        self.init_database()
+        self.init_databaseData()
+        self.req = self.dummy_request()
+        now = datetime.datetime.now()
+        Experiment.save(Experiment(name='Dedup Experiment', application_id=1,
+                                   startDatetime=now - datetime.timedelta(days=1),
+                                   endDatetime=now + datetime.timedelta(days=1),
+                                   experimentgroups=[ExperimentGroup.get(1)]))
+        self.req.headers['authorization'] = Application.get(1).apikey
+        self.req.headers['clientname'] = 'First client'
+
+    def tearDown(self):
+        super(TestEventDedup, self).tearDown()
+        event_dedup.enabled = True
+
+    def get_event(self, event_id=None, key='key1'):
+        event = {'key': key, 'value': 10, 'startDatetime': '2016-06-06 06:06:06',
+                 'endDatetime': '2016-06-07 06:06:06'}
+        if event_id is not None:
+            event['event_id'] = event_id
+        return event
+
+    def count_dataitems(self, event_id):
+        return DataItem.query().filter(DataItem.event_id == event_id).count()
+
+    def test_events_POST_saves_retried_event_once(self):
+        self.req.json_body = self.get_event('retry-1')
+        first = Clients(self.req).events_POST()
+        second = Clients(self.req).events_POST()
+
+        assert 'duplicate' not in first
+        assert first['event_id'] == 'retry-1'
+        assert second['duplicate'] is True
+        assert self.count_dataitems('retry-1') == 1
+
+    def test_events_POST_answers_duplicate_of_forgotten_event_id(self):
+        self.req.json_body = self.get_event('retry-1')
+        Clients(self.req).events_POST()
+        # Filter forgets event_ids after a restart, after its window, and in other processes
+        clear_event_dedup()
+        response = Clients(self.req).events_POST()
+
+        assert response['duplicate'] is True
+        assert self.count_dataitems('retry-1') == 1
+        assert get_statistics()['duplicates'] == 1
+
+    def test_events_POST_keeps_events_without_event_id(self):
+        dataitems_before = len(DataItem.all())
+        self.req.json_body = self.get_event()
+        Clients(self.req).events_POST()
+        Clients(self.req).events_POST()
+
+        assert len(DataItem.all()) == dataitems_before + 2
+
+    def test_events_batch_POST_marks_duplicates(self):
+        self.req.json_body = [self.get_event('batch-1'), self.get_event('batch-2')]
+        Clients(self.req).events_batch_POST()
+        self.req.json_body = [self.get_event('batch-2'), self.get_event('batch-3'), self.get_event('batch-3')]
+        response = Clients(self.req).events_batch_POST()
+
+        assert response == [{'status': 200, 'duplicate': True}, {'status': 200}, {'status': 200, 'duplicate': True}]
+        assert list(map(self.count_dataitems, ['batch-1', 'batch-2', 'batch-3'])) == [1, 1, 1]
+
+    def test_events_batch_POST_marks_duplicates_of_forgotten_event_ids(self):
+        self.req.json_body = [self.get_event('batch-1')]
+        Clients(self.req).events_batch_POST()
+        clear_event_dedup()
+        self.req.json_body = [self.get_event('batch-1'), self.get_event('batch-2')]
+        response = Clients(self.req).events_batch_POST()
+        summary = DataItemSummary.query().filter(DataItemSummary.key == 'key1').one()
+
+        assert response == [{'status': 200, 'duplicate': True}, {'status': 200}]
+        assert summary.count == 2
+
+    def test_events_stream_POST_counts_duplicates(self):
+        self.req.body_file = io.BytesIO(json.dumps(self.get_event(7)).encode('utf-8'))
+        Clients(self.req).events_stream_POST()
+        body = '\n'.join(map(json.dumps, [self.get_event(7), self.get_event(8), self.get_event()]))
+        self.req.body_file = io.BytesIO(body.encode('utf-8'))
+        response = Clients(self.req).events_stream_POST()
+
+        assert response == {'received': 3, 'saved': 2, 'duplicates': 1, 'errors': []}
+        assert self.count_dataitems('7') == 1
+
+    def test_false_positive_is_not_dropped(self):
+        event_dedup._filter.add('1:never-saved')
+
+        assert not is_duplicate({'client_id': 1, 'event_id': 'never-saved'})
+        assert get_statistics()['suspected'] == 1
+        assert get_statistics()['duplicates'] == 0
+
+    def test_unique_index_is_backstop(self):
+        DataItem.insert_rows([dict(self.get_event('forgotten'), client_id=1,
+                                   startDatetime=datetime.datetime(2016, 6, 6, 6, 6, 6),
+                                   endDatetime=datetime.datetime(2016, 6, 7, 6, 6, 6))])
+        # Filter has forgotten the event_id, e.g. after restart
+        rows = drop_duplicates([{'client_id': 1, 'event_id': 'forgotten', 'key': 'key1', 'value': 10,
+                                 'startDatetime': datetime.datetime(2016, 6, 6, 6, 6, 6),
+                                 'endDatetime': datetime.datetime(2016, 6, 7, 6, 6, 6)}])
+        DataItem.insert_rows(rows)
+
+        assert len(rows) == 1
+        assert self.count_dataitems('forgotten') == 1
+
+    def test_disabled_dedup_keeps_everything(self):
+        event_dedup.enabled = False
+        rows = [{'client_id': 1, 'event_id': 'a'}, {'client_id': 1, 'event_id': 'a'}]
+
+        assert drop_duplicates(rows) == rows
+
+    def test_metrics_GET_has_event_dedup(self):
+        self.req.json_body = self.get_event('metrics-1')
+        Clients(self.req).events_POST()
+        Clients(self.req).events_POST()
+        response = Metrics(self.req).metrics_GET()
+
+        assert response['event_dedup']['checked'] == 2
+        assert response['event_dedup']['duplicates'] == 1
@@ -1,5 +1,7 @@
 
 import datetime
+import json
+import transaction
 from .base_test import BaseTest
 from ..models import (Application, Experiment, Client, ExperimentGroup, Configuration)
 from experiment_server.views.experiments import Experiments
@@ -193,6 +195,7 @@ class TestExperimentsREST(BaseTest):
                             'id': 1,
                             'name': 'Group A',
                             'experiment_id': 1,
+                            'weight': 1.0,
                            'configurations': [
                                {'experimentgroup_id': 1, 'key': 'v1', 'id': 1, 'value': 0.5},
                                {'experimentgroup_id': 1, 'key': 'v2', 'id': 2, 'value': True}],
@@ -203,6 +206,7 @@ class TestExperimentsREST(BaseTest):
                                 'value': 10,
                                 'startDatetime': '2016-01-01 00:00:00',
                                 'endDatetime': '2016-01-01 01:01:01',
+                                'event_id': None,
                                 'client': {'id': 1, 'clientname': 'First client'}
                                 },
                                {'id': 2,
@@ -211,11 +215,28 @@ class TestExperimentsREST(BaseTest):
                                 'value': 0.5,
                                 'startDatetime': '2016-02-02 01:01:02',
                                 'endDatetime': '2016-02-02 02:02:02',
+                                'event_id': None,
                                 'client': {'id': 1, 'clientname': 'First client'}
                                 }
                            ],
                            'clients': [{'id': 1, 'clientname': 'First client'}]}
-        assert response == experimentgroup
+        assert json.loads(response.body.decode('utf-8')) == experimentgroup
+
+    def test_experimentgroup_GET_one_paginated(self):
+        # Streamed response reads on its own connection, so data must be committed to be seen by the second page
+        transaction.commit()
+        self.req.swagger_data = {'appid': 1, 'expgroupid': 1, 'expid': 1, 'limit': 1}
+        response = Experiments(self.req).experimentgroup_GET_one()
+        first_page = json.loads(response.body.decode('utf-8'))
+
+        self.req.swagger_data = {'appid': 1, 'expgroupid': 1, 'expid': 1, 'limit': 1,
+                                 'after': first_page['dataitems'][-1]['id']}
+        response = Experiments(self.req).experimentgroup_GET_one()
+        second_page = json.loads(response.body.decode('utf-8'))
+
+        assert list(map(lambda _: _['id'], first_page['dataitems'])) == [1]
+        assert list(map(lambda _: _['id'], second_page['dataitems'])) == [2]
+        assert second_page['clients'] == [{'id': 1, 'clientname': 'First client'}]
 
     def test_experimentgroup_GET_one_nonexistent_experiment(self):
         self.req.swagger_data = {'appid': 1,'expgroupid': 1, 'expid': 2}
@@ -235,3 +256,23 @@ class TestExperimentsREST(BaseTest):
         httpExperiments = Experiments(self.req)
         response = httpExperiments.experimentgroup_DELETE()
         assert response.status_code == 400
+
+    def test_experimentgroup_PUT(self):
+        self.req.swagger_data = {'appid': 1, 'expid': 1, 'expgroupid': 2,
+                                 'experimentgroup': ExperimentGroup(weight=9.0)}
+        httpExperiments = Experiments(self.req)
+        response = httpExperiments.experimentgroup_PUT()
+
+        assert response == {'id': 2, 'name': 'Group B', 'experiment_id': 1, 'weight': 9.0}
+        assert ExperimentGroup.get(2).weight == 9.0
+
+    def test_experimentgroup_PUT_negative_weight_and_nonexistent_experimentgroup(self):
+        self.req.swagger_data = {'appid': 1, 'expid': 1, 'expgroupid': 2,
+                                 'experimentgroup': ExperimentGroup(weight=-1.0)}
+        httpExperiments = Experiments(self.req)
+        assert httpExperiments.experimentgroup_PUT().status_code == 400
+        assert ExperimentGroup.get(2).weight == 1.0
+
+        self.req.swagger_data = {'appid': 1, 'expid': 2, 'expgroupid': 2,
+                                 'experimentgroup': ExperimentGroup(weight=2.0)}
+        assert httpExperiments.experimentgroup_PUT().status_code == 400
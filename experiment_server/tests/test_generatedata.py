@@ -0,0 +1,134 @@
+import csv
+import datetime
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+
+import experiment_server.scripts.generatedata as generatedata
+from experiment_server.scripts.generatedata import copy_rows, generate
+from ..models.meta import Base
+from ..models import (Application, BanditArm, Client, DataItem, DataItemSummary, Experiment, ExperimentGroup)
+from ..models.clients_experimentgroups import clients_experimentgroups
+from ..models.dataitemsummaries import summarize
+from ..utils.bandit_counts import count_rewards
+
+
+class CopyCursor:
+    """ Reads what copy_rows sends to COPY """
+    def __init__(self):
+        self.rows = None
+
+    def copy_expert(self, sql, buffer):
+        self.sql = sql
+        self.rows = list(csv.reader(buffer))
+
+    def cursor(self):
+        return self
+
+
+class CopyConnection:
+    def __init__(self):
+        self.dialect = postgresql.dialect()
+        self.connection = CopyCursor()
+
+
+class TestGenerateData(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(handle)
+        self.engine = create_engine('sqlite:///%s' % self.path)
+        Base.metadata.create_all(self.engine)
+        generatedata.CHUNK_SIZE = 7
+
+    def tearDown(self):
+        generatedata.CHUNK_SIZE = 10000
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def generate(self, engine=None, random_seed=0):
+        return generate(engine or self.engine, applications=2, experiments=3, experimentgroups=2, clients=20,
+                        memberships=2, dataitems=50, random_seed=random_seed, log=lambda _: None)
+
+    def select(self, table, engine=None):
+        with (engine or self.engine).connect() as connection:
+            return list(map(dict, connection.execute(select([table]).order_by(*table.primary_key.columns))))
+
+    def test_generate(self):
+        generated = self.generate()
+
+        assert len(generated.apikeys) == 2
+        assert list(map(lambda _: _['id'], self.select(Application.__table__))) == [1, 2]
+        assert len(self.select(Experiment.__table__)) == 6
+        assert len(self.select(ExperimentGroup.__table__)) == 12
+        assert len(self.select(Client.__table__)) == 40
+        assert len(self.select(clients_experimentgroups)) == 80
+        assert len(self.select(DataItem.__table__)) == 100
+        assert generated.get_clientname(generated.apikeys[1], 0) == 'client-2-0'
+
+    def test_generate_continues_ids(self):
+        self.generate()
+        generated = self.generate(random_seed=1)
+
+        assert list(map(lambda _: _['id'], self.select(Application.__table__))) == [1, 2, 3, 4]
+        assert list(map(lambda _: _['id'], self.select(ExperimentGroup.__table__))) == list(range(1, 25))
+        assert list(map(lambda _: _['id'], self.select(Client.__table__))) == list(range(1, 81))
+        assert list(map(lambda _: _['id'], self.select(DataItem.__table__))) == list(range(1, 201))
+        assert generated.clients[generated.apikeys[0]] == (3, 20)
+
+    def test_generate_is_repeatable(self):
+        handle, path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(handle)
+        engine = create_engine('sqlite:///%s' % path)
+        try:
+            Base.metadata.create_all(engine)
+            self.generate()
+            self.generate(engine)
+
+            for table in [Application.__table__, clients_experimentgroups, DataItem.__table__]:
+                assert list(map(lambda _: {key: _[key] for key in _ if 'Datetime' not in key},
+                                self.select(table))) == \
+                    list(map(lambda _: {key: _[key] for key in _ if 'Datetime' not in key},
+                             self.select(table, engine)))
+        finally:
+            engine.dispose()
+            os.remove(path)
+
+    def test_generate_adds_summaries_and_bandit_arms(self):
+        self.generate()
+
+        memberships = {}
+        for row in self.select(clients_experimentgroups):
+            memberships.setdefault(row['client_id'], []).append(row['experimentgroup_id'])
+        dataitems = list(map(lambda _: (memberships[_['client_id']], _['key'], _['value']),
+                             self.select(DataItem.__table__)))
+        summaries = {(_['experimentgroup_id'], _['key']): _ for _ in self.select(DataItemSummary.__table__)}
+        expected = summarize(dataitems)
+        assert len(expected) > 0
+        assert sorted(summaries) == sorted(expected)
+        for key, summary in expected.items():
+            assert summaries[key]['count'] == summary['count']
+            assert abs(summaries[key]['sum'] - summary['sum']) < 1e-6
+            assert (summaries[key]['min'], summaries[key]['max']) == (summary['min'], summary['max'])
+
+        expected = count_rewards(dataitems, 'reward')
+        assert len(expected) > 0
+        assert {_['experimentgroup_id']: (_['successes'], _['trials'])
+                for _ in self.select(BanditArm.__table__)} == expected
+
+    def test_copy_rows_converts_values(self):
+        connection = CopyConnection()
+        start = datetime.datetime(2016, 6, 6, 6, 6, 6)
+        copy_rows(connection, DataItem.__table__, [
+            {'client_id': 1, 'key': 'score', 'value': 10, 'startDatetime': start, 'endDatetime': None},
+            {'client_id': 2, 'key': 'reward', 'value': True, 'startDatetime': start, 'endDatetime': start},
+            {'client_id': 3, 'key': 'name', 'value': 'a "b", c', 'startDatetime': start, 'endDatetime': start}])
+
+        assert connection.connection.sql.startswith(
+            'COPY dataitems ("client_id", "key", "value", "startDatetime", "endDatetime") FROM STDIN')
+        assert connection.connection.rows == [
+            ['1', 'score', '10', '2016-06-06 06:06:06', '\\N'],
+            ['2', 'reward', 'true', '2016-06-06 06:06:06', '2016-06-06 06:06:06'],
+            ['3', 'name', '"a \\"b\\", c"', '2016-06-06 06:06:06', '2016-06-06 06:06:06']]
@@ -0,0 +1,109 @@
+import datetime
+import transaction
+from .base_test import BaseTest
+from ..models import (Application, Client, Experiment, ExperimentGroup)
+from experiment_server.utils.memberships import (get_membership, get_statistics, put_membership)
+from experiment_server.utils.snapshots import get_application_snapshot
+from experiment_server.views.clients import Clients
+from experiment_server.views.experiments import Experiments
+from experiment_server.views.metrics import Metrics
+
+
+class TestMemberships(BaseTest):
+    def setUp(self):
+        super(TestMemberships, self).setUp()
+        self.init_database()
+        self.init_databaseData()
+        self.req = self.dummy_request()
+
+        now = datetime.datetime.now()
+        self.running = Experiment(name='Running Experiment', application_id=1,
+                                  startDatetime=now - datetime.timedelta(days=1),
+                                  endDatetime=now + datetime.timedelta(days=1),
+                                  experimentgroups=[ExperimentGroup.get(1)])
+        Experiment.save(self.running)
+        self.apikey = Application.get(1).apikey
+
+    def post_configurations(self, clientname):
+        self.req.headers['authorization'] = self.apikey
+        self.req.swagger_data = {'clientname': clientname}
+        return Clients(self.req).configurations_POST()
+
+    def post_event(self, clientname):
+        self.req.headers = {'authorization': self.apikey, 'clientname': clientname}
+        self.req.json_body = {'key': 'score', 'value': 10,
+                              'startDatetime': '2016-06-06 06:06:06', 'endDatetime': '2016-06-06 06:06:07'}
+        return Clients(self.req).events_POST()
+
+    def membership(self, clientname):
+        return get_membership(get_application_snapshot(self.apikey), clientname)
+
+    def test_configurations_POST_caches_membership(self):
+        self.post_configurations('Chell')
+        membership = self.membership('Chell')
+        client = Client.get_by('clientname', 'Chell')
+
+        assert membership.client_id == client.id
+        assert set(membership.experimentgroup_ids) == set(map(lambda _: _.id, client.experimentgroups))
+
+    def test_configurations_POST_uses_cached_membership(self):
+        first = self.post_configurations('Chell')
+        hits_before = get_statistics()['hits']
+        second = self.post_configurations('Chell')
+
+        assert get_statistics()['hits'] == hits_before + 1
+        assert second.body == first.body
+
+    def test_events_POST_uses_cached_membership(self):
+        self.post_configurations('Chell')
+        hits_before = get_statistics()['hits']
+        response = self.post_event('Chell')
+
+        assert get_statistics()['hits'] == hits_before + 1
+        assert response['client_id'] == Client.get_by('clientname', 'Chell').id
+
+    def test_client_DELETE_evicts_membership(self):
+        self.post_configurations('Chell')
+        client = Client.get_by('clientname', 'Chell')
+        self.req.swagger_data = {'appid': 1, 'clientid': client.id}
+        Clients(self.req).client_DELETE()
+
+        assert self.membership('Chell') is None
+        assert get_statistics()['invalidations'] == 1
+
+    def test_client_DELETE_evicts_membership_again_after_commit(self):
+        self.post_configurations('Chell')
+        membership = self.membership('Chell')
+        self.req.swagger_data = {'appid': 1, 'clientid': membership.client_id}
+        Clients(self.req).client_DELETE()
+        # Another request read the Client before the DELETE committed
+        put_membership(get_application_snapshot(self.apikey), 'Chell', membership.client_id,
+                       membership.experimentgroup_ids)
+        transaction.commit()
+
+        assert self.membership('Chell') is None
+
+    def test_experimentgroup_DELETE_evicts_membership(self):
+        self.post_configurations('Chell')
+        expgroup_id = self.membership('Chell').experimentgroup_ids[0]
+        expgroup = ExperimentGroup.get(expgroup_id)
+        self.req.swagger_data = {'appid': 1, 'expid': expgroup.experiment_id, 'expgroupid': expgroup_id}
+        Experiments(self.req).experimentgroup_DELETE()
+
+        assert self.membership('Chell') is None
+        assert get_statistics()['invalidations'] == 1
+
+    def test_membership_of_unknown_client_is_not_cached(self):
+        self.post_event('Cave Johnson')
+
+        assert self.membership('Cave Johnson') is None
+        assert get_statistics()['entries'] == 0
+
+    def test_metrics_GET(self):
+        self.post_configurations('Chell')
+        self.post_configurations('Chell')
+        response = Metrics(self.req).metrics_GET()
+
+        assert response['membership_cache'] == get_statistics()
+        assert response['membership_cache']['entries'] == 1
+        assert response['membership_cache']['hits'] == 1
@@ -0,0 +1,132 @@
+import transaction
+from pyramid import testing
+from sqlalchemy import event
+from .base_test import BaseTest
+from ..models import Application
+import experiment_server.utils.rate_limits as rate_limits
+from experiment_server.utils.apikeys import (get_application_record, refresh_application_records)
+from experiment_server.utils.rate_limits import (RateLimitExceeded, TokenBucket, check_rate_limit, get_statistics)
+from experiment_server.views.applications import Applications
+from experiment_server.views.clients import (Clients, rate_limit_exceeded)
+from experiment_server.views.metrics import Metrics
+
+
+class TestTokenBucket(BaseTest):
+    def test_take_until_empty(self):
+        bucket = TokenBucket(1, rate=2, burst=3, now=0.0)
+
+        assert [bucket.take(0.0) for i in range(4)] == [0, 0, 0, 0.5]
+        assert bucket.allowed == 3
+        assert bucket.limited == 1
+
+    def test_tokens_refill_up_to_burst(self):
+        bucket = TokenBucket(1, rate=2, burst=3, now=0.0)
+        for i in range(3):
+            bucket.take(0.0)
+
+        assert bucket.take(0.5) == 0
+        assert bucket.take(0.5) == 0.5
+        assert bucket.get_statistics(100.0)['tokens'] == 3
+
+
+class TestRateLimits(BaseTest):
+    def setUp(self):
+        super(TestRateLimits, self).setUp()
+        self.init_database()
+        self.init_databaseData()
+        self.req = self.dummy_request()
+        app = Application.get(1)
+        app.rate_limit = 0.001
+        app.rate_burst = 2
+        Application.save(app)
+        refresh_application_records()
+        self.apikey = app.apikey
+
+    def tearDown(self):
+        super(TestRateLimits, self).tearDown()
+        rate_limits.default_rate = 0
+        rate_limits.default_burst = 0
+
+    def post_events(self):
+        self.req.headers['authorization'] = self.apikey
+        self.req.headers['clientname'] = 'First client'
+        self.req.json_body = []
+        return Clients(self.req).events_batch_POST()
+
+    def test_apikey_is_limited_after_burst(self):
+        self.post_events()
+        self.post_events()
+
+        with self.assertRaises(RateLimitExceeded):
+            self.post_events()
+
+    def test_limited_request_does_not_read_database(self):
+        self.post_events()
+        self.post_events()
+        statements = []
+        event.listen(self.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        with self.assertRaises(RateLimitExceeded):
+            self.post_events()
+        assert statements == []
+
+    def test_apikeys_have_own_buckets(self):
+        self.post_events()
+        self.post_events()
+        self.apikey = Application.get(2).apikey
+
+        assert self.post_events() == []
+
+    def test_default_limit_applies_to_applications_without_own_limit(self):
+        rate_limits.default_rate = 0.001
+        rate_limits.default_burst = 1
+        record = get_application_record(Application.get(2).apikey)
+        check_rate_limit(record)
+
+        with self.assertRaises(RateLimitExceeded):
+            check_rate_limit(record)
+
+    def test_applications_without_limit_are_not_limited(self):
+        record = get_application_record(Application.get(2).apikey)
+        for i in range(100):
+            check_rate_limit(record)
+
+        assert get_statistics()['applications'] == []
+
+    def test_updated_limit_is_used(self):
+        self.post_events()
+        self.post_events()
+        self.req.swagger_data = {'id': 1, 'application': Application(id=1, name='App 1', rate_limit=0.001,
+                                                                      rate_burst=3)}
+        Applications(self.req).applications_PUT()
+        transaction.commit()
+
+        assert self.post_events() == []
+        assert get_statistics()['applications'][0]['burst'] == 3
+
+    def test_invalid_limit_is_rejected(self):
+        self.req.swagger_data = {'application': Application(name='App 3', rate_limit=0)}
+        response = Applications(self.req).applications_POST()
+
+        assert response.status_code == 400
+
+    def test_rate_limit_exceeded_returns_429(self):
+        response = rate_limit_exceeded(RateLimitExceeded(1, 0.2), testing.DummyRequest(path='/events'))
+
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '1'
+
+    def test_metrics_GET_has_rate_limits(self):
+        for i in range(3):
+            try:
+                self.post_events()
+            except RateLimitExceeded as e:
+                pass
+        response = Metrics(self.req).metrics_GET()['rate_limits']
+
+        assert response['default_rate'] == 0
+        assert len(response['applications']) == 1
+        assert response['applications'][0]['application_id'] == 1
+        assert response['applications'][0]['allowed'] == 2
+        assert response['applications'][0]['limited'] == 1
+        assert response['applications'][0]['request_rate'] > 0
@@ -0,0 +1,131 @@
+import datetime
+import json
+from .base_test import BaseTest
+from ..models import (Application, Experiment, ExperimentGroup)
+from experiment_server.utils.snapshots import (get_application_snapshot, invalidate_application_snapshots)
+from experiment_server.views.clients import Clients
+from experiment_server.views.experiments import Experiments
+
+
+class TestApplicationSnapshots(BaseTest):
+    def setUp(self):
+        super(TestApplicationSnapshots, self).setUp()
+        self.init_database()
+        self.init_databaseData()
+        self.req = self.dummy_request()
+
+        now = datetime.datetime.now()
+        self.running = Experiment(name='Running Experiment', application_id=1,
+                                  startDatetime=now - datetime.timedelta(days=1),
+                                  endDatetime=now + datetime.timedelta(days=1),
+                                  experimentgroups=[ExperimentGroup.get(1)])
+        Experiment.save(self.running)
+        self.finished = Experiment(name='Finished Experiment', application_id=1,
+                                   startDatetime=now - datetime.timedelta(days=2),
+                                   endDatetime=now - datetime.timedelta(days=1))
+        Experiment.save(self.finished)
+
+    def test_snapshot_has_application_data(self):
+        app = Application.get(1)
+        snapshot = get_application_snapshot(app.apikey)
+
+        assert snapshot.id == app.id
+        assert snapshot.name == app.name
+        assert snapshot.apikey == app.apikey
+        assert snapshot.experiment_distribution == app.experiment_distribution
+
+    def test_snapshot_does_not_have_finished_experiments(self):
+        snapshot = get_application_snapshot(Application.get(1).apikey)
+
+        assert self.running.id in map(lambda _: _.id, snapshot.experiments)
+        assert self.finished.id not in map(lambda _: _.id, snapshot.experiments)
+
+    def test_snapshot_expires_when_experiment_ends(self):
+        snapshot = get_application_snapshot(Application.get(1).apikey)
+
+        assert snapshot.expires_at <= self.running.endDatetime
+
+    def test_snapshot_has_rendered_configurations(self):
+        snapshot = get_application_snapshot(Application.get(1).apikey)
+        experiment = list(filter(lambda _: _.id == self.running.id, snapshot.experiments))[0]
+        expgroup = experiment.experimentgroups[0]
+
+        assert expgroup.id == 1
+        assert list(expgroup.configurations) == list(map(lambda _: _.as_dict(),
+                                                         ExperimentGroup.get(1).configurations))
+
+    def test_snapshot_has_configurations_as_json(self):
+        snapshot = get_application_snapshot(Application.get(1).apikey)
+        experiment = list(filter(lambda _: _.id == self.running.id, snapshot.experiments))[0]
+        expgroup = experiment.experimentgroups[0]
+
+        assert json.loads(expgroup.payload.decode('utf-8')) == list(expgroup.configurations)
+
+    def test_configurations_POST_serves_payload(self):
+        Experiment.destroy(Experiment.get(1))
+        app = Application.get(1)
+        snapshot = get_application_snapshot(app.apikey)
+        expgroup = list(filter(lambda _: _.id == self.running.id, snapshot.experiments))[0].experimentgroups[0]
+
+        self.req.headers['authorization'] = app.apikey
+        self.req.swagger_data = {'clientname': 'Chell'}
+        response = Clients(self.req).configurations_POST()
+
+        assert response.body == expgroup.payload
+        assert response.content_type == 'application/json'
+
+    def test_snapshot_is_none_with_unknown_apikey(self):
+        assert get_application_snapshot('no such apikey') is None
+
+    def test_snapshot_is_reused(self):
+        apikey = Application.get(1).apikey
+
+        assert get_application_snapshot(apikey) is get_application_snapshot(apikey)
+
+    def test_snapshot_is_reloaded_after_invalidation(self):
+        apikey = Application.get(1).apikey
+        snapshot = get_application_snapshot(apikey)
+        invalidate_application_snapshots()
+
+        assert get_application_snapshot(apikey) is not snapshot
+
+    def test_snapshot_is_reloaded_after_commit(self):
+        import transaction
+        apikey = Application.get(1).apikey
+        invalidate_application_snapshots()
+        # Loaded before the writing transaction commits
+        snapshot = get_application_snapshot(apikey)
+        transaction.commit()
+
+        assert get_application_snapshot(apikey) is not snapshot
+
+    def test_experiments_POST_invalidates_snapshot(self):
+        apikey = Application.get(1).apikey
+        count_before = len(get_application_snapshot(apikey).experiments)
+
+        now = datetime.datetime.now()
+        self.req.swagger_data = {'appid': 1,
+            'experiment': Experiment(
+                name='Snapshot Experiment',
+                startDatetime=now + datetime.timedelta(days=1),
+                endDatetime=now + datetime.timedelta(days=2))}
+        Experiments(self.req).experiments_POST()
+
+        assert len(get_application_snapshot(apikey).experiments) == count_before + 1
+
+    def test_running_experiments(self):
+        now = datetime.datetime.now()
+        app = Application.get(1)
+        snapshot = get_application_snapshot(app.apikey)
+
+        assert self.running in app.running_experiments(now)
+        assert self.finished not in app.running_experiments(now)
+        assert self.running.id in map(lambda _: _.id, snapshot.running_experiments(now))
+        assert self.running.id not in map(lambda _: _.id, snapshot.running_experiments(now + datetime.timedelta(days=2)))
+
+    def test_running_at(self):
+        now = datetime.datetime.now()
+        running = Experiment.running_at(now).all()
+
+        assert self.running in running
+        assert self.finished not in running
@@ -0,0 +1,42 @@
+import datetime
+import unittest
+import pytest
+from experiment_server.utils.timestamps import (UTC, format_timestamp, parse_timestamp)
+
+
+class TestTimestamps(unittest.TestCase):
+    def test_parses_old_format_as_utc(self):
+        assert parse_timestamp('2016-06-06 06:06:06') == datetime.datetime(2016, 6, 6, 6, 6, 6, tzinfo=UTC)
+
+    def test_parses_iso8601(self):
+        assert parse_timestamp('2016-06-06T06:06:06Z') == datetime.datetime(2016, 6, 6, 6, 6, 6, tzinfo=UTC)
+        assert parse_timestamp('2016-06-06T06:06:06.5') == datetime.datetime(2016, 6, 6, 6, 6, 6, 500000, tzinfo=UTC)
+        assert parse_timestamp('2016-06-06T06:06:06.1234567+00:00') == \
+            datetime.datetime(2016, 6, 6, 6, 6, 6, 123456, tzinfo=UTC)
+
+    def test_converts_offsets_to_utc(self):
+        expected = datetime.datetime(2016, 6, 6, 3, 36, 6, tzinfo=UTC)
+
+        assert parse_timestamp('2016-06-06T06:06:06+02:30') == expected
+        assert parse_timestamp('2016-06-06T06:06:06+0230') == expected
+        assert parse_timestamp('2016-06-06T01:06:06-02:30') == expected
+        assert parse_timestamp('2016-06-06T05:36:06+02') == expected
+
+    def test_parses_epoch_milliseconds(self):
+        assert parse_timestamp(0) == datetime.datetime(1970, 1, 1, tzinfo=UTC)
+        assert parse_timestamp(1465193166000) == datetime.datetime(2016, 6, 6, 6, 6, 6, tzinfo=UTC)
+        assert parse_timestamp(1465193166000.5) == datetime.datetime(2016, 6, 6, 6, 6, 6, 500, tzinfo=UTC)
+
+    def test_rejects_malformed_timestamps(self):
+        for value in ['', '2016-06-06', '2016/06/06 06:06:06', '2016-06-06 06:06:0x', '2016-13-06 06:06:06',
+                      '2016-06-06 06:06:06.', '2016-06-06 06:06:06 UTC', '2016-06-06 06:06:06+2:00', 10 ** 20]:
+            with pytest.raises(ValueError):
+                parse_timestamp(value)
+        for value in [None, True, ['2016-06-06 06:06:06']]:
+            with pytest.raises(TypeError):
+                parse_timestamp(value)
+
+    def test_format_timestamp(self):
+        assert format_timestamp(datetime.datetime(2016, 6, 6, 6, 6, 6)) == '2016-06-06 06:06:06'
+        assert format_timestamp(parse_timestamp('2016-06-06T08:06:06+02:00')) == '2016-06-06 06:06:06'
+        assert format_timestamp(None) == 'None'
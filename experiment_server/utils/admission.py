@@ -0,0 +1,218 @@
+import datetime
+import threading
+
+from pyramid.httpexceptions import HTTPServiceUnavailable
+from pyramid.settings import asbool
+
+from experiment_server.utils.log import print_log
+
+"""
+Admission control for the fixed thread pool of waitress. Requests are put in route classes, and every class runs at most
+concurrency requests at a time. Requests over the limit wait in a bounded queue for at most queue_timeout, and are
+answered with 503 and Retry-After if the queue is full or the wait times out. Client endpoints and the admin API have
+their own limits, so a heavy report, e.g. GET of an ExperimentGroup with its data-items, can not take every thread
+from POST /configurations and POST /events. A request keeps its slot until its body has been sent, since streamed
+bodies read the database while they are sent. Running and waiting requests both hold a thread of waitress, so
+concurrency and queue size of every class must add up to at most its threads. Otherwise requests over the limit wait
+in the task queue of waitress, which the limits do not see. Other routes, and OPTIONS requests, are not limited.
+"""
+
+CLIENT_PATHS = {'/configurations', '/events', '/events/batch', '/events/stream'}
+ADMIN_PREFIX = '/applications'
+# Route class to default (concurrency, queue_size)
+DEFAULT_LIMITS = {'client': (6, 3), 'admin': (2, 1)}
+# Default threads of waitress the limits must fit in
+DEFAULT_THREADS = 12
+
+
+class AdmissionLimiter:
+    def __init__(self, name, concurrency, queue_size, queue_timeout):
+        """
+        :param name: route class
+        :param concurrency: how many requests run at a time
+        :param queue_size: how many requests wait for a free slot at most
+        :param queue_timeout: seconds a request waits at most
+        """
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Waits for a free slot if every slot is taken and the queue has room
+        :return: None if request was admitted, otherwise reason it was rejected
+        """
+        with self._condition:
+            if self.active < self.concurrency and self.waiting == 0:
+                self.active += 1
+                self.admitted += 1
+                return None
+            if self.waiting >= self.queue_size:
+                self.rejected_queue_full += 1
+                return 'queue full'
+            self.waiting += 1
+            self.queued += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            admitted = self._condition.wait_for(lambda: self.active < self.concurrency, self.queue_timeout)
+            self.waiting -= 1
+            if not admitted:
+                self.rejected_timeout += 1
+                return 'queue timeout'
+            self.active += 1
+            self.admitted += 1
+            return None
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def get_statistics(self):
+        """
+        :return: dictionary with limits, queue depth and counters
+        """
+        return {
+            'concurrency': self.concurrency,
+            'queue_size': self.queue_size,
+            'queue_timeout': self.queue_timeout,
+            'active': self.active,
+            'waiting': self.waiting,
+            'max_waiting': self.max_waiting,
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'rejected': self.rejected_queue_full + self.rejected_timeout,
+            'rejected_queue_full': self.rejected_queue_full,
+            'rejected_timeout': self.rejected_timeout
+        }
+
+
+_limiters = {}
+retry_after = 1
+
+
+def get_route_class(request):
+    """
+    :param request: request before it is routed
+    :return: 'client', 'admin', or None if request is not limited
+    """
+    if request.method == 'OPTIONS':
+        return None
+    if request.path in CLIENT_PATHS:
+        return 'client'
+    if request.path == ADMIN_PREFIX or request.path.startswith(ADMIN_PREFIX + '/'):
+        return 'admin'
+    return None
+
+
+class ReleasingAppIter:
+    """
+    Response body which releases its request's slot when the server closes it, after the body has been sent
+    """
+    def __init__(self, app_iter, release):
+        self.app_iter = app_iter
+        self.release = release
+        self._released = False
+
+    def __iter__(self):
+        return iter(self.app_iter)
+
+    def close(self):
+        try:
+            close = getattr(self.app_iter, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            if not self._released:
+                self._released = True
+                self.release()
+
+
+def create_busy_response():
+    from experiment_server import CORS_HEADERS
+    response = HTTPServiceUnavailable()
+    response.text = 'null'
+    response.headers.update(CORS_HEADERS)
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def admission_tween_factory(handler, registry):
+    """
+    Tween which runs requests of a limited route class only when their AdmissionLimiter admits them
+    """
+    def admission_tween(request):
+        limiter = _limiters.get(get_route_class(request))
+        if limiter is None:
+            return handler(request)
+        reason = limiter.acquire()
+        if reason is not None:
+            print_log(datetime.datetime.now(), request.method, request.path, 'Admit request',
+                'Rejected: %s %s' % (limiter.name, reason))
+            return create_busy_response()
+        try:
+            response = handler(request)
+            response.app_iter = ReleasingAppIter(response.app_iter, limiter.release)
+        except Exception as e:
+            limiter.release()
+            raise
+        return response
+    return admission_tween
+
+
+def set_limiters(limiters):
+    """
+    :param limiters: dictionary from route class to AdmissionLimiter. Classes which are left out are not limited
+    """
+    global _limiters
+    _limiters = limiters
+
+
+def get_statistics():
+    """
+    :return: dictionary from route class to its statistics
+    """
+    return dict(map(lambda _: (_[0], _[1].get_statistics()), _limiters.items()))
+
+
+def includeme(config):
+    """
+    Reads admission settings and adds the tween if admission control is enabled:
+        experiment_server.admission = true|false
+        experiment_server.admission_client_concurrency = <requests>
+        experiment_server.admission_client_queue = <requests>
+        experiment_server.admission_admin_concurrency = <requests>
+        experiment_server.admission_admin_queue = <requests>
+        experiment_server.admission_queue_timeout = <seconds>
+        experiment_server.admission_retry_after = <seconds>
+        experiment_server.admission_threads = <threads of waitress>
+    Raises ValueError if concurrency and queue size of the classes add up to more than admission_threads
+    """
+    global retry_after
+    settings = config.get_settings()
+    if not asbool(settings.get('experiment_server.admission', False)):
+        set_limiters({})
+        return
+
+    queue_timeout = float(settings.get('experiment_server.admission_queue_timeout', 1.0))
+    set_limiters(dict(map(lambda _: (_[0], AdmissionLimiter(
+        _[0],
+        concurrency=int(settings.get('experiment_server.admission_%s_concurrency' % _[0], _[1][0])),
+        queue_size=int(settings.get('experiment_server.admission_%s_queue' % _[0], _[1][1])),
+        queue_timeout=queue_timeout
+    )), DEFAULT_LIMITS.items())))
+    threads = int(settings.get('experiment_server.admission_threads', DEFAULT_THREADS))
+    slots = sum(map(lambda _: _.concurrency + _.queue_size, _limiters.values()))
+    if slots > threads:
+        raise ValueError('Admission limits take %s threads, but waitress has only %s. Lower '
+                         'experiment_server.admission_*_concurrency and _queue' % (slots, threads))
+    retry_after = int(settings.get('experiment_server.admission_retry_after', 1))
+    config.add_tween('experiment_server.utils.admission.admission_tween_factory')
@@ -0,0 +1,109 @@
+import datetime
+import threading
+from collections import namedtuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from experiment_server.models import Application
+from experiment_server.utils.log import print_log
+from experiment_server.utils.transactions import after_commit
+import experiment_server.database.orm as orm_config
+
+"""
+Per-process table from apikey to Application for the client-facing API. Every request to POST /configurations and
+POST /events starts by looking its apikey up here, so requests with unknown apikeys are rejected without a database
+round-trip. The table is loaded when the app starts and replaced whenever a transaction which created, updated or
+deleted an Application has been committed. It is also reloaded after max_age, so Applications created by other processes
+become known.
+"""
+
+
+class ApplicationRecord(namedtuple('ApplicationRecord',
+                                   ['id', 'name', 'apikey', 'experiment_distribution', 'rate_limit', 'rate_burst'])):
+    """
+    Read-only copy of an Application's own columns
+    """
+    __slots__ = ()
+
+
+_lock = threading.Lock()
+_records = {}
+_loaded_at = None
+max_age = datetime.timedelta(seconds=60)
+
+
+def load_application_records(executor=None):
+    """
+    Reads every Application which has an apikey
+    :param executor: connection or engine to read with. Defaults to DBSession, after flushing it
+    :return: dictionary from apikey to ApplicationRecord
+    """
+    if executor is None:
+        Application.flush()
+        executor = orm_config.DBSession
+    table = Application.__table__
+    rows = executor.execute(
+        select([table.c.id, table.c.name, table.c.apikey, table.c.experiment_distribution, table.c.rate_limit,
+                table.c.rate_burst])
+        .where(table.c.apikey != None))
+    return {row.apikey: ApplicationRecord(*row) for row in rows}
+
+
+def refresh_application_records(executor=None):
+    """
+    Replaces the table with Applications read from the database
+    :param executor: connection or engine to read with. Defaults to DBSession
+    """
+    global _records, _loaded_at
+    loaded_at = datetime.datetime.now()
+    records = load_application_records(executor)
+    with _lock:
+        # Do not replace a table which was loaded later
+        if _loaded_at is None or _loaded_at <= loaded_at:
+            _records = records
+            _loaded_at = loaded_at
+
+
+def invalidate_application_records():
+    """
+    Replaces the table once the current transaction has been committed. Call this after writing Applications. Table
+    is read with its own connection, so it never holds Applications which may still be rolled back.
+    """
+    after_commit(refresh_application_records, Application.engine())
+
+
+def get_application_record(apikey):
+    """
+    Finds Application by apikey. Reads the database only if the table has not been loaded for max_age.
+    :param apikey: Application's apikey
+    :return: ApplicationRecord, or None if no Application has given apikey
+    """
+    if _loaded_at is None or datetime.datetime.now() - _loaded_at >= max_age:
+        refresh_application_records()
+    return _records.get(apikey)
+
+
+def clear_application_records():
+    """
+    Empties the table, after which it is loaded again on next use
+    """
+    global _records, _loaded_at
+    with _lock:
+        _records = {}
+        _loaded_at = None
+
+
+def includeme(config):
+    """
+    Reads table settings and loads the table:
+        experiment_server.apikey_max_age = <seconds>
+    """
+    global max_age
+    settings = config.get_settings()
+    max_age = datetime.timedelta(seconds=int(settings.get('experiment_server.apikey_max_age', 60)))
+    try:
+        refresh_application_records(Application.engine())
+    except SQLAlchemyError as e:
+        # Database may not have been initialized yet, so the table is loaded on first use instead
+        print_log(datetime.datetime.now(), action='Load apikeys', result='Failed: %s' % e)
@@ -0,0 +1,200 @@
+import atexit
+import datetime
+import threading
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from experiment_server.models.banditarms import BanditArm
+from experiment_server.models.dataitemsummaries import is_numeric
+from experiment_server.utils.log import print_log
+
+"""
+Per-process reward counts of ExperimentGroups for the bandit ExperimentLogic. Every data-item posted with reward_key
+adds its value, clamped between 0 and 1, to successes and 1 to trials of the Client's ExperimentGroups, so assigning a
+Client never reads DataItems. Increments are kept in memory and added to the banditarms table every
+checkpoint_interval by a background thread, after which counts of every process are read back. The thread is started
+when counts are first used, so processes which never count rewards do not checkpoint. Checkpoints run in their own
+transaction, so they never hold locks in, or break, the transaction of a request. Increments which were not
+checkpointed are lost if the process is killed.
+"""
+
+_lock = threading.Lock()
+_checkpoint_lock = threading.Lock()
+_counts = None
+_pending = {}
+_checkpointing = {}
+_checkpointed_at = None
+_stopping = threading.Event()
+_thread = None
+_start_on_use = False
+_stop_registered = False
+reward_key = 'reward'
+checkpoint_interval = datetime.timedelta(seconds=10)
+
+
+def get_reward(value):
+    """
+    :param value: value of a data-item
+    :return: reward between 0 and 1, or None if value is not a number or boolean
+    """
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if not is_numeric(value):
+        return None
+    return min(max(float(value), 0.0), 1.0)
+
+
+def is_due():
+    # Without the background thread, e.g. in tests, checkpoints are made when counts are used
+    return _thread is None and \
+        (_checkpointed_at is None or datetime.datetime.now() - _checkpointed_at >= checkpoint_interval)
+
+
+def count_rewards(dataitems, key):
+    """
+    Combines rewards of data-items by ExperimentGroup. Data-items with other keys are ignored
+    :param dataitems: iterable of (experimentgroup_ids, key, value), where experimentgroup_ids are the
+    ExperimentGroups data-item's Client is in
+    :param key: key of data-items which are rewards
+    :return: dictionary from ExperimentGroup id to (successes, trials)
+    """
+    counts = {}
+    for experimentgroup_ids, _key, value in dataitems:
+        reward = get_reward(value) if _key == key else None
+        if reward is None:
+            continue
+        for experimentgroup_id in experimentgroup_ids:
+            successes, trials = counts.get(experimentgroup_id, (0.0, 0.0))
+            counts[experimentgroup_id] = (successes + reward, trials + 1)
+    return counts
+
+
+def add_rewards(dataitems):
+    """
+    Counts rewards of posted data-items. Data-items with other keys are ignored
+    :param dataitems: iterable of (experimentgroup_ids, key, value), where experimentgroup_ids are the
+    ExperimentGroups data-item's Client is in
+    """
+    counts = count_rewards(dataitems, reward_key)
+    if len(counts) == 0:
+        return
+    with _lock:
+        for experimentgroup_id, (successes, trials) in counts.items():
+            pending_successes, pending_trials = _pending.get(experimentgroup_id, (0.0, 0.0))
+            _pending[experimentgroup_id] = (successes + pending_successes, trials + pending_trials)
+    start_on_use()
+    if is_due():
+        checkpoint()
+
+
+def get_counts(experimentgroup_id):
+    """
+    :param experimentgroup_id: ExperimentGroup's id
+    :return: (successes, trials) of the ExperimentGroup, including increments which are not checkpointed yet
+    """
+    start_on_use()
+    if _counts is None or is_due():
+        checkpoint()
+    with _lock:
+        # Increments being checkpointed are counted until the counts read back replace _counts
+        counts = list(map(lambda _: _.get(experimentgroup_id, (0.0, 0.0)), [_counts or {}, _checkpointing, _pending]))
+    return sum(map(lambda _: _[0], counts)), sum(map(lambda _: _[1], counts))
+
+
+def checkpoint(connection=None):
+    """
+    Adds increments to the banditarms table and reads counts of every process back. Increments are kept for the next
+    checkpoint if writing fails. Checkpoints of one process do not overlap
+    :param connection: connection to write with. Defaults to a transaction of its own
+    """
+    global _counts, _pending, _checkpointing, _checkpointed_at
+    with _checkpoint_lock:
+        with _lock:
+            pending = _checkpointing = _pending
+            _pending = {}
+            _checkpointed_at = datetime.datetime.now()
+        try:
+            if connection is not None:
+                BanditArm.add_counts(pending, connection)
+                counts = BanditArm.load_counts(connection)
+            else:
+                with BanditArm.engine().begin() as connection:
+                    BanditArm.add_counts(pending, connection)
+                    counts = BanditArm.load_counts(connection)
+        except SQLAlchemyError as e:
+            with _lock:
+                for experimentgroup_id, (successes, trials) in pending.items():
+                    pending_successes, pending_trials = _pending.get(experimentgroup_id, (0.0, 0.0))
+                    _pending[experimentgroup_id] = (successes + pending_successes, trials + pending_trials)
+                _checkpointing = {}
+            print_log(datetime.datetime.now(), action='Checkpoint bandit counts', result='Failed: %s' % e)
+            return
+        with _lock:
+            _counts = counts
+            _checkpointing = {}
+
+
+def clear_bandit_counts():
+    """
+    Drops counts and increments, after which counts are read again on next use
+    """
+    global _counts, _pending, _checkpointing, _checkpointed_at
+    with _lock:
+        _counts = None
+        _pending = {}
+        _checkpointing = {}
+        _checkpointed_at = None
+
+
+def run():
+    while not _stopping.wait(checkpoint_interval.total_seconds()):
+        checkpoint()
+
+
+def start():
+    """
+    Starts the background thread which checkpoints counts every checkpoint_interval, unless it is running already.
+    Increments left in memory are checkpointed at exit
+    """
+    global _thread, _stop_registered
+    with _lock:
+        if _thread is not None:
+            return
+        _stopping.clear()
+        _thread = threading.Thread(target=run, name='bandit-checkpoint', daemon=True)
+        _thread.start()
+        if not _stop_registered:
+            atexit.register(stop)
+            _stop_registered = True
+
+
+def start_on_use():
+    if _start_on_use and _thread is None:
+        start()
+
+
+def stop():
+    """
+    Stops the background thread and checkpoints increments left in memory. The thread is not started on use again
+    """
+    global _thread, _start_on_use
+    _start_on_use = False
+    if _thread is not None:
+        _stopping.set()
+        _thread.join()
+        _thread = None
+    checkpoint()
+
+
+def includeme(config):
+    """
+    Reads bandit settings. The background thread is started when counts are first used:
+        experiment_server.bandit_reward_key = <key of data-items>
+        experiment_server.bandit_checkpoint_interval = <seconds>
+    """
+    global reward_key, checkpoint_interval, _start_on_use
+    settings = config.get_settings()
+    reward_key = settings.get('experiment_server.bandit_reward_key', 'reward')
+    checkpoint_interval = datetime.timedelta(
+        seconds=float(settings.get('experiment_server.bandit_checkpoint_interval', 10)))
+    _start_on_use = True
@@ -1,5 +1,10 @@
 from experiment_server.models import (Configuration, ConfigurationKey, ExclusionConstraint, Operator, RangeConstraint)
+from collections import namedtuple
 import _operator
+import datetime
+import threading
+
+from experiment_server.utils.transactions import after_transaction
 
 """
 Tools, helper-functions and validations which are used in multiple views
@@ -111,6 +116,15 @@ def get_value_as_correct_type(value, type):
     elif type == "boolean":
         return bool(value)
 
+ops = {'=': _operator.eq,
+       '<=': _operator.le,
+       '<': _operator.lt,
+       '>=': _operator.ge,
+       '>': _operator.gt,
+       '!=': _operator.ne,
+       }
+
+
 def evaluate_value_operator(operator, given_value, value1, value2):
     """
     Validates given_value by comparing it with operator to value1 and value 2. If operator with id less than 6 is given,
@@ -121,74 +135,197 @@ def evaluate_value_operator(operator, given_value, value1, value2):
     :param value2:
     :return:
     """
-    ops = {'=': _operator.eq,
-           '<=': _operator.le,
-           '<': _operator.lt,
-           '>=': _operator.ge,
-           '>': _operator.gt,
-           '!=': _operator.ne,
-           }
+    return compile_value_operator(operator.math_value, value1, value2)(given_value)
+
 
-    if operator.math_value == '[]' or operator.math_value == '()':
+def compile_value_operator(math_value, value1, value2):
+    """
+    Same as evaluate_value_operator, but resolves the operator only once
+    :param math_value: Operator's math_value
+    :param value1: value in correct type
+    :param value2: value in correct type, needed only by '[]' and '()'
+    :return: function from given value in correct type to boolean
+    """
+    if math_value == '[]' or math_value == '()':
         if value1 is None or value2 is None:
-            return False
-        if operator.math_value == '[]':
-            return value1 <= given_value <= value2
-        elif operator.math_value == '()':
-            return value1 < given_value < value2
-    elif operator.math_value == 'def':
-        return given_value is not None
-    elif operator.math_value == 'ndef':
-        return given_value is None
-    elif operator.math_value is not None:
-        return ops[operator.math_value](given_value, value1)
+            return lambda given_value: False
+        if math_value == '[]':
+            return lambda given_value: value1 <= given_value <= value2
+        return lambda given_value: value1 < given_value < value2
+    elif math_value == 'def':
+        return lambda given_value: given_value is not None
+    elif math_value == 'ndef':
+        return lambda given_value: given_value is None
+    elif math_value is not None:
+        op = ops[math_value]
+        return lambda given_value: op(given_value, value1)
+
+    return lambda given_value: False
+
+
+def compile_rangeconstraint(math_value, type, value):
+    """
+    :return: function from a Configuration's value to boolean: is the value allowed by the RangeConstraint
+    """
+    predicate = compile_value_operator(math_value, get_value_as_correct_type(value, type), None)
+    return lambda given_value: predicate(get_value_as_correct_type(given_value, type))
+
 
-    return False
+def compile_exclusion(math_value_a, type_a, values_a, math_value_b, type_b, values_b):
+    """
+    :return: function from values of first and second ConfigurationKey to boolean: is "not A or B" true. Either value
+    being None, i.e. not set, is always allowed
+    """
+    argument_a = compile_value_operator(math_value_a, *map(lambda _: get_value_as_correct_type(_, type_a), values_a))
+    argument_b = compile_value_operator(math_value_b, *map(lambda _: get_value_as_correct_type(_, type_b), values_b))
 
+    def is_allowed(value_a, value_b):
+        if value_a is None or value_b is None:
+            return True  # Either of values is not set. Nothing to validate
+        return not argument_a(get_value_as_correct_type(value_a, type_a)) \
+            or argument_b(get_value_as_correct_type(value_b, type_b))
 
-def is_in_range(configkey, value):
+    return is_allowed
+
+
+class CompiledExclusion(namedtuple('CompiledExclusion', ['first_key', 'second_key', 'is_allowed'])):
     """
-    Checks RangeConstraints on given value. Assumes that Application- and ConfigurationKey-connection is already
-    checked.
-    :param configkey: Given ConfigurationKey
-    :param value: Value to validate
-    :return: Is given value approved by RangeConstraints
+    ExclusionConstraint with ConfigurationKeys resolved to their names
+    is_allowed: function from values of first and second ConfigurationKey to boolean
     """
-    rangeconstraints = RangeConstraint.query().join(ConfigurationKey).filter(ConfigurationKey.id == configkey.id)
+    __slots__ = ()
 
-    for rc in rangeconstraints:
-        if not evaluate_value_operator(Operator.get(rc.operator_id), get_value_as_correct_type(value, configkey.type),
-                                       get_value_as_correct_type(rc.value, configkey.type), None):
-            return False
 
-    return True
+class ApplicationConstraints(namedtuple('ApplicationConstraints', ['types', 'rangeconstraints', 'exclusions'])):
+    """
+    Range- and ExclusionConstraints of one Application, compiled to functions. Validating a value with them does not
+    read the database.
+    types: dictionary from ConfigurationKey's name to its type
+    rangeconstraints: dictionary from ConfigurationKey's name to tuple of functions from value to boolean
+    exclusions: dictionary from ConfigurationKey's name to tuple of CompiledExclusions the key is in
+    """
+    __slots__ = ()
+
+    def is_in_range(self, key, value):
+        return all(map(lambda _: _(value), self.rangeconstraints.get(key, ())))
+
+    def is_valid_exclusion(self, key, value, configurations):
+        """
+        :param key: name of the ConfigurationKey
+        :param value: value of the Configuration which is being validated
+        :param configurations: dictionary from key to value of other Configurations in the same ExperimentGroup
+        :return: is value allowed by every ExclusionConstraint the key is in
+        """
+        for exclusion in self.exclusions.get(key, ()):
+            if exclusion.first_key == key and \
+                    not exclusion.is_allowed(value, configurations.get(exclusion.second_key)):
+                return False
+            if exclusion.second_key == key and \
+                    not exclusion.is_allowed(configurations.get(exclusion.first_key), value):
+                return False
+        return True
+
 
+def compile_application_constraints(app_id):
+    """
+    Reads Application's ConfigurationKeys, Operators and constraints, four queries in total, and compiles them
+    :param app_id: Application's id
+    :return: ApplicationConstraints
+    """
+    configurationkeys = {ck.id: ck for ck in ConfigurationKey.query()
+                         .filter(ConfigurationKey.application_id == app_id)}
+    math_values = {op.id: op.math_value for op in Operator.all()}
+
+    rangeconstraints = {}
+    for rc in RangeConstraint.query().filter(RangeConstraint.configurationkey_id.in_(configurationkeys.keys())):
+        ck = configurationkeys[rc.configurationkey_id]
+        rangeconstraints.setdefault(ck.name, []).append(
+            compile_rangeconstraint(math_values.get(rc.operator_id), ck.type, rc.value))
+
+    exclusions = {}
+    for exc in ExclusionConstraint.query()\
+            .filter(ExclusionConstraint.first_configurationkey_id.in_(configurationkeys.keys())):
+        ck_a = configurationkeys[exc.first_configurationkey_id]
+        ck_b = configurationkeys.get(exc.second_configurationkey_id)
+        if ck_b is None:
+            continue
+        exclusion = CompiledExclusion(
+            first_key=ck_a.name,
+            second_key=ck_b.name,
+            is_allowed=compile_exclusion(math_values.get(exc.first_operator_id), ck_a.type,
+                                         (exc.first_value_a, exc.first_value_b),
+                                         math_values.get(exc.second_operator_id), ck_b.type,
+                                         (exc.second_value_a, exc.second_value_b)))
+        exclusions.setdefault(ck_a.name, []).append(exclusion)
+        if ck_b.name != ck_a.name:
+            exclusions.setdefault(ck_b.name, []).append(exclusion)
+
+    return ApplicationConstraints(
+        types={ck.name: ck.type for ck in configurationkeys.values()},
+        rangeconstraints={key: tuple(value) for key, value in rangeconstraints.items()},
+        exclusions={key: tuple(value) for key, value in exclusions.items()}
+    )
+
+
+_lock = threading.Lock()
+# Application id to (ApplicationConstraints, when they must be compiled again)
+_constraints = {}
+_version = 0
+max_age = datetime.timedelta(seconds=60)
+
+
+def get_application_constraints(app_id):
+    """
+    Returns Application's compiled constraints. They are compiled only if they are not in memory already, or have
+    been in memory for max_age, in case another process changed them.
+    :param app_id: Application's id
+    :return: ApplicationConstraints
+    """
+    now = datetime.datetime.now()
+    entry = _constraints.get(app_id)
+    if entry is not None and now < entry[1]:
+        return entry[0]
+
+    version = _version
+    constraints = compile_application_constraints(app_id)
+    with _lock:
+        # Do not store constraints which were compiled while someone was writing
+        if version == _version:
+            _constraints[app_id] = (constraints, now + max_age)
+    return constraints
+
+
+def clear_constraints():
+    global _version
+    with _lock:
+        _version += 1
+        _constraints.clear()
 
-def evaluate_exclusion(exclusion, ckey_a, ckey_b, config_a, config_b):
+
+def invalidate_constraints():
     """
-    Helper function for @is_valid_exclusion
-    :param exclusion: ExclusionConstraint to check
-    :param ckey_a: first ConfigurationKey
-    :param ckey_b: Second ConfigurationKey
-    :param config_a: First Configuration
-    :param config_b: Second Configuration
-    :return: is ExclusionConstraint fulfilled
+    Drops every compiled constraint. Call this after writing ConfigurationKeys, Range- or ExclusionConstraints.
+    Constraints are dropped again when the transaction has been committed, since until then other requests compile
+    them from the old rows, and the writing request from rows which may still be rolled back.
     """
-    if config_a is None or config_b is None:
-        return True  # Either of values is not set. Nothing to validate
+    clear_constraints()
+    after_transaction(clear_constraints)
+
 
-    op_a = Operator.get(exclusion.first_operator_id)
-    type_a = ckey_a.type
-    value_a = get_value_as_correct_type(config_a.value, type_a)
-    argument_a = evaluate_value_operator(op_a, value_a, exclusion.first_value_a, exclusion.first_value_b)
+def get_experimentgroup_values(experimentgroup_id):
+    return {conf.key: conf.value for conf in Configuration.query()
+            .filter(Configuration.experimentgroup_id == experimentgroup_id)}
 
-    op_b = Operator.get(exclusion.second_operator_id)
-    type_b = ckey_b.type
-    value_b = get_value_as_correct_type(config_b.value, type_b)
-    argument_b = evaluate_value_operator(op_b, value_b, exclusion.second_value_a, exclusion.second_value_b)
 
-    if not (not argument_a or argument_b):
-        return False  # ExclusionConstraint is violated
+def is_in_range(configkey, value):
+    """
+    Checks RangeConstraints on given value. Assumes that Application- and ConfigurationKey-connection is already
+    checked.
+    :param configkey: Given ConfigurationKey
+    :param value: Value to validate
+    :return: Is given value approved by RangeConstraints
+    """
+    return get_application_constraints(configkey.application_id).is_in_range(configkey.name, value)
 
 
 def is_valid_exclusion(configkey, configuration):
@@ -201,30 +338,19 @@ def is_valid_exclusion(configkey, configuration):
     :param configuration: Configuration which is being validated
     :return: is given configuration allowed by exclusion constraints.
     """
-    exclusions_conf_as_a = ExclusionConstraint.query() \
-        .join(ConfigurationKey, ConfigurationKey.id == ExclusionConstraint.first_configurationkey_id) \
-        .filter(ConfigurationKey.id == configkey.id).all()
-    exclusions_conf_as_b = ExclusionConstraint.query()\
-        .join(ConfigurationKey, ConfigurationKey.id == ExclusionConstraint.second_configurationkey_id)\
-        .filter(ConfigurationKey.id == configkey.id).all()
+    constraints = get_application_constraints(configkey.application_id)
+    if configkey.name not in constraints.exclusions:
+        return True  # No ExclusionConstraints set
 
-    for exc in exclusions_conf_as_a:
-        ck_b = ConfigurationKey.get(exc.second_configurationkey_id)
-
-        config_b = Configuration().query().filter(Configuration.experimentgroup_id == configuration.experimentgroup_id,
-                                                  Configuration.key == ck_b.name).one_or_none()
-
-        if not evaluate_exclusion(exc, configkey, ck_b, configuration, config_b):
-            return False
+    return constraints.is_valid_exclusion(configkey.name, configuration.value,
+                                          get_experimentgroup_values(configuration.experimentgroup_id))
 
-    for exc in exclusions_conf_as_b:
-        ck_a = ConfigurationKey.get(exc.first_configurationkey_id)
-
-        config_a = Configuration().query().filter(Configuration.experimentgroup_id == configuration.experimentgroup_id,
-                                                 Configuration.key == ck_a.name).one_or_none()
-
-        if not evaluate_exclusion(exc, ck_a, configkey, config_a, configuration):
-            return False
-
-    return True  # No ExclusionConstraints set or configuration is valid on all ExclusionConstraints
 
+def includeme(config):
+    """
+    Reads constraint cache settings:
+        experiment_server.constraints_max_age = <seconds>
+    """
+    global max_age
+    settings = config.get_settings()
+    max_age = datetime.timedelta(seconds=int(settings.get('experiment_server.constraints_max_age', 60)))
@@ -0,0 +1,226 @@
+import atexit
+import datetime
+import queue
+import threading
+
+from pyramid.settings import asbool
+from toolz import partition_all
+from sqlalchemy import engine_from_config
+from sqlalchemy.exc import (DataError, DBAPIError, IntegrityError)
+
+from experiment_server.models.dataitems import DataItem
+from experiment_server.models.dataitemsummaries import DataItemSummary
+from experiment_server.utils.bandit_counts import add_rewards
+from experiment_server.utils.event_dedup import (count_duplicates, hold_queued, release_queued)
+from experiment_server.utils.log import print_log
+
+"""
+Write-behind buffer for data-items posted by Clients. When enabled, POST /events only validates the data-item and puts
+it to a bounded in-process queue. A background thread drains the queue into the dataitems table with one bulk insert
+per transaction, and updates DataItemSummaries in the same transaction. Data-items are written whenever batch_size of
+them have been gathered or flush_interval has passed since the first of them. A batch the database fails to write is
+written again, waiting twice as long after every failure up to max_retry_delay, and new data-items wait in the queue
+meanwhile. If some data-item of a batch can never be written, e.g. its Client was deleted, the batch is written one
+data-item at a time and only those data-items are dropped. Data-items still in the queue are written when the process
+exits. Data-items which were accepted but not yet written are lost if the process is killed, or if the database still
+fails when the process exits.
+"""
+
+
+class EventBuffer:
+    def __init__(self, engine, max_size=10000, batch_size=500, flush_interval=1.0, max_retry_delay=30.0):
+        """
+        :param engine: engine the buffer writes with. Writes do not use DBSession, since they are not part of
+        any request's transaction
+        :param max_size: how many data-items the queue holds at most
+        :param batch_size: how many data-items are written in one transaction at most
+        :param flush_interval: seconds a data-item waits in the queue at most, and first wait before a failed batch
+        is written again
+        :param max_retry_delay: seconds between writes of a failed batch at most
+        """
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retry_delay = max_retry_delay
+        self.queue = queue.Queue(maxsize=max_size)
+        self.stopping = threading.Event()
+        self.thread = None
+        # Data-items the database failed to write, and seconds to wait before writing them again
+        self.failed = []
+        self.retry_delay = flush_interval
+
+    def put(self, row, experimentgroup_ids=()):
+        """
+        Adds a data-item to the queue without blocking
+        :param row: dictionary from dataitems-columns to values
+        :param experimentgroup_ids: ExperimentGroups whose summaries the data-item is added to
+        :return: True if data-item was queued, False if the queue is full or buffer is not running
+        """
+        if self.stopping.is_set():
+            return False
+        hold_queued([row])
+        try:
+            self.queue.put_nowait((row, experimentgroup_ids))
+        except queue.Full:
+            release_queued([row])
+            return False
+        return True
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='event-buffer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread and writes every data-item left in the queue
+        """
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def run(self):
+        while not self.stopping.is_set():
+            if len(self.failed) > 0:
+                if self.stopping.wait(self.retry_delay):
+                    # Failed data-items are written by stop()
+                    break
+                self.retry()
+                continue
+            items = self.take_batch()
+            if len(items) > 0:
+                self.failed = self.write(items)
+
+    def retry(self):
+        """
+        Writes failed data-items again, and waits longer before next try if the database still fails
+        """
+        self.failed = self.write(self.failed)
+        if len(self.failed) > 0:
+            self.retry_delay = min(self.retry_delay * 2, self.max_retry_delay)
+        else:
+            self.retry_delay = self.flush_interval
+
+    def take_batch(self):
+        """
+        Waits for the first data-item, then gathers more until batch is full or flush_interval has passed
+        :return: list of (row, experimentgroup_ids), empty if nothing was queued during flush_interval
+        """
+        items = []
+        deadline = None
+        while len(items) < self.batch_size:
+            timeout = self.flush_interval
+            if deadline is not None:
+                timeout = (deadline - datetime.datetime.now()).total_seconds()
+                if timeout <= 0:
+                    break
+            try:
+                items.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+            if deadline is None:
+                deadline = datetime.datetime.now() + datetime.timedelta(seconds=self.flush_interval)
+        return items
+
+    def flush(self):
+        """
+        Writes failed data-items and every data-item currently in the queue, in the calling thread. Data-items the
+        database still fails to write are lost
+        """
+        items, self.failed = self.failed, []
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        for batch in partition_all(self.batch_size, items):
+            lost = self.write(list(batch))
+            if len(lost) > 0:
+                print_log(datetime.datetime.now(), 'POST', '/events', 'Write buffered experiment data',
+                    'Failed: %s data-items were lost' % len(lost))
+                release_queued(list(map(lambda _: _[0], lost)))
+
+    def write(self, items):
+        """
+        Writes data-items in one transaction. If some of them can never be written, the others are written one at a
+        time and only those are dropped
+        :param items: list of (row, experimentgroup_ids)
+        :return: list of data-items which were not written since the database failed, to be written again
+        """
+        try:
+            self.write_batch(items)
+            return []
+        except (DataError, IntegrityError) as e:
+            error = e
+        except DBAPIError as e:
+            # Database is down, or e.g. a deadlock rolled the transaction back
+            print_log(datetime.datetime.now(), 'POST', '/events', 'Write buffered experiment data',
+                'Failed: %s data-items are written again later: %s' % (len(items), e))
+            return items
+        except Exception as e:
+            # E.g. a value which can not be stored
+            error = e
+        if len(items) == 1:
+            print_log(datetime.datetime.now(), 'POST', '/events', 'Write buffered experiment data',
+                'Failed: data-item can not be written and was dropped: %s' % error)
+            release_queued([items[0][0]])
+            return []
+
+        for i, item in enumerate(items):
+            failed = self.write([item])
+            if len(failed) > 0:
+                return items[i:]
+        return []
+
+    def write_batch(self, items):
+        rows = list(map(lambda _: _[0], items))
+        experimentgroup_ids = dict(map(lambda _: (id(_[0]), _[1]), items))
+        with self.engine.begin() as connection:
+            # Retries which were queued twice, e.g. by racing requests, are inserted and counted once
+            inserted = DataItem.insert_rows(rows, connection)
+            dataitems = list(map(lambda _: (experimentgroup_ids[id(_)], _['key'], _['value']), inserted))
+            DataItemSummary.add_dataitems(dataitems, connection)
+        release_queued(rows)
+        count_duplicates(len(rows) - len(inserted))
+        add_rewards(dataitems)
+        print_log(datetime.datetime.now(), 'POST', '/events', 'Write buffered experiment data',
+            'Saved %s data-items' % len(inserted))
+
+
+buffer = None
+
+
+def put_event(row, experimentgroup_ids=()):
+    """
+    Queues a data-item if write-behind buffering is enabled
+    :param row: dictionary from dataitems-columns to values
+    :param experimentgroup_ids: ExperimentGroups whose summaries the data-item is added to
+    :return: True if data-item was queued, False if it must be saved by the caller
+    """
+    return buffer is not None and buffer.put(row, experimentgroup_ids)
+
+
+def includeme(config):
+    """
+    Reads buffer settings and starts the buffer if it is enabled:
+        experiment_server.event_buffer = true|false
+        experiment_server.event_buffer_size = <data-items>
+        experiment_server.event_buffer_batch_size = <data-items>
+        experiment_server.event_buffer_flush_interval = <seconds>
+        experiment_server.event_buffer_max_retry_delay = <seconds>
+    """
+    global buffer
+    settings = config.get_settings()
+    if not asbool(settings.get('experiment_server.event_buffer', False)):
+        return
+
+    buffer = EventBuffer(
+        engine_from_config(settings, 'sqlalchemy.'),
+        max_size=int(settings.get('experiment_server.event_buffer_size', 10000)),
+        batch_size=int(settings.get('experiment_server.event_buffer_batch_size', 500)),
+        flush_interval=float(settings.get('experiment_server.event_buffer_flush_interval', 1.0)),
+        max_retry_delay=float(settings.get('experiment_server.event_buffer_max_retry_delay', 30.0))
+    )
+    buffer.start()
+    atexit.register(buffer.stop)
@@ -0,0 +1,218 @@
+import datetime
+import hashlib
+import math
+import threading
+
+from pyramid.settings import asbool
+
+from experiment_server.models.dataitems import DataItem
+
+"""
+Drops data-items which Clients post again with the same event_id, e.g. when they retry POST /events on a flaky
+network. Recently seen (client_id, event_id) pairs are kept in a rotating Bloom filter. A pair the filter has not seen
+is new, so most data-items are accepted without reading the database. Only pairs the filter may have seen are looked up
+from dataitems, and from pairs which are queued to the write-behind buffer but not yet written, so false positives of
+the filter never drop a data-item. Pairs are remembered for at least window. Older retries, and retries racing in
+other requests or processes, are caught by the unique index on dataitems, and callers count only rows which were
+inserted.
+"""
+
+
+class RotatingBloomFilter:
+    def __init__(self, capacity=1000000, error_rate=0.001, window=datetime.timedelta(hours=1), generations=2):
+        """
+        :param capacity: how many keys one generation holds before it is rotated early
+        :param error_rate: false positive rate of one full generation
+        :param window: how long a generation is written to. Keys are remembered for window * (generations - 1) at
+        least and window * generations at most
+        :param generations: how many filters are checked
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.window = window
+        self.bits = max(int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.bits / capacity * math.log(2))), 1)
+        self.filters = [bytearray((self.bits + 7) // 8) for i in range(generations)]
+        self.count = 0
+        self.started_at = datetime.datetime.now()
+        self._lock = threading.Lock()
+
+    def get_positions(self, key):
+        """
+        :param key: string
+        :return: bit positions of key, by double hashing one SHA-1 digest
+        """
+        digest = hashlib.sha1(key.encode('utf-8')).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:16], 'big') | 1
+        return list(map(lambda _: (first + _ * second) % self.bits, range(self.hashes)))
+
+    def rotate(self, now):
+        """
+        Drops the oldest generation if the newest one is full or older than window
+        """
+        if self.count < self.capacity and now - self.started_at < self.window:
+            return
+        self.filters = [bytearray(len(self.filters[0]))] + self.filters[:-1]
+        self.count = 0
+        self.started_at = now
+
+    def add(self, key):
+        """
+        Adds a key to the newest generation
+        :param key: string
+        :return: True if key may have been added before, False if it certainly was not added during the window
+        """
+        positions = self.get_positions(key)
+        with self._lock:
+            self.rotate(datetime.datetime.now())
+            seen = any(map(lambda bits: all(map(lambda _: bits[_ >> 3] & (1 << (_ & 7)), positions)), self.filters))
+            newest = self.filters[0]
+            for position in positions:
+                newest[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+        return seen
+
+
+_lock = threading.Lock()
+_filter = RotatingBloomFilter()
+# (client_id, event_id) of data-items in the write-behind buffer
+_queued = set()
+enabled = True
+checked = 0
+suspected = 0
+duplicates = 0
+
+
+def get_key(row):
+    return '%s:%s' % (row['client_id'], row['event_id'])
+
+
+def drop_duplicates(rows, connection=None):
+    """
+    Leaves out data-items which have the same event_id as an earlier data-item of the same Client, in rows or in
+    dataitems. Data-items without event_id are always kept
+    :param rows: data-items as dictionaries with client_id and event_id
+    :param connection: connection to read dataitems with. Defaults to DBSession
+    :return: list of rows which are not duplicates, in the same order
+    """
+    global checked, suspected, duplicates
+    if not enabled:
+        return rows
+
+    keys = set()
+    suspects = set()
+    kept = []
+    keyed = 0
+    for row in rows:
+        if row.get('event_id') is None:
+            kept.append(row)
+            continue
+        keyed += 1
+        key = (row['client_id'], row['event_id'])
+        if key in keys:
+            continue
+        keys.add(key)
+        if _filter.add(get_key(row)):
+            suspects.add(key)
+        kept.append(row)
+
+    with _lock:
+        queued = suspects.intersection(_queued)
+    saved = queued.union(DataItem.find_event_ids(suspects.difference(queued), connection))
+    if len(saved) > 0:
+        kept = list(filter(lambda _: _.get('event_id') is None or (_['client_id'], _['event_id']) not in saved, kept))
+    with _lock:
+        checked += keyed
+        suspected += len(suspects)
+        duplicates += len(rows) - len(kept)
+    return kept
+
+
+def is_duplicate(row, connection=None):
+    """
+    Same as drop_duplicates for one data-item
+    :return: True if data-item has already been saved
+    """
+    return len(drop_duplicates([row], connection)) == 0
+
+
+def get_keys(rows):
+    return set(map(lambda _: (_['client_id'], _['event_id']), filter(lambda _: _.get('event_id') is not None, rows)))
+
+
+def hold_queued(rows):
+    """
+    Marks data-items as queued, so their retries are duplicates until they have been written
+    :param rows: data-items as dictionaries with client_id and event_id
+    """
+    keys = get_keys(rows)
+    with _lock:
+        _queued.update(keys)
+
+
+def release_queued(rows):
+    """
+    Call this once queued data-items have been written, or dropped
+    :param rows: data-items as dictionaries with client_id and event_id
+    """
+    keys = get_keys(rows)
+    with _lock:
+        _queued.difference_update(keys)
+
+
+def count_duplicates(count):
+    """
+    Counts data-items the unique index on dataitems skipped, since the filter had not seen their event_ids
+    :param count: how many data-items were skipped
+    """
+    global duplicates
+    with _lock:
+        duplicates += count
+
+
+def clear_event_dedup():
+    """
+    Forgets every event_id and resets the counters
+    """
+    global _filter, checked, suspected, duplicates
+    with _lock:
+        _filter = RotatingBloomFilter(_filter.capacity, _filter.error_rate, _filter.window, len(_filter.filters))
+        _queued.clear()
+        checked = 0
+        suspected = 0
+        duplicates = 0
+
+
+def get_statistics():
+    """
+    :return: dictionary with size and counters of the filter
+    """
+    return {
+        'enabled': enabled,
+        'window': _filter.window.total_seconds(),
+        'generations': len(_filter.filters),
+        'bits_per_generation': _filter.bits,
+        'hashes': _filter.hashes,
+        'entries': _filter.count,
+        'checked': checked,
+        'suspected': suspected,
+        'duplicates': duplicates
+    }
+
+
+def includeme(config):
+    """
+    Reads dedup settings:
+        experiment_server.event_dedup = true|false
+        experiment_server.event_dedup_window = <seconds>
+        experiment_server.event_dedup_capacity = <event_ids per window>
+        experiment_server.event_dedup_error_rate = <false positive rate>
+    """
+    global enabled, _filter
+    settings = config.get_settings()
+    enabled = asbool(settings.get('experiment_server.event_dedup', True))
+    _filter = RotatingBloomFilter(
+        capacity=int(settings.get('experiment_server.event_dedup_capacity', 1000000)),
+        error_rate=float(settings.get('experiment_server.event_dedup_error_rate', 0.001)),
+        window=datetime.timedelta(seconds=float(settings.get('experiment_server.event_dedup_window', 3600))))
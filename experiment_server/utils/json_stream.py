@@ -0,0 +1,73 @@
+import json
+
+"""
+Helpers for responses which are written while they are read from the database, so that memory use does not grow with
+the size of the response. Rows are read with a server-side cursor where the database supports one, and encoded in
+chunks of batch_size rows. Request bodies of newline-delimited JSON are likewise split to lines while they are read.
+"""
+
+
+def stream_rows(connection, statement, render, batch_size=1000):
+    """
+    Encodes rows of a query as JSON array items
+    :param connection: connection to run the query on
+    :param statement: SQLAlchemy select
+    :param render: function from a row to a JSON-serializable value
+    :param batch_size: how many rows are fetched and encoded at a time
+    :return: generator of UTF-8 encoded chunks. Chunks have the items separated by commas, but no brackets
+    """
+    result = connection.execution_options(stream_results=True).execute(statement)
+    separator = b''
+    try:
+        while True:
+            rows = result.fetchmany(batch_size)
+            if len(rows) == 0:
+                break
+            yield separator + ','.join(map(lambda _: json.dumps(render(_)), rows)).encode('utf-8')
+            separator = b','
+    finally:
+        result.close()
+
+
+def stream_object(engine, fields, streamed_fields):
+    """
+    Encodes a JSON object, whose streamed_fields are arrays read from the database only when the response is sent
+    :param engine: engine to read with. Connection is opened when the first streamed field is reached, and closed
+    after the last one
+    :param fields: dictionary of JSON-serializable fields, written first
+    :param streamed_fields: list of (name, function from connection to chunks returned by stream_rows)
+    :return: generator of UTF-8 encoded chunks
+    """
+    head = json.dumps(fields)
+    if len(streamed_fields) == 0:
+        yield head.encode('utf-8')
+        return
+    yield (head[:-1] + (', ' if len(fields) > 0 else '')).encode('utf-8')
+
+    with engine.connect() as connection:
+        for i, (name, stream) in enumerate(streamed_fields):
+            yield ('%s%s: [' % (', ' if i > 0 else '', json.dumps(name))).encode('utf-8')
+            for chunk in stream(connection):
+                yield chunk
+            yield b']'
+    yield b'}'
+
+
+def iter_lines(stream, chunk_size=65536):
+    """
+    Splits a body to lines while it is read, without holding more than one chunk and one line in memory
+    :param stream: file-like object, e.g. request.body_file
+    :param chunk_size: how many bytes are read at a time
+    :return: generator of lines as bytes, without line breaks
+    """
+    rest = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (rest + chunk).split(b'\n')
+        rest = lines.pop()
+        for line in lines:
+            yield line
+    if len(rest) > 0:
+        yield rest
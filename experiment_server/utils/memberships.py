@@ -0,0 +1,152 @@
+import datetime
+import threading
+from collections import namedtuple
+
+from pyramid.settings import asbool
+from repoze.lru import ExpiringLRUCache
+
+from experiment_server.utils.transactions import after_transaction
+
+"""
+Per-process, size-bounded LRU cache from clientname to Client's ExperimentGroups in running Experiments, for the
+client-facing API. A cached membership lets POST /configurations and POST /events skip reading the Client and its
+ExperimentGroups. An entry expires when the first of its Experiments ends, and is evicted when the Client or one of its
+ExperimentGroups is deleted, and again once the deleting transaction has ended. Entries are checked against the
+Application snapshot on every hit, so they are never used for ExperimentGroups which are not running anymore.
+"""
+
+
+class Membership(namedtuple('Membership', ['application_id', 'client_id', 'experimentgroup_ids'])):
+    """
+    Client's ExperimentGroups in running Experiments of one Application
+    experimentgroup_ids: ids in the order of snapshot's Experiments. Configurations come from the first one of every
+    layer
+    """
+    __slots__ = ()
+
+
+_lock = threading.Lock()
+_cache = ExpiringLRUCache(10000)
+invalidations = 0
+enabled = True
+
+
+def running_experimentgroups(application, experimentgroup_ids, timestamp):
+    """
+    :param application: snapshot of Client's Application
+    :param experimentgroup_ids: ids of Client's ExperimentGroups
+    :param timestamp: time Experiments must be running at
+    :return: list of (ExperimentSnapshot, ExperimentGroupSnapshot) for given ExperimentGroups which are running
+    """
+    return [(exp, expgroup) for exp in application.running_experiments(timestamp)
+            for expgroup in exp.experimentgroups if expgroup.id in experimentgroup_ids]
+
+
+def invalidate(clientname):
+    global invalidations
+    if clientname not in _cache.data:
+        return
+    _cache.invalidate(clientname)
+    with _lock:
+        invalidations += 1
+
+
+def get_membership(application, clientname):
+    """
+    :param application: snapshot of Client's Application
+    :param clientname: Client's clientname
+    :return: Membership, or None if it is not cached or its ExperimentGroups are not running anymore
+    """
+    if not enabled:
+        return None
+    membership = _cache.get(clientname)
+    if membership is None or membership.application_id != application.id:
+        return None
+    running = running_experimentgroups(application, membership.experimentgroup_ids, datetime.datetime.now())
+    if len(running) != len(membership.experimentgroup_ids):
+        invalidate(clientname)
+        return None
+    return membership
+
+
+def put_membership(application, clientname, client_id, experimentgroup_ids):
+    """
+    Caches Client's ExperimentGroups which are in running Experiments of the Application snapshot
+    :param application: snapshot of Client's Application
+    :param clientname: Client's clientname
+    :param client_id: Client's id
+    :param experimentgroup_ids: ids of Client's ExperimentGroups, may include ones which are not running
+    :return: Membership, or None if Client is not in any running Experiment
+    """
+    now = datetime.datetime.now()
+    running = running_experimentgroups(application, experimentgroup_ids, now)
+    if len(running) == 0:
+        return None
+    membership = Membership(application_id=application.id, client_id=client_id,
+                            experimentgroup_ids=tuple(map(lambda _: _[1].id, running)))
+    if enabled:
+        ends = min(map(lambda _: _[0].endDatetime, running))
+        _cache.put(clientname, membership, timeout=(ends - now).total_seconds())
+    return membership
+
+
+def evict_experimentgroup(experimentgroup_id):
+    for clientname, (pos, membership, expires) in list(_cache.data.items()):
+        if experimentgroup_id in membership.experimentgroup_ids:
+            invalidate(clientname)
+
+
+def invalidate_client(clientname):
+    """
+    Evicts Client's membership. Call this after deleting the Client. Membership is evicted again when the transaction
+    has ended, since until then other requests read and cache the Client's old rows
+    """
+    invalidate(clientname)
+    after_transaction(invalidate, clientname)
+
+
+def invalidate_experimentgroup(experimentgroup_id):
+    """
+    Evicts memberships of given ExperimentGroup. Call this after deleting the ExperimentGroup. Memberships are evicted
+    again when the transaction has ended, since until then other requests read and cache the old rows
+    """
+    evict_experimentgroup(experimentgroup_id)
+    after_transaction(evict_experimentgroup, experimentgroup_id)
+
+
+def clear_memberships():
+    """
+    Empties the cache and resets its counters
+    """
+    global invalidations
+    _cache.clear()
+    with _lock:
+        invalidations = 0
+
+
+def get_statistics():
+    """
+    :return: dictionary with size and counters of the cache
+    """
+    return {
+        'enabled': enabled,
+        'size': _cache.size,
+        'entries': len(_cache.data),
+        'lookups': _cache.lookups,
+        'hits': _cache.hits,
+        'misses': _cache.misses,
+        'evictions': _cache.evictions,
+        'invalidations': invalidations
+    }
+
+
+def includeme(config):
+    """
+    Reads cache settings:
+        experiment_server.membership_cache = true|false
+        experiment_server.membership_cache_size = <Clients>
+    """
+    global enabled, _cache
+    settings = config.get_settings()
+    enabled = asbool(settings.get('experiment_server.membership_cache', True))
+    _cache = ExpiringLRUCache(int(settings.get('experiment_server.membership_cache_size', 10000)))
@@ -0,0 +1,164 @@
+import math
+import threading
+import time
+
+"""
+Per-process token buckets of apikeys for the client-facing API. Every apikey gets rate tokens per second, up to burst
+tokens, and every request takes one. A request without a token is rejected with 429 before any database work, so one
+misbehaving build of an Application can not starve other Applications sharing the server. Rate and burst come from the
+Application, or from the defaults if it has none. Limits are per process, so a server running several processes allows
+each apikey that many times the rate.
+"""
+
+# Seconds over which request rates are averaged
+RATE_WINDOW = 10.0
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, application_id, retry_after):
+        """
+        :param application_id: id of the limited Application
+        :param retry_after: seconds until the apikey has a token again
+        """
+        super(RateLimitExceeded, self).__init__('Application %s is over its rate limit' % application_id)
+        self.application_id = application_id
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, application_id, rate, burst, now):
+        """
+        :param application_id: id of the Application whose apikey this is
+        :param rate: tokens added per second
+        :param burst: most tokens the bucket holds
+        :param now: time.monotonic() of creation
+        """
+        self.application_id = application_id
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = now
+        self.allowed = 0
+        self.limited = 0
+        self.request_rate = 0.0
+
+    def refill(self, now):
+        """
+        Adds tokens for the time since last refill
+        :param now: time.monotonic()
+        """
+        elapsed = max(now - self.updated_at, 0.0)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.request_rate *= math.exp(-elapsed / RATE_WINDOW)
+        self.updated_at = now
+
+    def take(self, now):
+        """
+        Takes a token, if there is one
+        :param now: time.monotonic()
+        :return: 0 if a token was taken, otherwise seconds until there is one
+        """
+        self.refill(now)
+        self.request_rate += 1.0 / RATE_WINDOW
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self.allowed += 1
+            return 0
+        self.limited += 1
+        return (1.0 - self.tokens) / self.rate
+
+    def get_statistics(self, now):
+        """
+        :param now: time.monotonic()
+        :return: dictionary with limits, tokens left and counters
+        """
+        elapsed = max(now - self.updated_at, 0.0)
+        return {
+            'application_id': self.application_id,
+            'rate': self.rate,
+            'burst': self.burst,
+            'tokens': min(self.burst, self.tokens + elapsed * self.rate),
+            'request_rate': self.request_rate * math.exp(-elapsed / RATE_WINDOW),
+            'allowed': self.allowed,
+            'limited': self.limited
+        }
+
+
+_lock = threading.Lock()
+_buckets = {}
+default_rate = 0
+default_burst = 0
+
+
+def get_limits(record):
+    """
+    :param record: ApplicationRecord
+    :return: (rate, burst) of Application's apikey, or None if it is not limited
+    """
+    rate = record.rate_limit if record.rate_limit is not None else default_rate
+    if not rate:
+        return None
+    burst = record.rate_burst or default_burst or max(int(math.ceil(rate)), 1)
+    return rate, burst
+
+
+def check_rate_limit(record):
+    """
+    Takes a token of Application's apikey
+    :param record: ApplicationRecord of the Application
+    :return: None. Raises RateLimitExceeded if apikey has no tokens left
+    """
+    limits = get_limits(record)
+    if limits is None:
+        return
+    rate, burst = limits
+    now = time.monotonic()
+    with _lock:
+        bucket = _buckets.get(record.apikey)
+        if bucket is None:
+            bucket = TokenBucket(record.id, rate, burst, now)
+            _buckets[record.apikey] = bucket
+        elif bucket.rate != rate or bucket.burst != burst:
+            # Application was updated. Counters are kept, but bucket starts full with the new limits
+            bucket.refill(now)
+            bucket.rate, bucket.burst = rate, burst
+            bucket.tokens = float(burst)
+        retry_after = bucket.take(now)
+    if retry_after > 0:
+        raise RateLimitExceeded(record.id, retry_after)
+
+
+def clear_rate_limits():
+    """
+    Drops every bucket, after which apikeys start with full buckets
+    """
+    global _buckets
+    with _lock:
+        _buckets = {}
+
+
+def get_statistics():
+    """
+    :return: dictionary with default limits, and statistics of every limited apikey which has been used. Apikeys are
+    reported by their Application's id
+    """
+    now = time.monotonic()
+    with _lock:
+        buckets = list(map(lambda _: _.get_statistics(now), _buckets.values()))
+    return {
+        'default_rate': default_rate,
+        'default_burst': default_burst,
+        'applications': sorted(buckets, key=lambda _: _['application_id'])
+    }
+
+
+def includeme(config):
+    """
+    Reads default limits of Applications which have none:
+        experiment_server.rate_limit = <requests per second, 0 for no limit>
+        experiment_server.rate_limit_burst = <requests, 0 for rate_limit rounded up>
+    """
+    global default_rate, default_burst
+    settings = config.get_settings()
+    default_rate = float(settings.get('experiment_server.rate_limit', 0))
+    default_burst = int(settings.get('experiment_server.rate_limit_burst', 0))
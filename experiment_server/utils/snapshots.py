@@ -0,0 +1,191 @@
+import datetime
+import json
+import threading
+from collections import namedtuple
+
+from pyramid.settings import asbool
+from sqlalchemy.orm import subqueryload
+
+from experiment_server.models import (Experiment, ExperimentGroup)
+from experiment_server.utils.apikeys import get_application_record
+from experiment_server.utils.transactions import after_transaction
+
+"""
+Per-process, read-through snapshots of Applications for the client-facing API (POST /configurations, POST /events). A
+snapshot is an immutable copy of Application's Experiments, ExperimentGroups and already rendered Configurations, keyed
+by Application's apikey. Snapshots are dropped by a version bump, which admin views call whenever they write something a
+snapshot holds, and again once their transaction has been committed. They also expire when one of their Experiments
+starts or ends, and after max_age in case another process changed the database.
+"""
+
+
+class ExperimentGroupSnapshot(namedtuple('ExperimentGroupSnapshot',
+                                         ['id', 'name', 'experiment_id', 'weight', 'configurations', 'payload'])):
+    """
+    Read-only copy of an ExperimentGroup. Unlike in ExperimentGroup, configurations are already rendered with
+    Configuration.as_dict()
+    payload: configurations as UTF-8 encoded JSON, ready to be used as a response body
+    """
+    __slots__ = ()
+
+
+class ExperimentSnapshot(namedtuple('ExperimentSnapshot',
+                                    ['id', 'name', 'application_id', 'startDatetime', 'endDatetime', 'weight',
+                                     'layer', 'experimentgroups'])):
+    """
+    Read-only copy of an Experiment and its ExperimentGroups
+    """
+    __slots__ = ()
+
+    # Same status rules as Experiment has, since they only read startDatetime and endDatetime
+    get_status = Experiment.get_status
+
+
+class ApplicationSnapshot(namedtuple('ApplicationSnapshot',
+                                     ['id', 'name', 'apikey', 'experiment_distribution', 'experiments',
+                                      'version', 'expires_at'])):
+    """
+    Read-only copy of an Application and its Experiments which had not ended when the snapshot was loaded. Has the
+    same attributes ExperimentLogics use from Application, so it can be given to them instead of Application.
+    version: snapshot-version during which this snapshot was loaded
+    expires_at: when this snapshot must be loaded again
+    """
+    __slots__ = ()
+
+    def running_experiments(self, timestamp=None):
+        """
+        Experiments which are running at given time
+        :param timestamp: defaults to current time
+        :return: list of ExperimentSnapshots
+        """
+        if timestamp is None:
+            timestamp = datetime.datetime.now()
+        return [exp for exp in self.experiments if exp.startDatetime <= timestamp <= exp.endDatetime]
+
+
+_lock = threading.Lock()
+_snapshots = {}
+_version = 0
+max_age = datetime.timedelta(seconds=60)
+enabled = True
+
+
+def snapshot_experimentgroup(expgroup):
+    configurations = list(map(lambda _: _.as_dict(), sorted(expgroup.configurations, key=lambda _: _.id)))
+    return ExperimentGroupSnapshot(
+        id=expgroup.id,
+        name=expgroup.name,
+        experiment_id=expgroup.experiment_id,
+        weight=expgroup.weight,
+        configurations=tuple(configurations),
+        payload=json.dumps(configurations).encode('utf-8')
+    )
+
+
+def snapshot_experiment(experiment):
+    experimentgroups = sorted(experiment.experimentgroups, key=lambda _: _.id)
+    return ExperimentSnapshot(
+        id=experiment.id,
+        name=experiment.name,
+        application_id=experiment.application_id,
+        startDatetime=experiment.startDatetime,
+        endDatetime=experiment.endDatetime,
+        weight=experiment.weight,
+        layer=experiment.layer,
+        experimentgroups=tuple(map(snapshot_experimentgroup, experimentgroups))
+    )
+
+
+def get_expiration(experiments, now):
+    """
+    Snapshot must be loaded again when any of its Experiments starts or ends
+    :param experiments: Experiments which have not ended
+    :param now: time of loading
+    :return: earliest time when status of some Experiment changes, but at most max_age from now
+    """
+    changes = map(lambda _: _.startDatetime if _.startDatetime > now else _.endDatetime, experiments)
+    return min(changes, default=now + max_age)
+
+
+def load_application_snapshot(app, version):
+    """
+    Loads everything under Application's Experiments which have not ended. Finished Experiments are filtered out in
+    the database.
+    :param app: ApplicationRecord of the Application
+    :param version: snapshot-version the load was started on
+    :return: ApplicationSnapshot
+    """
+    now = datetime.datetime.now()
+    experiments = Experiment.query()\
+        .options(subqueryload(Experiment.experimentgroups)
+                 .subqueryload(ExperimentGroup.configurations))\
+        .filter(Experiment.application_id == app.id, now <= Experiment.endDatetime)\
+        .order_by(Experiment.id)\
+        .all()
+    return ApplicationSnapshot(
+        id=app.id,
+        name=app.name,
+        apikey=app.apikey,
+        experiment_distribution=app.experiment_distribution,
+        experiments=tuple(map(snapshot_experiment, experiments)),
+        version=version,
+        expires_at=min(get_expiration(experiments, now), now + max_age)
+    )
+
+
+def is_fresh(snapshot):
+    return snapshot.version == _version and datetime.datetime.now() < snapshot.expires_at
+
+
+def get_application_snapshot(apikey):
+    """
+    Returns snapshot of Application with given apikey. Snapshot is loaded from the database only if there is no
+    fresh snapshot in memory. Unknown apikeys are rejected without reading the database.
+    :param apikey: Application's apikey
+    :return: ApplicationSnapshot, or None if no Application has given apikey
+    """
+    app = get_application_record(apikey)
+    if app is None:
+        return None
+    snapshot = _snapshots.get(apikey)
+    if snapshot is not None and snapshot.id == app.id and is_fresh(snapshot):
+        return snapshot
+
+    version = _version
+    snapshot = load_application_snapshot(app, version)
+    if not enabled:
+        return snapshot
+    with _lock:
+        # Do not store snapshots which were loaded while someone was writing
+        if version == _version:
+            _snapshots[apikey] = snapshot
+    return snapshot
+
+
+def clear_application_snapshots():
+    global _version
+    with _lock:
+        _version += 1
+        _snapshots.clear()
+
+
+def invalidate_application_snapshots():
+    """
+    Bumps snapshot-version, after which every snapshot is loaded again on next use. Call this after writing
+    Applications, Experiments, ExperimentGroups or Configurations. Version is bumped again when the transaction has
+    been committed, since snapshots loaded before that hold the old or uncommitted rows.
+    """
+    clear_application_snapshots()
+    after_transaction(clear_application_snapshots)
+
+
+def includeme(config):
+    """
+    Reads snapshot settings:
+        experiment_server.snapshots = true|false
+        experiment_server.snapshot_max_age = <seconds>
+    """
+    global enabled, max_age
+    settings = config.get_settings()
+    enabled = asbool(settings.get('experiment_server.snapshots', True))
+    max_age = datetime.timedelta(seconds=int(settings.get('experiment_server.snapshot_max_age', 60)))
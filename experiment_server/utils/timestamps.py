@@ -0,0 +1,95 @@
+import datetime
+
+"""
+Parsing of data-items' timestamps. Clients send either ISO-8601 strings, of which the old 'YYYY-MM-DD HH:MM:SS'
+format is a special case, or epoch milliseconds as numbers. Strings are parsed with datetime.fromisoformat where it
+accepts them, and otherwise by slicing fixed positions, instead of strptime, which has to interpret its format on
+every call. Timestamps are returned timezone-aware in UTC, and strings without an offset are taken to be in UTC.
+"""
+
+UTC = datetime.timezone.utc
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=UTC)
+# Python 3.7 and newer
+fromisoformat = getattr(datetime.datetime, 'fromisoformat', None)
+
+
+def parse_offset(text):
+    """
+    :param text: 'Z', '+HH:MM', '+HHMM' or '+HH', or same with '-'
+    :return: timedelta to subtract to get UTC. Raises ValueError if text is none of them
+    """
+    if text == 'Z' or text == 'z':
+        return datetime.timedelta(0)
+    digits = text[1:].replace(':', '', 1) if len(text) == 6 and text[3] == ':' else text[1:]
+    if text[:1] not in ('+', '-') or len(digits) not in (2, 4) or not digits.isdigit():
+        raise ValueError('Invalid UTC offset %r' % text)
+    offset = datetime.timedelta(hours=int(digits[0:2]), minutes=int(digits[2:4] or 0))
+    return -offset if text[0] == '-' else offset
+
+
+def parse_iso8601(text):
+    """
+    :param text: 'YYYY-MM-DDTHH:MM:SS', optionally followed by a fraction of a second and an offset. Date and time
+    may be separated by a space instead of 'T'
+    :return: timezone-aware datetime in UTC. Raises ValueError if text is not such a timestamp
+    """
+    if len(text) < 19 or text[4] != '-' or text[7] != '-' or text[10] not in 'T t' or text[13] != ':' \
+            or text[16] != ':':
+        raise ValueError('Invalid timestamp %r' % text)
+    if fromisoformat is not None:
+        # Implemented in C. Older versions do not accept every form parsed below, e.g. 'Z'
+        try:
+            result = fromisoformat(text)
+        except ValueError as e:
+            pass
+        else:
+            return result.replace(tzinfo=UTC) if result.tzinfo is None else result.astimezone(UTC)
+    digits = text[0:4] + text[5:7] + text[8:10] + text[11:13] + text[14:16] + text[17:19]
+    if not digits.isdigit():
+        raise ValueError('Invalid timestamp %r' % text)
+
+    microsecond = 0
+    position = 19
+    if position < len(text) and text[position] in '.,':
+        end = position + 1
+        while end < len(text) and text[end].isdigit():
+            end += 1
+        if end == position + 1:
+            raise ValueError('Invalid timestamp %r' % text)
+        microsecond = int(text[position + 1:end][:6].ljust(6, '0'))
+        position = end
+
+    result = datetime.datetime(int(digits[0:4]), int(digits[4:6]), int(digits[6:8]), int(digits[8:10]),
+                               int(digits[10:12]), int(digits[12:14]), microsecond, tzinfo=UTC)
+    if position < len(text):
+        result -= parse_offset(text[position:])
+    return result
+
+
+def parse_timestamp(value):
+    """
+    Parses a data-item's timestamp
+    :param value: ISO-8601 string, or epoch milliseconds as integer or float
+    :return: timezone-aware datetime in UTC. Raises ValueError if value is malformed or out of range, TypeError if it
+    is neither a string nor a number
+    """
+    if isinstance(value, str):
+        return parse_iso8601(value)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError('Timestamp must be a string or epoch milliseconds, not %s' % type(value).__name__)
+    try:
+        return EPOCH + datetime.timedelta(milliseconds=value)
+    except OverflowError as e:
+        raise ValueError('Timestamp %r is out of range' % value)
+
+
+def format_timestamp(value):
+    """
+    Renders a timestamp in UTC as 'YYYY-MM-DD HH:MM:SS', with microseconds if it has them. Databases which do not keep
+    offsets return naive datetimes, which are already in UTC
+    :param value: datetime or None
+    :return: string
+    """
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return str(value)
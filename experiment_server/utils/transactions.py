@@ -0,0 +1,30 @@
+import transaction
+
+"""
+Helpers for work which must wait until the request's transaction has been committed, e.g. updating per-process caches
+or counters from rows the request wrote. Done earlier, other threads could see rows which are later rolled back.
+"""
+
+
+def after_commit(callback, *args):
+    """
+    Calls callback with args after the current transaction has been committed. Nothing is called if it is aborted
+    :param callback: function
+    :param args: arguments of callback
+    """
+    def hook(success, *args):
+        if success:
+            callback(*args)
+    transaction.get().addAfterCommitHook(hook, args)
+
+
+def after_transaction(callback, *args):
+    """
+    Calls callback with args after the current transaction has been committed, or has failed to commit. Transactions
+    which are aborted without trying to commit do not call it
+    :param callback: function
+    :param args: arguments of callback
+    """
+    def hook(success, *args):
+        callback(*args)
+    transaction.get().addAfterCommitHook(hook, args)
@@ -3,6 +3,9 @@ from pyramid.view import view_config, view_defaults
 from pyramid.response import Response
 from experiment_server.models.applications import Application
 from experiment_server.utils.log import print_log
+from experiment_server.utils.snapshots import invalidate_application_snapshots
+from experiment_server.utils.apikeys import invalidate_application_records
+from experiment_server.utils.configuration_tools import invalidate_constraints
 from .webutils import WebUtils
 import datetime
 from toolz import concat, assoc
@@ -47,13 +50,16 @@ class Applications(WebUtils):
 
         application.apikey = apikey
         Application.save(application)
+        invalidate_application_snapshots()
+        invalidate_application_records()
 
         return Application.get(app_id)
 
     def is_valid_application(self, app):
         from ..experiment_logic.experiment_logic_selector import ExperimentLogicSelector
         return app.name is not None and len(app.name) > 0 and \
-               ExperimentLogicSelector().is_valid_experiment_logic(app.experiment_distribution)
+               ExperimentLogicSelector().is_valid_experiment_logic(app.experiment_distribution) and \
+               (app.rate_limit is None or app.rate_limit > 0) and (app.rate_burst is None or app.rate_burst >= 1)
 
     def get_app_exclusionconstraints(self, app_id):
         from experiment_server.models.exclusionconstraints import ExclusionConstraint
@@ -99,10 +105,14 @@ class Applications(WebUtils):
         app = Application(
             name=req_app.name,
             apikey=self.get_unused_apikey(),
-            experiment_distribution=req_app.experiment_distribution
+            experiment_distribution=req_app.experiment_distribution,
+            rate_limit=req_app.rate_limit,
+            rate_burst=req_app.rate_burst
         )
         if self.is_valid_application(req_app):
             Application.save(app)
+            invalidate_application_snapshots()
+            invalidate_application_records()
             print_log(req_app.name, 'POST', '/applications', 'Create new application', app)
             return app.as_dict()
 
@@ -118,6 +128,9 @@ class Applications(WebUtils):
             print_log(datetime.datetime.now(), 'DELETE', '/applications/' + str(app_id), 'Delete application', 'Failed')
             return self.createResponse(None, 400)
         Application.destroy(app)
+        invalidate_application_snapshots()
+        invalidate_application_records()
+        invalidate_constraints()
         print_log(datetime.datetime.now(), 'DELETE', '/applications/' + str(app_id), 'Delete application', 'Succeeded')
         return {}
 
@@ -158,6 +171,10 @@ class Applications(WebUtils):
 
         Application.update(updated.id, "name", req_app.name)
         Application.update(updated.id, "experiment_distribution", req_app.experiment_distribution)
+        Application.update(updated.id, "rate_limit", req_app.rate_limit)
+        Application.update(updated.id, "rate_burst", req_app.rate_burst)
+        invalidate_application_snapshots()
+        invalidate_application_records()
         updated = Application.get(updated.id)
 
         return updated.as_dict()
@@ -2,14 +2,30 @@ from pyramid.response import Response
 from pyramid.view import view_config, view_defaults
 
 import datetime
-import random
+import json
+import math
 from experiment_server.utils.log import print_log
 from .webutils import WebUtils
 from experiment_server.models.clients import Client
+from experiment_server.models.clients_experimentgroups import clients_experimentgroups
 from experiment_server.models.dataitems import DataItem
+from experiment_server.models.dataitemsummaries import DataItemSummary
 from experiment_server.models.applications import Application
 from experiment_server.models.experiments import Experiment
 from experiment_server.models.experimentgroups import ExperimentGroup
+from experiment_server.utils.snapshots import get_application_snapshot
+from experiment_server.utils.apikeys import get_application_record
+from experiment_server.utils.rate_limits import (RateLimitExceeded, check_rate_limit)
+from experiment_server.utils.event_buffer import put_event
+from experiment_server.utils.bandit_counts import add_rewards
+from experiment_server.utils.transactions import after_commit
+from experiment_server.utils.event_dedup import (count_duplicates, drop_duplicates, is_duplicate)
+from experiment_server.utils.json_stream import iter_lines
+from experiment_server.utils.timestamps import (format_timestamp, parse_timestamp)
+from experiment_server.utils.memberships import (get_membership, put_membership, invalidate_client)
+import experiment_server.database.orm as orm_config
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
 
 from fn import _
 from toolz import *
@@ -19,69 +35,289 @@ from toolz import *
 ###
 
 
-def is_client_in_running_experiments(client):
-    experiments = Experiment.query()\
+def running_experimentgroup_ids(client_ids, application):
+    """
+    Finds with one query ExperimentGroups of Application's running Experiments, which given Clients are in
+    :param client_ids: ids of Clients to check
+    :param application: Application or its snapshot
+    :return: dictionary from Client's id to list of ExperimentGroup ids. Clients which are not in running
+    Experiments are left out
+    """
+    if len(client_ids) == 0:
+        return {}
+
+    rows = Experiment.running_at(datetime.datetime.now())\
+        .filter(Experiment.application_id == application.id)\
         .join(ExperimentGroup)\
-        .join(ExperimentGroup.clients).filter(Client.id == client.id).all()
+        .join(ExperimentGroup.clients)\
+        .filter(Client.id.in_(client_ids))\
+        .with_entities(Client.id, ExperimentGroup.id)\
+        .distinct()
+    result = {}
+    for client_id, experimentgroup_id in rows:
+        result.setdefault(client_id, []).append(experimentgroup_id)
+    return result
 
-    running_experiments = list(filter(lambda _: _.get_status() == 'running', experiments))
 
-    return len(running_experiments) > 0
+def parse_event_id(event_id):
+    """
+    :param event_id: optional id Client gives to a data-item, string or integer
+    :return: event_id as string, or None. Raises TypeError if event_id is of other type
+    """
+    if event_id is None or isinstance(event_id, str):
+        return event_id
+    if isinstance(event_id, bool) or not isinstance(event_id, int):
+        raise TypeError('event_id must be a string or an integer')
+    return str(event_id)
 
 
-def assign_to_experiment(client, application):
-    from ..experiment_logic.experiment_logic_selector import ExperimentLogicSelector
-    experiment = ExperimentLogicSelector().get_experiments(application)
+def parse_event(json):
+    """
+    Reads a data-item posted by a Client
+    :param json: posted data-item
+    :return: dictionary with key, value, startDatetime, endDatetime and event_id, timestamps in UTC. Raises KeyError, TypeError
+    or ValueError if data-item is malformed
+    """
+    return {
+        'key': json['key'],
+        'value': json['value'],
+        'startDatetime': parse_timestamp(json['startDatetime']),
+        'endDatetime': parse_timestamp(json['endDatetime']),
+        'event_id': parse_event_id(json.get('event_id'))
+    }
 
-    return experiment
 
+def get_running_clients(application, clientnames):
+    """
+    Finds Clients by name, and their ExperimentGroups in Application's running Experiments. Cached memberships are
+    used without reading the database, and memberships which are read are cached
+    :param application: snapshot of Clients' Application
+    :param clientnames: set of clientnames
+    :return: dictionary from clientname to Client's id, and dictionary from Client's id to list of ExperimentGroup
+    ids. Clients which are not in running Experiments are left out of the latter
+    """
+    memberships = dict(filter(lambda _: _[1] is not None,
+                              map(lambda _: (_, get_membership(application, _)), clientnames)))
+    clients = dict(map(lambda _: (_[0], _[1].client_id), memberships.items()))
+    running = dict(map(lambda _: (_.client_id, list(_.experimentgroup_ids)), memberships.values()))
+    uncached = clientnames.difference(memberships.keys())
+    if len(uncached) > 0:
+        found = Client.query().filter(Client.clientname.in_(uncached)).with_entities(Client.clientname, Client.id)
+        uncached_clients = dict(map(tuple, found))
+        uncached_running = running_experimentgroup_ids(list(uncached_clients.values()), application)
+        for clientname, client_id in uncached_clients.items():
+            if client_id in uncached_running:
+                put_membership(application, clientname, client_id, uncached_running[client_id])
+        clients.update(uncached_clients)
+        running.update(uncached_running)
+    return clients, running
+
+
+def render_event(event):
+    """
+    :param event: data-item returned by parse_event, which has not been saved
+    :return: data-item as DataItem.as_dict() renders it, without id
+    """
+    return dict(event, startDatetime=format_timestamp(event['startDatetime']),
+                endDatetime=format_timestamp(event['endDatetime']))
 
-def assign_to_experimentgroup(client, application):
-    experiment = assign_to_experiment(client, application)
 
+def read_event(item, clientname, clients, running):
+    """
+    Checks a data-item of POST /events/batch or POST /events/stream
+    :param item: posted data-item
+    :param clientname: data-item's clientname
+    :param clients: dictionary from clientname to Client's id
+    :param running: dictionary from Client's id to ExperimentGroup ids in running Experiments
+    :return: data-item with client_id and None, or None and the reason data-item is not valid
+    """
+    client_id = clients.get(clientname)
+    if client_id is None:
+        return None, 'no client with name %s' % clientname
+    if client_id not in running:
+        return None, 'client %s not in running experiments' % clientname
     try:
-        expgroup = random.choice(list(experiment.experimentgroups))
-    except AttributeError as e:
-        # In this case, experiment is None, and has already been logged
-        return None
-    except IndexError as e:
-        print_log(datetime.datetime.now(), 'POST', '/configurations',
-            'Get client configurations',
-            'Failed: No ExperimentGoups on Experiment with id %s' % experiment.id)
-        return None
+        event = parse_event(item)
+    except (KeyError, TypeError, ValueError) as e:
+        return None, 'malformed data-item'
+    event['client_id'] = client_id
+    return event, None
 
-    if expgroup not in client.experimentgroups:
-        client.experimentgroups.append(expgroup)
-        Client.flush()
 
-    return expgroup
+def assign_to_experiments(client, application, logic):
+    """
+    :return: list of Experiments given by ExperimentLogic, empty if there are none
+    """
+    experiments = logic.get_experiments(application, client.clientname)
+    if experiments is None:
+        return []
+    if not isinstance(experiments, list):
+        return [experiments]
+    return experiments
 
 
-def get_client_configurations(client, application):
-    expgroup = assign_to_experimentgroup(client, application)
+def get_experimentgroup_ids(client_id):
+    """
+    Reads ids of Client's ExperimentGroups with one query on primary key of clients_experimentgroups
+    :param client_id: Client's id
+    :return: set of ExperimentGroup ids
+    """
+    table = clients_experimentgroups
+    rows = orm_config.DBSession.execute(
+        select([table.c.experimentgroup_id]).where(table.c.client_id == client_id))
+    return set(map(lambda _: _[0], rows))
 
-    try:
-        configs =  list(map(lambda _: _.as_dict(), expgroup.configurations))
-    except AttributeError as e:
-        # In this case, experimentgroup is None, and has already been logged
+
+def get_layers(application, logic):
+    """
+    :param application: snapshot of Client's Application
+    :param logic: ExperimentLogicSelector
+    :return: dictionary from id of running Experiment to its layer
+    """
+    experiments = application.running_experiments()
+    return dict(zip(map(lambda _: _.id, experiments), logic.get_layers(application, experiments)))
+
+
+def get_running_experimentgroups(expgroup_ids, application, layers):
+    """
+    Finds ExperimentGroups Client is already in, among ExperimentGroups of Application's running Experiments. Only the
+    first one of every layer counts
+    :param expgroup_ids: ids of Client's ExperimentGroups
+    :param application: snapshot of Client's Application
+    :param layers: dictionary from id of running Experiment to its layer
+    :return: dictionary from layer to ExperimentGroupSnapshot
+    """
+    result = {}
+    if len(expgroup_ids) == 0:
+        return result
+    for experiment in application.running_experiments():
+        layer = layers.get(experiment.id)
+        if layer in result:
+            continue
+        for expgroup in experiment.experimentgroups:
+            if expgroup.id in expgroup_ids:
+                result[layer] = expgroup
+                break
+    return result
+
+
+def sort_by_layer(expgroups):
+    """
+    :param expgroups: dictionary from layer to ExperimentGroupSnapshot
+    :return: list of ExperimentGroupSnapshots, in the order their Configurations are merged
+    """
+    from ..experiment_logic.experiment_logic_selector import layer_order
+    return list(map(lambda _: expgroups[_], sorted(expgroups, key=layer_order)))
+
+
+def assign_to_experimentgroups(client, application, logic, layers):
+    """
+    Returns Client's ExperimentGroups in running Experiments, one for every layer. Client is given to ExperimentLogic
+    and assigned to new ExperimentGroups only if some layer has no running Experiment Client is in. With logics
+    without layers, all Experiments are in one layer, so Client is in one running Experiment
+    :param client: Client requesting Configurations
+    :param application: snapshot of Client's Application
+    :param logic: ExperimentLogicSelector
+    :param layers: dictionary from id of running Experiment to its layer
+    :return: list of ExperimentGroupSnapshots ordered by layer, empty if Client could not be assigned
+    """
+    expgroup_ids = get_experimentgroup_ids(client.id)
+    expgroups = get_running_experimentgroups(expgroup_ids, application, layers)
+
+    if not set(layers.values()).issubset(expgroups):
+        added = False
+        for experiment in assign_to_experiments(client, application, logic):
+            layer = layers.get(experiment.id)
+            if layer in expgroups:
+                continue
+            try:
+                expgroup = logic.get_experimentgroup(application, experiment, client.clientname)
+            except IndexError as e:
+                print_log(datetime.datetime.now(), 'POST', '/configurations',
+                    'Get client configurations',
+                    'Failed: No ExperimentGoups on Experiment with id %s' % experiment.id)
+                continue
+            expgroups[layer] = expgroup
+            if expgroup.id not in expgroup_ids:
+                client.experimentgroups.append(ExperimentGroup.get(expgroup.id))
+                added = True
+        if added:
+            Client.flush()
+
+    if len(expgroups) > 0:
+        put_membership(application, client.clientname, client.id,
+                       expgroup_ids | set(map(lambda _: _.id, expgroups.values())))
+    return sort_by_layer(expgroups)
+
+
+def get_client_experimentgroups(clientname, application):
+    """
+    Returns ExperimentGroups of Client with given name. Cached memberships are used without reading the database, if
+    they cover every layer. Otherwise Client is found or created, and assigned to ExperimentGroups if needed
+    :param clientname: name of Client requesting Configurations
+    :param application: snapshot of Client's Application
+    :return: list of ExperimentGroupSnapshots ordered by layer, empty if Client could not be assigned
+    """
+    from ..experiment_logic.experiment_logic_selector import ExperimentLogicSelector
+    logic = ExperimentLogicSelector()
+    layers = get_layers(application, logic)
+
+    membership = get_membership(application, clientname)
+    if membership is not None:
+        expgroups = get_running_experimentgroups(membership.experimentgroup_ids, application, layers)
+        if set(layers.values()).issubset(expgroups):
+            return sort_by_layer(expgroups)
+
+    client = get_client(clientname)
+    if client is None:
+        print_log(datetime.datetime.now(), 'POST', '/configurations',
+            'Get client configurations', 'Empty clientname')
+        return []
+    return assign_to_experimentgroups(client, application, logic, layers)
+
+
+def merge_configurations(expgroups):
+    """
+    Merges Configurations of ExperimentGroups in given order. Layers do not set the same keys, since Configurations
+    with a key of another layer are rejected when they are created
+    :param expgroups: ExperimentGroupSnapshots ordered by layer
+    :return: list of Configurations rendered with Configuration.as_dict()
+    """
+    return list(concat(map(lambda _: _.configurations, expgroups)))
+
+
+def get_client_configurations(clientname, application):
+    """
+    Assigns Client to ExperimentGroups if needed, and returns Configurations of the ExperimentGroups merged
+    :param clientname: name of Client requesting Configurations
+    :param application: snapshot of Client's Application
+    :return: Configurations as UTF-8 encoded JSON, or None if Client has no Configurations
+    """
+    expgroups = get_client_experimentgroups(clientname, application)
+    if len(expgroups) == 0:
+        # Has already been logged
         return None
-    if len(configs) == 0:
+    if all(map(lambda _: len(_.configurations) == 0, expgroups)):
         print_log(datetime.datetime.now(), 'POST', '/configurations',
             'Get client configurations',
-            'Failed: No Configurations on ExperimentGroup with id %s' % expgroup.id)
+            'Failed: No Configurations on ExperimentGroups with ids %s' % ', '.join(map(lambda _: str(_.id), expgroups)))
         return None
 
-    return configs
+    # Configurations of snapshots are already rendered to JSON
+    if len(expgroups) == 1:
+        return expgroups[0].payload
+    return json.dumps(merge_configurations(expgroups)).encode('utf-8')
 
 
 def get_client(name):
-    client = Client.query().filter(Client.clientname == name).one_or_none()
-
-    if client is None and len(name) > 0:
-        client = Client(clientname=name)
-        Client.save(client)
-
-    return client
+    """
+    Finds Client by name, or creates it if name is not empty
+    :param name: Client's clientname
+    :return: Client, or None if name is empty and there is no such Client
+    """
+    if len(name) == 0:
+        return Client.query().filter(Client.clientname == name).one_or_none()
+    return Client.get_or_create(name)
 
 
 def get_client_by_id_and_app(data):
@@ -101,14 +337,36 @@ def get_client_by_id_and_app(data):
 
 
 def application_by_apikey_from_header(headers):
+    """
+    Finds Application by apikey in authorization-header, after taking a token of the apikey from memory
+    :param headers: request's headers
+    :return: ApplicationSnapshot, or None if apikey is missing or unknown. Raises RateLimitExceeded if apikey is over
+    its rate limit
+    """
     apikey = None
     try:
         apikey = headers['authorization']
     except KeyError as e:
         return None
 
-    app = Application.get_by('apikey', apikey)
-    return app
+    record = get_application_record(apikey)
+    if record is None:
+        return None
+    check_rate_limit(record)
+    return get_application_snapshot(apikey)
+
+
+@view_config(context=RateLimitExceeded, renderer='json')
+def rate_limit_exceeded(exc, request):
+    """
+    Answers requests of apikeys which are over their rate limit
+    :return: 429 with Retry-After header
+    """
+    print_log(datetime.datetime.now(), request.method, request.path, 'Check rate limit',
+        'Failed: application %s is over its rate limit' % exc.application_id)
+    response = WebUtils().createResponse(None, 429)
+    response.headers['Retry-After'] = str(int(math.ceil(exc.retry_after)))
+    return response
 
 ###
 # Controller-class and -functions
@@ -151,6 +409,19 @@ class Clients(WebUtils):
         res.headers.add('Access-Control-Allow-Methods', 'POST')
         return res
 
+    @view_config(route_name='events_batch', request_method="OPTIONS")
+    def all_Options(self):
+        res = Response()
+        res.headers.add('Access-Control-Allow-Origins', '*')
+        res.headers.add('Access-Control-Allow-Methods', 'POST')
+        return res
+    @view_config(route_name='events_stream', request_method="OPTIONS")
+    def all_Options(self):
+        res = Response()
+        res.headers.add('Access-Control-Allow-Origins', '*')
+        res.headers.add('Access-Control-Allow-Methods', 'POST')
+        return res
+
     # List application's clients
     @view_config(route_name='clients', request_method="GET", renderer='json')
     def clients_GET(self):
@@ -203,6 +474,7 @@ class Clients(WebUtils):
             print_log(datetime.datetime.now(), 'DELETE', '/clients/' + str(id), 'Delete client', 'Failed')
             return self.createResponse(None, 400)
         Client.destroy(result)
+        invalidate_client(result.clientname)
         print_log(datetime.datetime.now(), 'DELETE', '/clients/' + str(id), 'Delete client', 'Succeeded')
         return {}
 
@@ -251,6 +523,9 @@ class Clients(WebUtils):
         /configurations. After successful POST /configurations, should be used until response with HTTP-status 400 is
         returned.
         :return:    200 with posted data if request was successful
+                    202 with posted data, without id, if data was queued to write-behind buffer
+                    200 with posted data, without id and with 'duplicate': true, if Client has already posted a
+                    data-item with the same event_id
                     401 if apikey was incorrect
                     400 if
                         - Client does not exist or
@@ -262,34 +537,191 @@ class Clients(WebUtils):
                 'Unauthorized')
             return self.createResponse(None, 401)
 
-        json = self.request.json_body
-        value = json['value']
-        key = json['key']
-        startDatetime = datetime.datetime.strptime(json['startDatetime'], "%Y-%m-%d %H:%M:%S")
-        endDatetime = datetime.datetime.strptime(json['endDatetime'], "%Y-%m-%d %H:%M:%S")
+        event = parse_event(self.request.json_body)
 
         clientname = self.request.headers['clientname']
-        client = Client.get_by('clientname', clientname)
-        if client is None:
+        membership = get_membership(app, clientname)
+        if membership is not None:
+            client_id, experimentgroup_ids = membership.client_id, list(membership.experimentgroup_ids)
+        else:
+            client = Client.get_by('clientname', clientname)
+            if client is None:
+                print_log(datetime.datetime.now(), 'POST', '/events', 'Save experiment data',
+                    'Failed: no client with name %s' % clientname)
+                return self.createResponse(None, 400)
+            experimentgroup_ids = running_experimentgroup_ids([client.id], app).get(client.id)
+            if experimentgroup_ids is None:
+                print_log(datetime.datetime.now(), 'POST', '/events', 'Save experiment data',
+                    'Failed: client %s not in running experiments' % clientname)
+                return self.createResponse(None, 400)
+            client_id = client.id
+            put_membership(app, clientname, client_id, experimentgroup_ids)
+
+        def duplicate():
             print_log(datetime.datetime.now(), 'POST', '/events', 'Save experiment data',
-                'Failed: no client with name %s' % clientname)
-            return self.createResponse(None, 400)
-        if not is_client_in_running_experiments(client):
-            print_log(datetime.datetime.now(), 'POST', '/events', 'Save experiment data',
-                'Failed: client %s not in running experiments' % clientname)
-            return self.createResponse(None, 400)
-
-        result = DataItem(
-            client=client,
-            value=value,
-            key=key,
-            startDatetime=startDatetime,
-            endDatetime=endDatetime
-        )
-        DataItem.save(result)
+                'Duplicate: event_id %s of client %s has already been saved' % (event['event_id'], clientname))
+            return dict(render_event(event), duplicate=True)
+
+        event['client_id'] = client_id
+        if is_duplicate(event):
+            return duplicate()
+
+        if put_event(event, experimentgroup_ids):
+            print_log(datetime.datetime.now(), 'POST', '/events', 'Save experiment data', 'Queued')
+            self.request.response.status = 202
+            return render_event(event)
+
+        # Buffer is disabled or full
+        if event['event_id'] is None:
+            result = DataItem(**event)
+            DataItem.save(result)
+        else:
+            # Unique index skips retries the filter has forgotten, e.g. after a restart or in another process
+            if len(DataItem.insert_rows([event])) == 0:
+                count_duplicates(1)
+                return duplicate()
+            result = DataItem.query()\
+                .filter(DataItem.client_id == client_id, DataItem.event_id == event['event_id']).one()
+        DataItemSummary.add_dataitems([(experimentgroup_ids, event['key'], event['value'])])
+        # Counted once data-item has been saved, so a retry of a failed request is not counted twice
+        after_commit(add_rewards, [(experimentgroup_ids, event['key'], event['value'])])
         print_log(datetime.datetime.now(), 'POST', '/events', 'Save experiment data', result)
         return result.as_dict()
 
+    @view_config(route_name='events_batch', request_method="POST")
+    def events_batch_POST(self):
+        """
+        Same as POST /events, but for a list of data-items, which may belong to different Clients of the Application.
+        Data-item's Client is given by its clientname, or by clientname-header if data-item has none. Clients and
+        their running Experiments are checked once for the whole list, and valid data-items are saved with one
+        bulk insert.
+        :return:    200 with status of every data-item, in the same order they were posted:
+                        {'status': 200} if data-item was saved
+                        {'status': 200, 'duplicate': true} if data-item has the event_id of a saved data-item
+                        {'status': 400, 'error': <reason>} if data-item was malformed, Client does not exist or
+                        Client is not in any running experiments
+                    401 if apikey was incorrect
+                    400 if body is not a list
+        """
+        def print_error(message):
+            print_log(datetime.datetime.now(), 'POST', '/events/batch', 'Save experiment data', message)
+
+        app = application_by_apikey_from_header(self.request.headers)
+        if app is None:
+            print_error('Unauthorized')
+            return self.createResponse(None, 401)
+
+        items = self.request.json_body
+        if not isinstance(items, list):
+            print_error('Failed: body is not a list')
+            return self.createResponse(None, 400)
+
+        default_clientname = self.request.headers.get('clientname')
+        clientnames = list(map(lambda _: _.get('clientname', default_clientname) if isinstance(_, dict) else None,
+                               items))
+        clients, running = get_running_clients(app, set(filter(lambda _: _ is not None, clientnames)))
+
+        statuses = []
+        events = []
+        for item, clientname in zip(items, clientnames):
+            event, error = read_event(item, clientname, clients, running)
+            if event is None:
+                statuses.append({'status': 400, 'error': error})
+                continue
+            statuses.append({'status': 200})
+            events.append((event, statuses[-1]))
+
+        rows = drop_duplicates(list(map(lambda _: _[0], events)))
+        # Unique index skips duplicates the filter did not catch, so only inserted rows are counted
+        inserted = DataItem.insert_rows(rows)
+        count_duplicates(len(rows) - len(inserted))
+        kept = set(map(id, inserted))
+        for event, status in events:
+            if id(event) not in kept:
+                status['duplicate'] = True
+        summaries = list(map(lambda _: (running[_['client_id']], _['key'], _['value']), inserted))
+
+        DataItemSummary.add_dataitems(summaries)
+        after_commit(add_rewards, summaries)
+        print_log(datetime.datetime.now(), 'POST', '/events/batch', 'Save experiment data',
+            'Saved %s of %s data-items' % (len(inserted), len(items)))
+        return statuses
+
+    @view_config(route_name='events_stream', request_method="POST")
+    def events_stream_POST(self):
+        """
+        Same as POST /events/batch, but body is newline-delimited JSON with one data-item on every line. Body is
+        parsed while it is read, and data-items are saved in transactions of event_stream_batch_size lines, so
+        producers can post any number of data-items over one connection. Batches which were saved stay saved if a
+        later batch fails.
+        :return:    200 with {'received': <data-items>, 'saved': <data-items>, 'duplicates': <data-items>, 'errors':
+                    [{'line': <line number>, 'error': <reason>}]}. At most max_errors errors are listed
+                    500 with the same body, if a batch could not be saved. Lines after it were not read
+                    401 if apikey was incorrect
+        """
+        def print_error(message):
+            print_log(datetime.datetime.now(), 'POST', '/events/stream', 'Save experiment data', message)
+
+        app = application_by_apikey_from_header(self.request.headers)
+        if app is None:
+            print_error('Unauthorized')
+            return self.createResponse(None, 401)
+
+        settings = self.request.registry.settings
+        batch_size = int(settings.get('experiment_server.event_stream_batch_size', 1000))
+        max_errors = int(settings.get('experiment_server.event_stream_max_errors', 100))
+        default_clientname = self.request.headers.get('clientname')
+        engine = DataItem.engine()
+        result = {'received': 0, 'saved': 0, 'duplicates': 0, 'errors': []}
+
+        def add_error(number, error):
+            if len(result['errors']) < max_errors:
+                result['errors'].append({'line': number, 'error': error})
+
+        lines = filter(lambda _: len(_[1].strip()) > 0, enumerate(iter_lines(self.request.body_file), 1))
+        for batch in partition_all(batch_size, lines):
+            items = []
+            for number, line in batch:
+                try:
+                    item = json.loads(line.decode('utf-8'))
+                except ValueError as e:
+                    add_error(number, 'malformed JSON')
+                    continue
+                clientname = item.get('clientname', default_clientname) if isinstance(item, dict) else None
+                items.append((number, item, clientname))
+            result['received'] += len(batch)
+
+            clients, running = get_running_clients(app, set(filter(lambda _: _ is not None,
+                                                                   map(lambda _: _[2], items))))
+            rows = []
+            for number, item, clientname in items:
+                event, error = read_event(item, clientname, clients, running)
+                if event is None:
+                    add_error(number, error)
+                    continue
+                rows.append(event)
+            received = len(rows)
+            rows = drop_duplicates(rows)
+
+            try:
+                with engine.begin() as connection:
+                    # Unique index skips duplicates the filter did not catch, so only inserted rows are counted
+                    inserted = DataItem.insert_rows(rows, connection)
+                    summaries = list(map(lambda _: (running[_['client_id']], _['key'], _['value']), inserted))
+                    DataItemSummary.add_dataitems(summaries, connection)
+            except SQLAlchemyError as e:
+                print_error('Failed: saved %s of %s data-items: %s' % (result['saved'], result['received'], e))
+                self.request.response.status = 500
+                return result
+            count_duplicates(len(rows) - len(inserted))
+            add_rewards(summaries)
+            result['duplicates'] += received - len(inserted)
+            result['saved'] += len(inserted)
+
+        print_log(datetime.datetime.now(), 'POST', '/events/stream', 'Save experiment data',
+            'Saved %s of %s data-items' % (result['saved'], result['received']))
+        return result
+
     @view_config(route_name='configurations', request_method="POST")
     def configurations_POST(self):
         """
@@ -324,9 +756,8 @@ class Clients(WebUtils):
             print_error('Missing parameters')
             return self.createResponse(None, 400)
 
-        client = get_client(req_clientname)
-        configs = get_client_configurations(client, app)
+        configs = get_client_configurations(req_clientname, app)
         if configs is None:
             return self.createResponse(None, 400)
 
-        return configs
+        return Response(body=configs, content_type='application/json', charset='utf-8')
@@ -6,7 +6,7 @@ from pyramid.view import view_config, view_defaults
 from experiment_server.models.applications import Application
 from experiment_server.models.configurationkeys import ConfigurationKey
 from experiment_server.utils.log import print_log
-from experiment_server.utils.configuration_tools import get_valid_types
+from experiment_server.utils.configuration_tools import get_valid_types, invalidate_constraints
 from .webutils import WebUtils
 
 ###
@@ -33,6 +33,20 @@ def is_valid_name(ck):
 def is_valid_type(ck):
     return ck.type is not None and len(ck.type) > 0 and ck.type in get_valid_types()
 
+
+def is_unused_name(app_id, ck):
+    """
+    Names of ConfigurationKeys are unique within Application
+    :param app_id: Application's id
+    :param ck: ConfigurationKey to be created, or renamed
+    :return: Does no other ConfigurationKey of the Application have ck's name
+    """
+    query = ConfigurationKey.query()\
+        .filter(ConfigurationKey.application_id == app_id, ConfigurationKey.name == ck.name)
+    if ck.id is not None:
+        query = query.filter(ConfigurationKey.id != ck.id)
+    return query.count() == 0
+
 ###
 # Controller-class and -functions
 ###
@@ -50,8 +64,8 @@ class ConfigurationKeys(WebUtils):
     def valid_types(self):
         return get_valid_types()
 
-    def is_valid_configurationkey(self, ck):
-        if not (is_valid_name(ck) and is_valid_type(ck)):
+    def is_valid_configurationkey(self, app_id, ck):
+        if not (is_valid_name(ck) and is_valid_type(ck) and is_unused_name(app_id, ck)):
             return False
         return True
 
@@ -80,7 +94,8 @@ class ConfigurationKeys(WebUtils):
             print_log(datetime.datetime.now(), 'GET', '/applications/%s/configurationkeys'\
                 % app_id, 'Get configurationkeys', 'Failed')
             return self.createResponse(None, 400)
-        app_conf_keys = ConfigurationKey.query().join(Application).filter(Application.id == app_id)
+        app_conf_keys = ConfigurationKey.query().join(Application).filter(Application.id == app_id)\
+            .order_by(ConfigurationKey.id)
         return list(map(lambda _: _.as_dict(), app_conf_keys))
 
     @view_config(route_name='configurationkey', request_method="GET")
@@ -102,8 +117,9 @@ class ConfigurationKeys(WebUtils):
         app_id = self.request.swagger_data['appid']
         confkey_id = self.request.swagger_data['ckid']
         configkey_req = self.request.swagger_data['configurationkey']
-        if self.is_valid_configurationkey(configkey_req):
+        if self.is_valid_configurationkey(app_id, configkey_req):
             ConfigurationKey.update(configkey_req.id, "name", configkey_req.name)
+            invalidate_constraints()
             updated = ConfigurationKey.get(configkey_req.id)
             return updated.as_dict()
 
@@ -123,6 +139,7 @@ class ConfigurationKeys(WebUtils):
                  'Delete configurationkey', 'Failed')
             return self.createResponse(None, 400)
         ConfigurationKey.destroy(confkey)
+        invalidate_constraints()
         print_log(datetime.datetime.now(), 'DELETE', '/applications/%s' % app_id +
             '/configurationkeys/%s' % confkey_id, 'Delete configurationkey', 'Succeeded')
         return {}
@@ -143,14 +160,16 @@ class ConfigurationKeys(WebUtils):
         new_confkey = self.request.swagger_data['configurationkey']
         name = new_confkey.name
         type = new_confkey.type.lower()
+        # Not yet added to the session through application, since validation queries would flush it
         configurationkey = ConfigurationKey(
-            application=application,
+            application_id=application.id,
             name=name,
             type=type
         )
 
-        if self.is_valid_configurationkey(configurationkey):
+        if self.is_valid_configurationkey(app_id, configurationkey):
             ConfigurationKey.save(configurationkey)
+            invalidate_constraints()
             print_log(datetime.datetime.now(), 'POST', '/applications/' + str(app_id) + '/configurationkeys',
                       'Create new configurationkey', 'Succeeded')
             return configurationkey.as_dict()
@@ -169,6 +188,7 @@ class ConfigurationKeys(WebUtils):
                       'Delete configurationkeys of application', 'Failed')
             return self.createResponse(None, 400)
         is_empty_list = list(map(lambda _: ConfigurationKey.destroy(_), app.configurationkeys))
+        invalidate_constraints()
         for i in is_empty_list:
             if i != None:
                 print_log(datetime.datetime.now(), 'DELETE', '/applications/' + str(id) + '/configurationkeys',
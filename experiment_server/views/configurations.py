@@ -1,7 +1,9 @@
 from ..models import (Application, Configuration, ConfigurationKey, Experiment, ExperimentGroup)
 from pyramid.response import Response
 from pyramid.view import view_config, view_defaults
+from sqlalchemy import or_
 from experiment_server.utils.log import print_log
+from experiment_server.utils.snapshots import invalidate_application_snapshots
 from .webutils import WebUtils
 import datetime
 
@@ -30,16 +32,21 @@ def is_valid_value(app_id, configuration):
     :param configuration: Configuration to be validated
     :return: Is configuration's value valid
     """
-    from experiment_server.utils.configuration_tools import (is_valid_type_value, is_in_range, is_valid_exclusion)
+    from experiment_server.utils.configuration_tools import (is_valid_type_value, get_application_constraints,
+                                                             get_experimentgroup_values)
 
-    confkey = get_configurationkey(app_id, configuration)
+    constraints = get_application_constraints(app_id)
+    key = configuration.key
     value = configuration.value
 
-    if confkey is not None:
-        return is_valid_type_value(confkey.type, configuration.value) \
-               and is_in_range(confkey, value) and is_valid_exclusion(confkey, configuration)
+    if key not in constraints.types:
+        return False
+    if not (is_valid_type_value(constraints.types[key], value) and constraints.is_in_range(key, value)):
+        return False
+    if key not in constraints.exclusions:
+        return True
 
-    return False
+    return constraints.is_valid_exclusion(key, value, get_experimentgroup_values(configuration.experimentgroup_id))
 
 
 def exists_configurationkey(app_id, configuration):
@@ -67,6 +74,30 @@ def is_valid_connections(app_id, exp_id, expgroup_id):
 
     return expgroup is not None
 
+
+def is_set_by_other_layer(app_id, exp_id, configuration):
+    """
+    Checks if Configuration's key is set by an Experiment of another layer, which may run at the same time as given
+    Experiment. Client can be in one Experiment of every layer, so layers must not set the same keys
+    :param app_id: Application where Experiment belongs
+    :param exp_id: Experiment where Configuration is going to be created to
+    :param configuration: Configuration to be validated
+    :return: Is key set by another layer
+    """
+    experiment = Experiment.get(exp_id)
+    query = Configuration.query().join(ExperimentGroup, Experiment)\
+        .filter(Experiment.application_id == app_id, Experiment.id != exp_id, Configuration.key == configuration.key)
+    if experiment.layer is None:
+        query = query.filter(Experiment.layer != None)
+    else:
+        query = query.filter(or_(Experiment.layer == None, Experiment.layer != experiment.layer))
+    if experiment.endDatetime is not None:
+        query = query.filter(or_(Experiment.startDatetime == None, Experiment.startDatetime < experiment.endDatetime))
+    if experiment.startDatetime is not None:
+        query = query.filter(or_(Experiment.endDatetime == None, Experiment.endDatetime > experiment.startDatetime))
+
+    return query.first() is not None
+
 ###
 # Controller-class and -functions
 ###
@@ -87,7 +118,7 @@ class Configurations(WebUtils):
         :return: Is configuration valid
         """
         return is_valid_connections(app_id, exp_id, expgroup_id) and exists_configurationkey(app_id, configuration) \
-               and is_valid_value(app_id, configuration)
+               and is_valid_value(app_id, configuration) and not is_set_by_other_layer(app_id, exp_id, configuration)
 
     @view_config(route_name='experimentgroup_configuration', request_method="OPTIONS")
     def all_OPTIONS(self):
@@ -137,6 +168,7 @@ class Configurations(WebUtils):
 
         if self.is_valid_configuration(app_id, exp_id, expgroup_id, req_config):
             Configuration.save(req_config)
+            invalidate_application_snapshots()
             print_log(datetime.datetime.now(), 'POST', '/applications/%s/experiments/%s/experimentgroups/%s',
                       'Create Configuration to ExperimentGroup', 'Success')
             return req_config.as_dict()
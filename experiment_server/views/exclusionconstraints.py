@@ -8,6 +8,7 @@ from .webutils import WebUtils
 from experiment_server.models.exclusionconstraints import ExclusionConstraint
 from experiment_server.models.configurationkeys import ConfigurationKey
 from experiment_server.models.applications import Application
+from experiment_server.utils.configuration_tools import invalidate_constraints
 
 ###
 # Validation- and helper-functions
@@ -125,6 +126,7 @@ class ExclusionConstraints(WebUtils):
                     ConfigurationKey.id == ExclusionConstraint.second_operator_id))\
             .join(Application)\
             .filter(Application.id == app_id)\
+            .order_by(ExclusionConstraint.id)\
             .all()
 
         return list(map(lambda _: _.as_dict(), exclusionconstraints))
@@ -157,6 +159,7 @@ class ExclusionConstraints(WebUtils):
             return self.createResponse(None, 400)
 
         ExclusionConstraint.destroy(exconstraint)
+        invalidate_constraints()
         print_log(datetime.datetime.now(), 'DELETE',
             logmessage_address, 'Delete exclusionconstraint', 'Succeeded')
         return {}
@@ -187,5 +190,6 @@ class ExclusionConstraints(WebUtils):
             return self.createResponse({}, 400)
 
         ExclusionConstraint.save(new_exconstraint)
+        invalidate_constraints()
 
         return new_exconstraint.as_dict()
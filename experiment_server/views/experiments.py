@@ -6,10 +6,69 @@ from experiment_server.views.webutils import WebUtils
 
 from experiment_server.models.applications import Application
 from experiment_server.models.clients import Client
+from experiment_server.models.clients_experimentgroups import clients_experimentgroups
+from experiment_server.models.dataitems import DataItem
 from experiment_server.models.experiments import Experiment
 from experiment_server.models.experimentgroups import ExperimentGroup
+from experiment_server.models.dataitemsummaries import DataItemSummary
+from experiment_server.utils.snapshots import invalidate_application_snapshots
+from experiment_server.utils.memberships import invalidate_experimentgroup
+from experiment_server.utils.json_stream import stream_object, stream_rows
+from experiment_server.utils.timestamps import format_timestamp
 
-from toolz import assoc, concat
+from sqlalchemy import select
+from toolz import assoc
+
+###
+# Helper functions
+###
+
+
+def experimentgroup_clients_query(expgroupid):
+    clients = Client.__table__
+    return select([clients])\
+        .select_from(clients.join(clients_experimentgroups,
+                                  clients_experimentgroups.c.client_id == clients.c.id))\
+        .where(clients_experimentgroups.c.experimentgroup_id == expgroupid)\
+        .order_by(clients.c.id)
+
+
+def experimentgroup_dataitems_query(expgroupid, after=None, limit=None):
+    """
+    DataItems of ExperimentGroup's Clients with their Clients, in order of ids
+    :param expgroupid: id of the ExperimentGroup
+    :param after: if given, only DataItems with greater id are returned
+    :param limit: if given, at most this many DataItems are returned
+    """
+    dataitems = DataItem.__table__
+    clients = Client.__table__
+    query = select([dataitems, clients.c.clientname])\
+        .select_from(dataitems
+                     .join(clients, dataitems.c.client_id == clients.c.id)
+                     .join(clients_experimentgroups, clients_experimentgroups.c.client_id == clients.c.id))\
+        .where(clients_experimentgroups.c.experimentgroup_id == expgroupid)\
+        .order_by(dataitems.c.id)
+    if after is not None:
+        query = query.where(dataitems.c.id > after)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def render_client_row(row):
+    return {c.name: row[c] for c in Client.__table__.columns}
+
+
+def render_dataitem_row(row):
+    """ Same as DataItem.as_dict() with the Client, without loading either """
+    result = {}
+    for c in DataItem.__table__.columns:
+        if c.name == 'startDatetime' or c.name == 'endDatetime':
+            result[c.name] = format_timestamp(row[c])
+        else:
+            result[c.name] = row[c]
+    result['client'] = {'id': row[DataItem.__table__.c.client_id], 'clientname': row[Client.__table__.c.clientname]}
+    return result
 
 @view_defaults(renderer='json')
 class Experiments(WebUtils):
@@ -42,19 +101,34 @@ class Experiments(WebUtils):
         res.headers.add('Access-Control-Allow-Methods', 'POST,GET,OPTIONS, DELETE, PUT')
         return res
 
+    @view_config(route_name='experimentgroup_summary', request_method="OPTIONS")
+    def all_OPTIONS(self):
+        res = Response()
+        res.headers.add('Access-Control-Allow-Origin', '*')
+        res.headers.add('Access-Control-Allow-Methods', 'GET,OPTIONS')
+        return res
+
     @view_config(route_name='experiments', request_method="POST")
     def experiments_POST(self):
         """ Create new experiment """
         app_id = self.request.swagger_data['appid']
         req_exp = self.request.swagger_data['experiment']
+        weight = getattr(req_exp, 'weight', None)
+        if weight is not None and weight < 0:
+            print_log(req_exp.name, 'POST', '/experiments', 'Create new experiment', 'Failed: negative weight')
+            return self.createResponse(None, 400)
         exp = Experiment(
                 name=req_exp.name,
                 startDatetime = req_exp.startDatetime,
                 endDatetime = req_exp.endDatetime,
-                application_id = app_id
+                application_id = app_id,
+                layer = getattr(req_exp, 'layer', None)
         )
+        if weight is not None:
+            exp.weight = weight
 
         Experiment.save(exp)
+        invalidate_application_snapshots()
         print_log(req_exp.name, 'POST', '/experiments', 'Create new experiment', exp)
         return exp.as_dict()
 
@@ -101,6 +175,7 @@ class Experiments(WebUtils):
             return self.createResponse(None, 400)
 
         Experiment.destroy(exp)
+        invalidate_application_snapshots()
         print_log(datetime.datetime.now(), 'DELETE', log_address,\
             'Delete experiment', 'Succeeded')
         return {}
@@ -142,11 +217,39 @@ class Experiments(WebUtils):
 
         return list(map(lambda _: _.as_dict(), experimentgroups))
 
+    @view_config(route_name='experimentgroup_summary', request_method="GET")
+    def experimentgroup_summary_GET(self):
+        """
+            Show aggregates of ExperimentGroup's numeric DataItems by key. Aggregates are kept up to date when
+            DataItems are saved, so DataItems are not read
+        """
+        app_id = self.request.swagger_data['appid']
+        expid = self.request.swagger_data['expid']
+        expgroupid = self.request.swagger_data['expgroupid']
+
+        expgroup = ExperimentGroup.query().join(Experiment, Application)\
+            .filter(ExperimentGroup.id == expgroupid, Experiment.id == expid,\
+                Application.id == app_id)\
+            .one_or_none()
+
+        if expgroup is None:
+            print_log(datetime.datetime.now(), 'GET',
+                      '/experiments/%s/experimentgroups/%s/summary' % (expid, expgroupid),
+                      'Show experimentgroup summary', None)
+            return self.createResponse(None, 400)
+
+        summaries = DataItemSummary.query()\
+            .filter(DataItemSummary.experimentgroup_id == expgroupid)\
+            .order_by(DataItemSummary.key)
+        return list(map(lambda _: _.as_dict(), summaries))
+
     @view_config(route_name='experimentgroup', request_method="GET")
     def experimentgroup_GET_one(self):
         """
             Show specific experiment group metadata
-            Metadata includes ExperimentGroup's configurations, Clients and DataItems
+            Metadata includes ExperimentGroup's configurations, Clients and DataItems. DataItems are paginated by
+            their ids with optional parameters after and limit: next page starts after the last DataItem's id.
+            Response is streamed, so Clients and DataItems are never all in memory.
         """
         app_id = self.request.swagger_data['appid']
         expid = self.request.swagger_data['expid']
@@ -164,21 +267,19 @@ class Experiments(WebUtils):
                       'Show specific experimentgroup metadata', None)
             return self.createResponse(None, 400)
 
+        after = self.request.swagger_data.get('after')
+        limit = self.request.swagger_data.get('limit')
         configurations = list(map(lambda _: _.as_dict(), expgroup.configurations))
-        clients = list(map(lambda _: _.as_dict(), expgroup.clients))
-        dataitems = list(map(lambda _: _.dataitems, expgroup.clients))
-        dataitems_concat = list(concat(dataitems))
-        dataitems_with_client = []
-        for ditem in dataitems_concat:
-            dataitem = ditem.as_dict()
-            di_and_client = assoc(dataitem, 'client', ditem.client.as_dict())
-            dataitems_with_client.append(di_and_client)
-        experimentgroup = expgroup.as_dict()
-        resultwithconf = assoc(experimentgroup, 'configurations', configurations)
-        resultwithclient = assoc(resultwithconf, 'clients', clients)
-        result = assoc(resultwithclient, 'dataitems', dataitems_with_client)
-
-        return result
+        experimentgroup = assoc(expgroup.as_dict(), 'configurations', configurations)
+        clients = experimentgroup_clients_query(expgroupid)
+        dataitems = experimentgroup_dataitems_query(expgroupid, after, limit)
+
+        # Clients and DataItems are read while the response is sent, after the request's transaction has ended
+        body = stream_object(ExperimentGroup.engine(), experimentgroup, [
+            ('clients', lambda connection: stream_rows(connection, clients, render_client_row)),
+            ('dataitems', lambda connection: stream_rows(connection, dataitems, render_dataitem_row))
+        ])
+        return Response(app_iter=body, content_type='application/json', charset='utf-8')
 
     @view_config(route_name='experimentgroup', request_method="DELETE")
     def experimentgroup_DELETE(self):
@@ -202,7 +303,33 @@ class Experiments(WebUtils):
                       'Delete experimentgroup', 'Failed')
             return self.createResponse(None, 400)
         ExperimentGroup.destroy(experimentgroup)
+        invalidate_application_snapshots()
+        invalidate_experimentgroup(expgroupid)
         print_log(datetime.datetime.now(), 'DELETE',
                   log_address,
                   'Delete experimentgroup', 'Succeeded')
         return {}
+
+    @view_config(route_name='experimentgroup', request_method="PUT")
+    def experimentgroup_PUT(self):
+        """ Updates only the weight of experimentgroup """
+        app_id = self.request.swagger_data['appid']
+        exp_id = self.request.swagger_data['expid']
+        expgroupid = self.request.swagger_data['expgroupid']
+        weight = self.request.swagger_data['experimentgroup'].weight
+
+        experimentgroup = ExperimentGroup.query().join(Experiment, Application)\
+            .filter(ExperimentGroup.id == expgroupid, Experiment.id == exp_id,\
+                Application.id == app_id)\
+            .one_or_none()
+
+        log_address = '/applications/%s/experiments/%s/experimentgroups/%s'\
+            % (app_id, exp_id, expgroupid)
+
+        if experimentgroup is None or weight is None or weight < 0:
+            print_log(datetime.datetime.now(), 'PUT', log_address, 'Update experimentgroup weight', 'Failed')
+            return self.createResponse(None, 400)
+        ExperimentGroup.update(expgroupid, 'weight', weight)
+        invalidate_application_snapshots()
+        print_log(datetime.datetime.now(), 'PUT', log_address, 'Update experimentgroup weight', 'Succeeded')
+        return ExperimentGroup.get(expgroupid).as_dict()
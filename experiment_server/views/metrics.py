@@ -0,0 +1,22 @@
+from pyramid.view import view_config, view_defaults
+from .webutils import WebUtils
+from experiment_server.utils.memberships import get_statistics as get_membership_statistics
+from experiment_server.utils.event_dedup import get_statistics as get_event_dedup_statistics
+from experiment_server.utils.admission import get_statistics as get_admission_statistics
+from experiment_server.utils.rate_limits import get_statistics as get_rate_limit_statistics
+
+
+@view_defaults(renderer='json')
+class Metrics(WebUtils):
+    def __init__(self, request):
+        self.request = request
+
+    @view_config(route_name='metrics', request_method="GET")
+    def metrics_GET(self):
+        """ Returns counters of this process' caches """
+        return {
+            'membership_cache': get_membership_statistics(),
+            'event_dedup': get_event_dedup_statistics(),
+            'admission': get_admission_statistics(),
+            'rate_limits': get_rate_limit_statistics()
+        }
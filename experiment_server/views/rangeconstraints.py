@@ -6,6 +6,7 @@ from .webutils import WebUtils
 from experiment_server.models.rangeconstraints import RangeConstraint
 from experiment_server.models.configurationkeys import ConfigurationKey
 from experiment_server.models.applications import Application
+from experiment_server.utils.configuration_tools import invalidate_constraints
 
 ###
 # Range Constraint validation functions
@@ -108,6 +109,7 @@ class RangeConstraints(WebUtils):
                     ' have RangeConstraint with id %s' % rc_id)
 
             RangeConstraint.destroy(rangeconstraint)
+            invalidate_constraints()
         except Exception as e:
             print(e)
             print_log(datetime.datetime.now(), 'DELETE', '/rangeconstraint/' + str(rc_id),
@@ -137,6 +139,7 @@ class RangeConstraints(WebUtils):
                 raise Exception('Application with id %s does not have' % app_id +
                     ' ConfigurationKey with id %s' % configkey_id)
             RangeConstraint.save(rconstraint)
+            invalidate_constraints()
         except Exception as e:
             print_log(datetime.datetime.now(), 'POST', '/applications/%s/' % app_id +
                 'configurationkeys/%s/rangeconstraints' % configkey_id,
@@ -9,10 +9,12 @@ with open(os.path.join(here, 'CHANGES.txt')) as f:
     CHANGES = f.read()
 
 requires = [
+    'alembic',
     'pyramid',
     'pyramid_jinja2',
     'pyramid_debugtoolbar',
     'pyramid_tm',
+    'repoze.lru',
     'SQLAlchemy',
     'transaction',
     'zope.sqlalchemy',
@@ -52,5 +54,13 @@ setup(name='Experiment-server',
       main = experiment_server:main
       [console_scripts]
       initialize_Experiment-server_db = experiment_server.scripts.initializedb:main
+      generate_Experiment-server_data = experiment_server.scripts.generatedata:main
+      benchmark_Experiment-server = experiment_server.benchmarks.run:main
+      [experiment_server.experiment_logics]
+      one_random = experiment_server.experiment_logic.one_random_experiment:OneRandomExperiment
+      hash_bucket = experiment_server.experiment_logic.hash_bucket_experiment:HashBucketExperiment
+      weighted = experiment_server.experiment_logic.weighted_experiment:WeightedExperiment
+      layered = experiment_server.experiment_logic.layered_experiment:LayeredExperiment
+      thompson_sampling = experiment_server.experiment_logic.thompson_sampling_experiment:ThompsonSamplingExperiment
       """,
       )